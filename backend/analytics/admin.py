@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.contrib import admin
+
+from .models import DailyActivity, DailyAuthorActivity, DailyTagActivity
+from .rollups import activity_dashboard
+from users.paginators import EstimatedCountPaginator
+
+
+@admin.register(DailyActivity)
+class DailyActivityAdmin(admin.ModelAdmin):
+    list_display = ('day', 'metric', 'count',)
+    list_filter = ('metric',)
+    date_hierarchy = 'day'
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        extra_context.update(activity_dashboard(
+            settings.ROLLUP_DASHBOARD_DAYS, settings.ROLLUP_DASHBOARD_TOP
+        ))
+        return super().changelist_view(request, extra_context)
+
+
+@admin.register(DailyTagActivity)
+class DailyTagActivityAdmin(admin.ModelAdmin):
+    list_display = ('day', 'metric', 'tag', 'count',)
+    list_select_related = ('tag',)
+    list_filter = ('metric', 'tag',)
+    date_hierarchy = 'day'
+
+
+@admin.register(DailyAuthorActivity)
+class DailyAuthorActivityAdmin(admin.ModelAdmin):
+    list_display = ('day', 'metric', 'author', 'count',)
+    list_select_related = ('author',)
+    list_filter = ('metric',)
+    raw_id_fields = ('author',)
+    search_fields = ('author__username',)
+    date_hierarchy = 'day'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,24 @@
+from time import perf_counter
+
+from django.core.management import BaseCommand
+
+from analytics.rollups import update_rollups
+
+
+class Command(BaseCommand):
+    help = 'Incrementally updates daily activity rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute rollups from the earliest recorded activity',
+        )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        chunks = update_rollups(options['rebuild'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Сводки обновлены: порций {chunks} '
+            f'за {perf_counter() - started:.2f} с'
+        ))
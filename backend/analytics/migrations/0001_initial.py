@@ -0,0 +1,89 @@
+# Generated by Django 3.2.15 on 2026-10-19 15:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0007_recipe_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('metric', models.CharField(choices=[('recipes', 'Новые рецепты'), ('favorites', 'Добавления в избранное'), ('shopping_carts', 'Добавления в список покупок'), ('follows', 'Новые подписки')], max_length=20, verbose_name='Показатель')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+            ],
+            options={
+                'verbose_name': 'Активность за день',
+                'verbose_name_plural': 'Активность по дням',
+                'ordering': ['-day', 'metric'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Сводка')),
+                ('value', models.DateTimeField(verbose_name='Обработано до')),
+            ],
+            options={
+                'verbose_name': 'Граница обработки сводок',
+                'verbose_name_plural': 'Границы обработки сводок',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyTagActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('metric', models.CharField(choices=[('recipes', 'Новые рецепты'), ('favorites', 'Добавления в избранное'), ('shopping_carts', 'Добавления в список покупок'), ('follows', 'Новые подписки')], max_length=20, verbose_name='Показатель')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.tag', verbose_name='Тэг')),
+            ],
+            options={
+                'verbose_name': 'Активность по тэгу за день',
+                'verbose_name_plural': 'Активность по тэгам',
+                'ordering': ['-day', 'metric'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyAuthorActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('metric', models.CharField(choices=[('recipes', 'Новые рецепты'), ('favorites', 'Добавления в избранное'), ('shopping_carts', 'Добавления в список покупок'), ('follows', 'Новые подписки')], max_length=20, verbose_name='Показатель')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Активность по автору за день',
+                'verbose_name_plural': 'Активность по авторам',
+                'ordering': ['-day', 'metric'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyactivity',
+            constraint=models.UniqueConstraint(fields=('day', 'metric'), name='daily_activity_constraint'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailytagactivity',
+            constraint=models.UniqueConstraint(fields=('day', 'metric', 'tag'), name='daily_tag_activity_constraint'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyauthoractivity',
+            constraint=models.UniqueConstraint(fields=('day', 'metric', 'author'), name='daily_author_activity_constraint'),
+        ),
+    ]
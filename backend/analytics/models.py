@@ -0,0 +1,106 @@
+from django.db import models
+
+from recipes.models import Tag
+from users.models import User
+
+METRIC_LENGTH = 20
+WATERMARK_NAME_LENGTH = 50
+
+
+class Rollup(models.Model):
+    RECIPES = 'recipes'
+    FAVORITES = 'favorites'
+    SHOPPING_CARTS = 'shopping_carts'
+    FOLLOWS = 'follows'
+    METRICS = (
+        (RECIPES, 'Новые рецепты'),
+        (FAVORITES, 'Добавления в избранное'),
+        (SHOPPING_CARTS, 'Добавления в список покупок'),
+        (FOLLOWS, 'Новые подписки'),
+    )
+
+    day = models.DateField(
+        'День',
+    )
+    metric = models.CharField(
+        'Показатель',
+        max_length=METRIC_LENGTH,
+        choices=METRICS,
+    )
+    count = models.PositiveIntegerField(
+        'Количество',
+        default=0,
+    )
+
+    class Meta:
+        abstract = True
+        ordering = ['-day', 'metric', ]
+
+
+class DailyActivity(Rollup):
+
+    class Meta(Rollup.Meta):
+        verbose_name = 'Активность за день'
+        verbose_name_plural = 'Активность по дням'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('day', 'metric'),
+                name='daily_activity_constraint',
+            ),
+        )
+
+
+class DailyTagActivity(Rollup):
+    tag = models.ForeignKey(
+        Tag,
+        verbose_name='Тэг',
+        related_name='+',
+        on_delete=models.CASCADE,
+    )
+
+    class Meta(Rollup.Meta):
+        verbose_name = 'Активность по тэгу за день'
+        verbose_name_plural = 'Активность по тэгам'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('day', 'metric', 'tag'),
+                name='daily_tag_activity_constraint',
+            ),
+        )
+
+
+class DailyAuthorActivity(Rollup):
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор',
+        related_name='+',
+        on_delete=models.CASCADE,
+    )
+
+    class Meta(Rollup.Meta):
+        verbose_name = 'Активность по автору за день'
+        verbose_name_plural = 'Активность по авторам'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('day', 'metric', 'author'),
+                name='daily_author_activity_constraint',
+            ),
+        )
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(
+        'Сводка',
+        max_length=WATERMARK_NAME_LENGTH,
+        unique=True,
+    )
+    value = models.DateTimeField(
+        'Обработано до',
+    )
+
+    class Meta:
+        verbose_name = 'Граница обработки сводок'
+        verbose_name_plural = 'Границы обработки сводок'
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
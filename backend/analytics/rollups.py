@@ -0,0 +1,187 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow
+
+from .models import (
+    DailyActivity,
+    DailyAuthorActivity,
+    DailyTagActivity,
+    Rollup,
+    RollupWatermark
+)
+
+DAILY = 'daily'
+
+# Показатель: модель, поле времени, путь к тэгам и путь к автору.
+SOURCES = {
+    Rollup.RECIPES: (Recipe, 'pub_date', 'tags', 'author'),
+    Rollup.FAVORITES: (Favorite, 'created', 'recipe__tags', 'recipe__author'),
+    Rollup.SHOPPING_CARTS: (
+        ShoppingCart, 'created', 'recipe__tags', 'recipe__author'
+    ),
+    Rollup.FOLLOWS: (Follow, 'created', None, 'author'),
+}
+
+
+def start_of_day(value):
+    return timezone.make_aware(
+        datetime.combine(timezone.localtime(value).date(), time.min)
+    )
+
+
+def earliest_activity():
+    values = [
+        model.objects.aggregate(first=Min(timestamp))['first']
+        for model, timestamp, _, _ in SOURCES.values()
+    ]
+    values = [value for value in values if value is not None]
+    return min(values) if values else None
+
+
+def daily_counts(queryset, timestamp, dimension=None):
+    """
+    Количество строк по дням, а с dimension — по дням и значениям
+    измерения (тэгу или автору). Строки без значения измерения
+    не учитываются.
+    """
+    fields = ['day']
+    if dimension is not None:
+        queryset = queryset.filter(**{f'{dimension}__isnull': False})
+        fields.append(dimension)
+    return queryset.annotate(day=TruncDate(timestamp)).order_by().values(
+        *fields
+    ).annotate(total=Count('pk')).values_list(*fields, 'total')
+
+
+def rebuild_days(start, end):
+    """
+    Пересчитывает сводки за дни интервала [start, end), где start —
+    начало дня. Дни пересчитываются целиком из исходных таблиц с
+    фильтром по индексированному полю времени, поэтому повторный
+    запуск за тот же интервал даёт тот же результат.
+    """
+    days = (
+        timezone.localdate(start),
+        timezone.localdate(end - timedelta(microseconds=1)),
+    )
+    totals, tags, authors = [], [], []
+    for metric, (model, timestamp, tag, author) in SOURCES.items():
+        queryset = model.objects.filter(**{
+            f'{timestamp}__gte': start, f'{timestamp}__lt': end,
+        })
+        totals += [
+            DailyActivity(day=day, metric=metric, count=total)
+            for day, total in daily_counts(queryset, timestamp)
+        ]
+        if tag is not None:
+            tags += [
+                DailyTagActivity(
+                    day=day, metric=metric, tag_id=pk, count=total
+                )
+                for day, pk, total in daily_counts(queryset, timestamp, tag)
+            ]
+        authors += [
+            DailyAuthorActivity(
+                day=day, metric=metric, author_id=pk, count=total
+            )
+            for day, pk, total in daily_counts(queryset, timestamp, author)
+        ]
+    for model, rows in (
+        (DailyActivity, totals),
+        (DailyTagActivity, tags),
+        (DailyAuthorActivity, authors),
+    ):
+        model.objects.filter(day__range=days).delete()
+        model.objects.bulk_create(rows)
+
+
+def update_rollups(rebuild=False):
+    """
+    Досчитывает дневные сводки от сохранённой границы до текущего
+    момента минус ROLLUP_LAG_MINUTES: запаздывание оставляет время
+    на фиксацию транзакций, начатых до границы. Работа идёт порциями
+    по ROLLUP_CHUNK_DAYS дней, каждая порция вместе с новой границей
+    сохраняется в своей транзакции. Возвращает число пересчитанных
+    порций.
+    """
+    cutoff = timezone.now() - timedelta(minutes=settings.ROLLUP_LAG_MINUTES)
+    watermark = RollupWatermark.objects.filter(name=DAILY).first()
+    if rebuild or watermark is None:
+        first = earliest_activity()
+        if first is None:
+            return 0
+        watermark = watermark or RollupWatermark(name=DAILY)
+        watermark.value = first
+    start = start_of_day(watermark.value)
+    chunks = 0
+    while start < cutoff:
+        end = min(
+            start + timedelta(days=settings.ROLLUP_CHUNK_DAYS), cutoff
+        )
+        with transaction.atomic():
+            rebuild_days(start, end)
+            watermark.value = end
+            watermark.save()
+        chunks += 1
+        start = end
+    return chunks
+
+
+def top_dimension(model, field, since, limit):
+    """
+    Лучшие значения измерения по каждому показателю за период.
+    """
+    top = {}
+    for metric, name, total in model.objects.filter(
+        day__gte=since
+    ).values('metric', field).annotate(total=Sum('count')).order_by(
+        'metric', '-total', field
+    ).values_list('metric', field, 'total'):
+        rows = top.setdefault(metric, [])
+        if len(rows) < limit:
+            rows.append((name, total))
+    return [
+        (label, top.get(metric, [])) for metric, label in Rollup.METRICS
+    ]
+
+
+def activity_dashboard(days, limit):
+    """
+    Данные панели аналитики за последние days дней: только чтение
+    сводных таблиц, исходные таблицы не затрагиваются.
+    """
+    since = timezone.localdate() - timedelta(days=days - 1)
+    counts = {}
+    for day, metric, count in DailyActivity.objects.filter(
+        day__gte=since
+    ).values_list('day', 'metric', 'count'):
+        counts.setdefault(day, {})[metric] = count
+    metrics = [metric for metric, _ in Rollup.METRICS]
+    return {
+        'activity_days': days,
+        'activity_metrics': [label for _, label in Rollup.METRICS],
+        'activity_rows': [
+            (day, [counts[day].get(metric, 0) for metric in metrics])
+            for day in sorted(counts, reverse=True)
+        ],
+        'activity_totals': [
+            sum(row.get(metric, 0) for row in counts.values())
+            for metric in metrics
+        ],
+        'activity_tags': top_dimension(
+            DailyTagActivity, 'tag__name', since, limit
+        ),
+        'activity_authors': top_dimension(
+            DailyAuthorActivity, 'author__username', since, limit
+        ),
+        'activity_watermark': RollupWatermark.objects.filter(
+            name=DAILY
+        ).values_list('value', flat=True).first(),
+    }
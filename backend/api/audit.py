@@ -0,0 +1,174 @@
+import re
+
+from django.db import connections
+
+from .profiling import fingerprint
+
+SEQ_SCAN = 'Seq Scan'
+SORT = 'Sort'
+SORT_NODES = ('Sort', 'Incremental Sort')
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(?P<table>\w+)(?P<rest>.*)$')
+SQLITE_SORT = 'USE TEMP B-TREE FOR'
+SQLITE_INDEX = ('USING INDEX', 'USING COVERING INDEX', 'USING INTEGER')
+SQLITE_PSEUDO_TABLES = ('CONSTANT', 'SUBQUERY')
+UNUSED_INDEXES = '''
+    SELECT s.relname, s.indexrelname, pg_relation_size(s.indexrelid)
+    FROM pg_stat_user_indexes s
+    JOIN pg_index i ON i.indexrelid = s.indexrelid
+    WHERE s.idx_scan = 0 AND NOT i.indisunique AND NOT i.indisprimary
+    ORDER BY pg_relation_size(s.indexrelid) DESC
+'''
+SEQ_SCANNED_TABLES = '''
+    SELECT relname, seq_scan, seq_tup_read, COALESCE(idx_scan, 0),
+           n_live_tup
+    FROM pg_stat_user_tables
+    WHERE seq_scan > COALESCE(idx_scan, 0) AND n_live_tup >= %s
+    ORDER BY seq_tup_read DESC
+'''
+
+
+def postgresql_nodes(plan):
+    """
+    Узлы плана EXPLAIN (FORMAT JSON) в порядке обхода в глубину.
+    """
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from postgresql_nodes(child)
+
+
+def table_rows(cursor, table):
+    cursor.execute(
+        'SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [table]
+    )
+    row = cursor.fetchone()
+    # reltuples = -1: таблица ещё не анализировалась, размер неизвестен.
+    return int(row[0]) if row and row[0] >= 0 else None
+
+
+def postgresql_plan(connection, sql, params):
+    """
+    Последовательные чтения и сортировки из плана PostgreSQL. Для
+    чтения берётся оценка размера таблицы: полный проход по большой
+    таблице ради одной строки и есть кандидат на индекс.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0][0]['Plan']
+        nodes = []
+        for node in postgresql_nodes(plan):
+            if node['Node Type'] == SEQ_SCAN:
+                nodes.append({
+                    'node': SEQ_SCAN,
+                    'table': node['Relation Name'],
+                    'rows': table_rows(cursor, node['Relation Name']),
+                    'detail': node.get('Filter', ''),
+                })
+            elif node['Node Type'] in SORT_NODES:
+                nodes.append({
+                    'node': SORT,
+                    'table': None,
+                    'rows': int(node['Plan Rows']),
+                    'detail': ', '.join(node.get('Sort Key', ())),
+                })
+    return nodes
+
+
+def sqlite_plan(connection, sql, params):
+    """
+    Последовательные чтения и сортировки из EXPLAIN QUERY PLAN SQLite.
+    Оценок числа строк SQLite не даёт: для чтения берётся текущий размер
+    таблицы, размер сортировки неизвестен.
+    """
+    tables = set(connection.introspection.table_names())
+    nodes = []
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        details = [row[-1] for row in cursor.fetchall()]
+        for detail in details:
+            scan = SQLITE_SCAN.match(detail)
+            if (
+                scan
+                and scan.group('table').upper() not in SQLITE_PSEUDO_TABLES
+                and not any(word in detail for word in SQLITE_INDEX)
+            ):
+                table = scan.group('table')
+                rows = None
+                if table in tables:
+                    cursor.execute(
+                        'SELECT COUNT(*) FROM '
+                        + connection.ops.quote_name(table)
+                    )
+                    rows = cursor.fetchone()[0]
+                nodes.append({
+                    'node': SEQ_SCAN, 'table': table, 'rows': rows,
+                    'detail': detail,
+                })
+            elif detail.startswith(SQLITE_SORT):
+                nodes.append({
+                    'node': SORT, 'table': None, 'rows': None,
+                    'detail': detail,
+                })
+    return nodes
+
+
+PLANNERS = {
+    'postgresql': postgresql_plan,
+    'sqlite': sqlite_plan,
+}
+
+
+def plan_findings(queries, threshold):
+    """
+    Планы уникальных SELECT-запросов маршрута. Чтение или сортировка
+    попадает в находки, если строк не меньше threshold или их число
+    неизвестно.
+    """
+    plans = []
+    seen = set()
+    for query in queries:
+        connection = connections[query['alias']]
+        key = fingerprint(query['sql'])
+        planner = PLANNERS.get(connection.vendor)
+        if (
+            planner is None
+            or key in seen
+            or not query['sql'].lstrip().upper().startswith('SELECT')
+        ):
+            continue
+        seen.add(key)
+        findings = [
+            node for node in planner(connection, query['sql'], query['params'])
+            if node['rows'] is None or node['rows'] >= threshold
+        ]
+        plans.append({'sql': key, 'findings': findings})
+    return plans
+
+
+def index_usage(alias, threshold):
+    """
+    Статистика PostgreSQL с последнего сброса: неиспользуемые индексы,
+    кроме уникальных и первичных ключей, и таблицы от threshold строк,
+    которые читаются последовательно чаще, чем по индексу.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(UNUSED_INDEXES)
+        unused = [
+            {'table': table, 'index': index, 'size_bytes': size}
+            for table, index, size in cursor.fetchall()
+        ]
+        cursor.execute(SEQ_SCANNED_TABLES, [threshold])
+        seq_scanned = [
+            {
+                'table': table,
+                'seq_scan': seq_scan,
+                'seq_tup_read': seq_tup_read,
+                'idx_scan': idx_scan,
+                'rows': rows,
+            }
+            for table, seq_scan, seq_tup_read, idx_scan, rows
+            in cursor.fetchall()
+        ]
+    return {'unused_indexes': unused, 'seq_scanned_tables': seq_scanned}
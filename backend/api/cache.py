@@ -0,0 +1,305 @@
+import hashlib
+import math
+import random
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .fieldsets import requested_fields
+from .serializers import (
+    RECIPE_USER_FLAGS,
+    RecipeFragmentSerializer,
+    RecipeSerializer
+)
+
+FRAGMENT_KEY = 'recipe-fragment:v3:{pk}'
+LOCK_KEY = 'single-flight-lock:{key}'
+LIST_KEY = 'list:{model}:{query}'
+MODEL_VERSION_KEY = 'model-version:{model}'
+USER_FLAGS_VERSION_KEY = 'user-flags-version:{pk}'
+POLL_INTERVAL = 0.05
+FRAGMENT_FIELDS = frozenset(RecipeFragmentSerializer.Meta.fields)
+
+
+def fragment_key(pk):
+    return FRAGMENT_KEY.format(pk=pk)
+
+
+def make_entry(value, version, delta, timeout):
+    """
+    Запись кэша single-flight: значение, его версия, время пересчёта
+    и мягкий срок годности. Запись живёт ещё SINGLE_FLIGHT_STALE_TIMEOUT
+    секунд после него, чтобы её можно было отдать вместо пересчёта.
+    """
+    return {
+        'value': value,
+        'version': version,
+        'delta': delta,
+        'expires': time.time() + timeout,
+    }
+
+
+def is_fresh(entry, version):
+    """
+    Запись актуальна, если версия совпадает и срок не истёк.
+    Срок сдвигается на случайную величину, пропорциональную времени
+    пересчёта (XFetch): один из запросов незадолго до истечения
+    пересчитывает значение сам, пока остальные получают прежнее.
+    """
+    if entry is None or entry['version'] != version:
+        return False
+    early = -entry['delta'] * settings.SINGLE_FLIGHT_BETA * math.log(
+        1 - random.random()
+    )
+    return time.time() + early < entry['expires']
+
+
+def store(entries, timeout):
+    cache.set_many(entries, timeout + settings.SINGLE_FLIGHT_STALE_TIMEOUT)
+
+
+def acquire(key):
+    return cache.add(
+        LOCK_KEY.format(key=key), True, settings.SINGLE_FLIGHT_LOCK_TIMEOUT
+    )
+
+
+def release(keys):
+    cache.delete_many([LOCK_KEY.format(key=key) for key in keys])
+
+
+def wait_for(versions):
+    """
+    Ждёт до SINGLE_FLIGHT_WAIT секунд, пока другой процесс положит
+    в кэш записи нужных версий. Возвращает найденные записи.
+    """
+    found = {}
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT
+    while len(found) < len(versions) and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        for key, entry in cache.get_many(set(versions) - set(found)).items():
+            if entry['version'] == versions[key]:
+                found[key] = entry
+    return found
+
+
+def single_flight(key, compute, version=None, timeout=None):
+    """
+    Значение из кэша с защитой от лавины пересчётов. Пересчитывает
+    только процесс, взявший короткую блокировку cache.add, остальные
+    получают прежнее значение, а если его нет — ждут результата.
+    Возвращает значение и признак того, что оно актуальной версии.
+    """
+    timeout = timeout or settings.SINGLE_FLIGHT_TIMEOUT
+    entry = cache.get(key)
+    if is_fresh(entry, version):
+        return entry['value'], True
+    owner = acquire(key)
+    if not owner:
+        if entry is not None:
+            return entry['value'], entry['version'] == version
+        entry = wait_for({key: version}).get(key)
+        if entry is not None:
+            return entry['value'], True
+    try:
+        started = time.monotonic()
+        value = compute()
+        store({key: make_entry(
+            value, version, time.monotonic() - started, timeout
+        )}, timeout)
+    finally:
+        if owner:
+            release([key])
+    return value, True
+
+
+def model_version(model):
+    return cache.get_or_set(
+        MODEL_VERSION_KEY.format(model=model._meta.label_lower),
+        uuid4().hex,
+        None,
+    )
+
+
+def bump_model_version(model):
+    cache.set(
+        MODEL_VERSION_KEY.format(model=model._meta.label_lower),
+        uuid4().hex,
+        None,
+    )
+
+
+def user_flags_version(user):
+    """
+    Версия флагов пользователя (избранное, список покупок, подписки).
+    Меняется после фиксации любой их правки.
+    """
+    if not user.is_authenticated:
+        return None
+    return cache.get_or_set(
+        USER_FLAGS_VERSION_KEY.format(pk=user.pk), uuid4().hex, None
+    )
+
+
+def bump_user_flags_version(pk):
+    cache.set(USER_FLAGS_VERSION_KEY.format(pk=pk), uuid4().hex, None)
+
+
+def list_key(model, request):
+    return LIST_KEY.format(
+        model=model._meta.label_lower,
+        query=hashlib.md5(request.get_full_path().encode()).hexdigest(),
+    )
+
+
+def fragment_version(recipe):
+    return recipe.updated_at.isoformat()
+
+
+def build_fragments(recipes, fields=None):
+    return {
+        recipe.pk: dict(RecipeFragmentSerializer(recipe, fields=fields).data)
+        for recipe in recipes
+    }
+
+
+def compute_fragments(recipes, pks, load):
+    """
+    Фрагменты строятся без запроса: ссылка на изображение остаётся
+    относительной и дополняется хостом при выдаче ответа, поэтому
+    фрагмент одинаков для всех хостов, под которыми открыт сайт.
+    """
+    started = time.monotonic()
+    fragments = build_fragments(load(pks, FRAGMENT_FIELDS))
+    delta = (time.monotonic() - started) / max(len(fragments), 1)
+    store({
+        fragment_key(recipe.pk): make_entry(
+            fragments[recipe.pk], fragment_version(recipe), delta,
+            settings.RECIPE_FRAGMENT_TIMEOUT,
+        )
+        for recipe in recipes if recipe.pk in fragments
+    }, settings.RECIPE_FRAGMENT_TIMEOUT)
+    return fragments
+
+
+def sparse_fragments(recipes, cached, keys, versions, load, fields):
+    """
+    Фрагменты для ответа с частью полей: актуальные полные фрагменты
+    берутся из кэша, остальные строятся из строк, в которых выбраны
+    только колонки запрошенных полей. Неполные фрагменты в кэш
+    не кладутся.
+    """
+    fragments = {}
+    for pk, key in keys.items():
+        entry = cached.get(key)
+        if is_fresh(entry, versions[key]):
+            fragments[pk] = entry['value']
+    missing = [pk for pk in keys if pk not in fragments]
+    if missing:
+        fragments.update(build_fragments(load(missing, fields), fields))
+    return fragments, True
+
+
+def borrow(keys, cached, versions):
+    """
+    Записи, которые пересчитывает другой процесс: прежняя версия
+    из кэша, а если её нет — результат после ожидания. Возвращает
+    значения и признак того, что все они актуальны.
+    """
+    values, waiting = {}, {}
+    fresh = True
+    for key in keys:
+        entry = cached.get(key)
+        if entry is None:
+            waiting[key] = versions[key]
+            continue
+        values[key] = entry['value']
+        fresh = fresh and entry['version'] == versions[key]
+    if waiting:
+        values.update(
+            (key, entry['value']) for key, entry in wait_for(waiting).items()
+        )
+    return values, fresh
+
+
+def get_fragments(recipes, load, fields=FRAGMENT_FIELDS):
+    """
+    Общие части рецептов из кэша. Отсутствующие и устаревшие фрагменты
+    пересчитываются одним запросом через load(ids, fields) по принципу
+    single-flight: фрагменты, которые уже пересчитывает другой процесс,
+    берутся в прежней версии или после ожидания. Возвращает фрагменты
+    и признак того, что все они актуальны.
+    """
+    keys = {recipe.pk: fragment_key(recipe.pk) for recipe in recipes}
+    versions = {
+        keys[recipe.pk]: fragment_version(recipe) for recipe in recipes
+    }
+    cached = cache.get_many(keys.values())
+    if not FRAGMENT_FIELDS <= fields:
+        return sparse_fragments(recipes, cached, keys, versions, load, fields)
+    fragments, owned, busy = {}, [], []
+    for pk, key in keys.items():
+        entry = cached.get(key)
+        if is_fresh(entry, versions[key]):
+            fragments[pk] = entry['value']
+        elif acquire(key):
+            owned.append(key)
+        else:
+            busy.append(key)
+    borrowed, fresh = borrow(busy, cached, versions)
+    fragments.update(
+        (pk, borrowed[key]) for pk, key in keys.items() if key in borrowed
+    )
+    missing = [pk for pk in keys if pk not in fragments]
+    if missing:
+        try:
+            fragments.update(compute_fragments(
+                [recipe for recipe in recipes if recipe.pk in missing],
+                missing, load,
+            ))
+        finally:
+            release(owned)
+    return fragments, fresh
+
+
+def render_recipe(recipe, fragment, fields, request):
+    """
+    Ответ по рецепту: фрагмент из кэша с наложенными флагами
+    текущего пользователя, аннотированными в запросе страницы,
+    и абсолютной ссылкой на изображение.
+    """
+    data = {}
+    for name in RecipeSerializer.Meta.fields:
+        if name not in fields:
+            continue
+        if name in RECIPE_USER_FLAGS:
+            data[name] = getattr(recipe, name, False)
+        elif name == 'image' and fragment['image']:
+            data[name] = request.build_absolute_uri(fragment['image'])
+        elif name == 'author' and fragment['author'] is not None:
+            data[name] = dict(
+                fragment['author'],
+                is_subscribed=getattr(recipe, 'is_subscribed', False),
+            )
+        else:
+            data[name] = fragment[name]
+    return data
+
+
+def render_recipes(recipes, request, load):
+    """
+    Рецепты из фрагментов. Возвращает данные и признак того, что все
+    фрагменты актуальны: устаревший ответ не должен получать ETag.
+    """
+    fields = requested_fields(request, RecipeSerializer.Meta.fields)
+    fragments, fresh = get_fragments(recipes, load, fields)
+    return [
+        render_recipe(recipe, fragments[recipe.pk], fields, request)
+        for recipe in recipes if recipe.pk in fragments
+    ], fresh
+
+
+def invalidate_fragments(ids):
+    cache.delete_many([fragment_key(pk) for pk in ids])
@@ -0,0 +1,47 @@
+import hashlib
+
+from django.utils.cache import (
+    get_conditional_response,
+    patch_vary_headers,
+    quote_etag
+)
+from django.utils.http import http_date
+
+from .cache import user_flags_version
+
+
+def make_etag(request, *parts):
+    """
+    ETag ответа: состояние данных, флаги пользователя и параметры запроса.
+    """
+    parts += (
+        user_flags_version(request.user),
+        sorted(request.GET.lists()),
+    )
+    return quote_etag(
+        hashlib.md5(repr(parts).encode()).hexdigest()
+    )
+
+
+def last_modified_timestamp(request, updated_at):
+    """
+    Last-Modified отдается только анонимам: флаги авторизованного
+    пользователя меняются без изменения рецептов.
+    """
+    if updated_at is None or request.user.is_authenticated:
+        return None
+    return int(updated_at.timestamp())
+
+
+def not_modified_response(request, etag, last_modified=None):
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Authorization',))
+    return response
@@ -0,0 +1,38 @@
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def _split(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+def requested_fields(request, available):
+    """
+    Набор полей, запрошенных клиентом через ?fields= / ?omit=.
+    Неизвестные имена полей игнорируются.
+    """
+    available = set(available)
+    if request is None:
+        return available
+    params = getattr(request, 'query_params', request.GET)
+    fields = _split(params.get(FIELDS_PARAM)) & available
+    omit = _split(params.get(OMIT_PARAM))
+    return (fields or available) - omit
+
+
+class SparseFieldsetMixin:
+    """
+    Миксин сериализатора, оставляющий только запрошенные поля.
+    Применяется лишь к сериализатору верхнего уровня, получившему
+    контекст с запросом, вложенные сериализаторы не затрагиваются.
+    """
+    sparse_fieldsets = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = kwargs.get('context', {}).get('request')
+        if request is None or not self.sparse_fieldsets:
+            return
+        allowed = requested_fields(request, self.fields)
+        for name in set(self.fields) - allowed:
+            self.fields.pop(name)
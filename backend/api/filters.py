@@ -1,6 +1,7 @@
 from django_filters import rest_framework as filters
 
 from recipes.models import Ingredient, Recipe
+from recipes.trending import TRENDING, TRENDING_ORDERING
 
 
 class IngredientFilter(filters.FilterSet):
@@ -30,12 +31,22 @@ class RecipeFilter(filters.FilterSet):
         method='shopping_cart_filter'
     )
     tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    ordering = filters.CharFilter(method='ordering_filter')
 
     def favorite_filter(self, queryset, name, value):
-        return Recipe.objects.filter(favorite__user=self.request.user)
+        if value and self.request.user.is_authenticated:
+            return queryset.filter(favorite__user=self.request.user)
+        return queryset
 
     def shopping_cart_filter(self, queryset, name, value):
-        return Recipe.objects.filter(shopping_cart__user=self.request.user)
+        if value and self.request.user.is_authenticated:
+            return queryset.filter(shopping_cart__user=self.request.user)
+        return queryset
+
+    def ordering_filter(self, queryset, name, value):
+        if value == TRENDING:
+            return queryset.order_by(*TRENDING_ORDERING)
+        return queryset
 
     class Meta:
         model = Recipe
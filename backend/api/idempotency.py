@@ -0,0 +1,153 @@
+import hashlib
+import json
+import time
+import zlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.db import transaction
+from django.utils.datastructures import MultiValueDict
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+RESPONSE_KEY = 'idempotency:{user}:{key}'
+LOCK_KEY = 'idempotency-lock:{user}:{key}'
+STORED_HEADERS = ('Location',)
+KEY_MAX_LENGTH = 255
+KEY_TOO_LONG = 'Ключ идемпотентности длиннее {limit} символов'
+KEY_REUSED = 'Ключ идемпотентности уже использован с другим запросом'
+REQUEST_IN_PROGRESS = 'Запрос с этим ключом идемпотентности ещё выполняется'
+POLL_INTERVAL = 0.1
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = KEY_REUSED
+    default_code = 'idempotency_key_reused'
+
+
+class RequestInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = REQUEST_IN_PROGRESS
+    default_code = 'request_in_progress'
+
+
+def describe_value(value):
+    if isinstance(value, File):
+        return [value.name, value.size]
+    return str(value)
+
+
+def request_fingerprint(request):
+    """
+    Отпечаток запроса для сверки повторов: метод, путь и разобранные
+    данные request.data. Загруженные файлы повторно не читаются,
+    а учитываются по имени и размеру.
+    """
+    data = request.data
+    if isinstance(data, MultiValueDict):
+        data = dict(data.lists())
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.get_full_path().encode())
+    digest.update(json.dumps(
+        data, sort_keys=True, default=describe_value
+    ).encode())
+    return digest.hexdigest()
+
+
+def replay(entry):
+    return Response(
+        json.loads(zlib.decompress(entry['data'])),
+        status=entry['status'],
+        headers={**entry['headers'], REPLAYED_HEADER: 'true'},
+    )
+
+
+def wait_for_response(key):
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def stored_response(key, lock, fingerprint):
+    """
+    Сохранённый ответ на запрос с этим ключом. None означает, что
+    блокировка ключа получена и запрос нужно выполнить.
+    """
+    entry = cache.get(key)
+    if entry is None and not cache.add(
+        lock, fingerprint, settings.IDEMPOTENCY_LOCK_TIMEOUT
+    ):
+        entry = wait_for_response(key)
+        if entry is None:
+            raise RequestInProgress()
+    if entry is not None and entry['fingerprint'] != fingerprint:
+        raise IdempotencyKeyReused()
+    return entry
+
+
+def store_response(key, lock, fingerprint, response):
+    entry = {
+        'fingerprint': fingerprint,
+        'status': response.status_code,
+        'headers': {
+            name: response[name]
+            for name in STORED_HEADERS if response.has_header(name)
+        },
+        'data': zlib.compress(
+            json.dumps(response.data, cls=JSONEncoder).encode()
+        ),
+    }
+
+    def store():
+        if response.status_code < status.HTTP_500_INTERNAL_SERVER_ERROR:
+            cache.set(key, entry, settings.IDEMPOTENCY_TTL)
+        cache.delete(lock)
+
+    transaction.on_commit(store)
+
+
+def idempotent(view):
+    """
+    Поддержка заголовка Idempotency-Key у неидемпотентного действия.
+    Данные и статус первого ответа сохраняются в кэше в сжатом виде
+    на IDEMPOTENCY_TTL после фиксации транзакции и отдаются повторно
+    на запросы с тем же ключом, а рендерит их DRF. Параллельный дубль
+    ждёт первый ответ до IDEMPOTENCY_WAIT секунд под блокировкой
+    cache.add и получает 409, если не дождался.
+    """
+    @wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        idempotency_key = request.META.get(IDEMPOTENCY_HEADER)
+        if not idempotency_key or not request.user.is_authenticated:
+            return view(self, request, *args, **kwargs)
+        if len(idempotency_key) > KEY_MAX_LENGTH:
+            raise ValidationError(KEY_TOO_LONG.format(limit=KEY_MAX_LENGTH))
+        scope = {'user': request.user.pk, 'key': hashlib.sha256(
+            idempotency_key.encode()
+        ).hexdigest()}
+        key = RESPONSE_KEY.format(**scope)
+        lock = LOCK_KEY.format(**scope)
+        fingerprint = request_fingerprint(request)
+        entry = stored_response(key, lock, fingerprint)
+        if entry is not None:
+            return replay(entry)
+        try:
+            response = view(self, request, *args, **kwargs)
+        except Exception:
+            cache.delete(lock)
+            raise
+        store_response(key, lock, fingerprint, response)
+        return response
+    return wrapper
@@ -0,0 +1,196 @@
+import json
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.db.models import Count
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.audit import index_usage, plan_findings
+from api.profiling import QueryCollector
+from api.throttling import WARMUP_ENVIRON
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.trending import TRENDING
+from users.models import User
+
+# Запросы без кэша: иначе справочники и фрагменты рецептов отдаются
+# из кэша, и их SQL не попадает в аудит.
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+NO_DATA = 'Нет данных для аудита: нужны хотя бы пользователь и рецепт'
+FINDINGS_FOUND = 'Найдено проблемных узлов плана: {count}'
+
+
+def audit_url(name, args=None, params=None):
+    url = reverse(f'api:{name}', args=args)
+    return f'{url}?{urlencode(params, doseq=True)}' if params else url
+
+
+class Command(BaseCommand):
+    help = (
+        'Replays canonical API queries, runs EXPLAIN on them and reports '
+        'sequential scans, sorts and index usage'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows-threshold',
+            type=int,
+            default=settings.AUDIT_ROWS_THRESHOLD,
+            help='Flag scans and sorts over at least this many rows',
+        )
+        parser.add_argument(
+            '--format', choices=('text', 'json'), default='text'
+        )
+        parser.add_argument('--output', help='Write the report to a file')
+        parser.add_argument(
+            '--strict',
+            action='store_true',
+            help='Exit with an error when any plan node is flagged',
+        )
+
+    def routes(self):
+        """
+        Канонические запросы вьюсетов api/views.py и фильтров
+        api/filters.py на данных из базы. Авторизованные запросы
+        выполняются от пользователя с наибольшим числом подписок.
+        """
+        user = User.objects.annotate(
+            follows=Count('follower')
+        ).order_by('-follows', 'id').first()
+        recipe = Recipe.objects.order_by('-pub_date').first()
+        if user is None or recipe is None:
+            raise CommandError(NO_DATA)
+        tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        ingredient = Ingredient.objects.order_by('id').first()
+        prefix = ingredient.name[:2] if ingredient else 'а'
+        return [
+            ('recipes-list', audit_url('recipes-list'), None),
+            ('recipes-list tags', audit_url(
+                'recipes-list', params={'tags': tags}
+            ), None),
+            ('recipes-list author', audit_url(
+                'recipes-list', params={'author': recipe.author_id}
+            ), None),
+            ('recipes-list trending', audit_url(
+                'recipes-list', params={'ordering': TRENDING}
+            ), None),
+            ('recipes-list is_favorited', audit_url(
+                'recipes-list', params={'is_favorited': 1}
+            ), user),
+            ('recipes-list is_in_shopping_cart', audit_url(
+                'recipes-list', params={'is_in_shopping_cart': 1}
+            ), user),
+            ('recipes-detail', audit_url(
+                'recipes-detail', args=(recipe.pk,)
+            ), user),
+            ('recipes-similar', audit_url(
+                'recipes-similar', args=(recipe.pk,)
+            ), None),
+            ('recipes-download-shopping-cart', audit_url(
+                'recipes-download-shopping-cart'
+            ), user),
+            ('tags-list', audit_url('tags-list'), None),
+            ('ingredients-list name', audit_url(
+                'ingredients-list', params={'name': prefix}
+            ), None),
+            ('users-list', audit_url('users-list'), user),
+            ('users-detail', audit_url(
+                'users-detail', args=(recipe.author_id,)
+            ), user),
+            ('users-subscriptions', audit_url('users-subscriptions'), user),
+            ('users-suggestions', audit_url('users-suggestions'), user),
+        ]
+
+    def replay(self, url, user):
+        client = APIClient(**{WARMUP_ENVIRON: True})
+        if user is not None:
+            client.force_authenticate(user)
+        collector = QueryCollector()
+        with override_settings(CACHES=NO_CACHE), collector.capture():
+            response = client.get(url)
+        return response.status_code, collector.queries
+
+    def audit(self, threshold):
+        endpoints = []
+        for name, url, user in self.routes():
+            status, queries = self.replay(url, user)
+            endpoints.append({
+                'endpoint': name,
+                'url': url,
+                'authenticated': user is not None,
+                'status': status,
+                'queries': len(queries),
+                'plans': plan_findings(queries, threshold),
+            })
+        return {
+            'vendor': connection.vendor,
+            'rows_threshold': threshold,
+            'endpoints': endpoints,
+            'index_usage': index_usage(DEFAULT_DB_ALIAS, threshold),
+        }
+
+    def text_report(self, report):
+        lines = [
+            f'База данных: {report["vendor"]}, '
+            f'порог строк: {report["rows_threshold"]}'
+        ]
+        for endpoint in report['endpoints']:
+            lines.append(
+                f'{endpoint["endpoint"]} {endpoint["url"]}: '
+                f'HTTP {endpoint["status"]}, {endpoint["queries"]} запросов'
+            )
+            for plan in endpoint['plans']:
+                for node in plan['findings']:
+                    rows = '?' if node['rows'] is None else node['rows']
+                    lines.append(
+                        f'  {node["node"]} {node["table"] or ""} '
+                        f'(строк: {rows}) {node["detail"]}'
+                    )
+                    lines.append(f'    {plan["sql"][:200]}')
+        usage = report['index_usage']
+        if usage is None:
+            lines.append(
+                'Статистика индексов доступна только для PostgreSQL'
+            )
+            return '\n'.join(lines)
+        lines.append('Неиспользуемые индексы:')
+        lines.extend(
+            f'  {index["table"]}.{index["index"]} '
+            f'({index["size_bytes"]} байт)'
+            for index in usage['unused_indexes']
+        )
+        lines.append('Таблицы, читаемые последовательно чаще, чем по индексу:')
+        lines.extend(
+            f'  {table["table"]}: seq_scan {table["seq_scan"]}, '
+            f'idx_scan {table["idx_scan"]}, строк {table["rows"]}'
+            for table in usage['seq_scanned_tables']
+        )
+        return '\n'.join(lines)
+
+    def handle(self, *args, **options):
+        report = self.audit(options['rows_threshold'])
+        if options['format'] == 'json':
+            output = json.dumps(report, ensure_ascii=False, indent=2)
+        else:
+            output = self.text_report(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+        count = sum(
+            len(plan['findings'])
+            for endpoint in report['endpoints']
+            for plan in endpoint['plans']
+        )
+        if options['strict'] and count:
+            raise CommandError(FINDINGS_FOUND.format(count=count))
+        self.stderr.write(
+            self.style.WARNING(FINDINGS_FOUND.format(count=count)) if count
+            else self.style.SUCCESS(FINDINGS_FOUND.format(count=count))
+        )
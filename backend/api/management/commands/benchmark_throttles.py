@@ -0,0 +1,57 @@
+from time import perf_counter
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import UserRateThrottle
+
+from api.throttling import USER_READ, CostThrottle
+
+
+class BenchmarkView:
+    action = 'list'
+
+
+class BenchmarkUser(AnonymousUser):
+    is_authenticated = True
+
+    def __init__(self, pk):
+        self.pk = pk
+
+
+class BenchmarkRateThrottle(UserRateThrottle):
+    rate = '1000000/min'
+
+
+class Command(BaseCommand):
+    help = 'Measures per-request overhead of API throttling'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=10000)
+        parser.add_argument('--users', type=int, default=100)
+
+    def measure(self, throttle, requests):
+        view = BenchmarkView()
+        started = perf_counter()
+        for request in requests:
+            throttle.allow_request(request, view)
+        return (perf_counter() - started) / len(requests) * 1e6
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        requests = []
+        for number in range(options['requests']):
+            request = Request(factory.get('/api/recipes/'))
+            request.user = BenchmarkUser(number % options['users'])
+            requests.append(request)
+        cost_throttle = CostThrottle()
+        cost_throttle.get_rates = lambda: {USER_READ: '1000000/min'}
+        cost = self.measure(cost_throttle, requests)
+        simple = self.measure(BenchmarkRateThrottle(), requests)
+        self.stdout.write(self.style.SUCCESS(
+            f'CostThrottle: {cost:.1f} мкс на запрос, '
+            f'UserRateThrottle: {simple:.1f} мкс на запрос '
+            f'({options["requests"]} запросов, {options["users"]} '
+            f'пользователей)'
+        ))
@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations, islice
+from time import perf_counter
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from rest_framework.settings import api_settings
+
+from api.throttling import WARMUP_ENVIRON
+from recipes.models import Recipe, Tag
+from recipes.trending import TRENDING_ORDERING
+
+
+def tag_combinations(slugs, limit):
+    """
+    Наборы тэгов фильтра списка: без фильтра, затем по одному тэгу,
+    по два и так далее, не больше limit наборов.
+    """
+    every = (
+        combo for size in range(len(slugs) + 1)
+        for combo in combinations(slugs, size)
+    )
+    return list(islice(every, limit))
+
+
+class Command(BaseCommand):
+    help = 'Fills API caches after a deploy by issuing anonymous requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.CACHE_WARM_CONCURRENCY
+        )
+        parser.add_argument(
+            '--host',
+            default=settings.CACHE_WARM_HOST,
+            help='Host header of the warmup requests',
+        )
+        parser.add_argument(
+            '--pages', type=int, default=settings.CACHE_WARM_PAGES
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=settings.CACHE_WARM_RECIPES
+        )
+        parser.add_argument(
+            '--tag-combinations',
+            type=int,
+            default=settings.CACHE_WARM_TAG_COMBINATIONS,
+        )
+
+    def fetch(self, url):
+        client = Client(
+            raise_request_exception=False,
+            HTTP_HOST=self.host,
+            **{WARMUP_ENVIRON: True}
+        )
+        try:
+            return client.get(url).status_code < 500
+        finally:
+            connection.close()
+
+    def warm(self, pool, family, urls):
+        started = perf_counter()
+        results = list(pool.map(self.fetch, urls))
+        self.stdout.write(
+            f'{family}: {len(results)} запросов, '
+            f'ошибок {results.count(False)}, '
+            f'{perf_counter() - started:.2f} с'
+        )
+        return results.count(False)
+
+    def list_urls(self, options):
+        slugs = list(Tag.objects.values_list('slug', flat=True))
+        base = reverse('api:recipes-list')
+        return [
+            f'{base}?' + urlencode(
+                [('page', page), ('limit', api_settings.PAGE_SIZE)]
+                + [('tags', slug) for slug in combo]
+            )
+            for combo in tag_combinations(slugs, options['tag_combinations'])
+            for page in range(1, options['pages'] + 1)
+        ]
+
+    def handle(self, *args, **options):
+        self.host = options['host']
+        started = perf_counter()
+        families = (
+            ('Справочники', [
+                reverse('api:tags-list'), reverse('api:ingredients-list'),
+            ]),
+            ('Страницы списка рецептов', self.list_urls(options)),
+            ('Популярные рецепты', [
+                reverse('api:recipes-detail', args=(pk,))
+                for pk in Recipe.objects.order_by(
+                    *TRENDING_ORDERING
+                ).values_list('id', flat=True)[:options['recipes']]
+            ]),
+        )
+        with ThreadPoolExecutor(options['concurrency']) as pool:
+            errors = sum(
+                self.warm(pool, family, urls) for family, urls in families
+            )
+        connection.close()
+        message = (
+            f'Кэши прогреты за {perf_counter() - started:.2f} с, '
+            f'ошибок: {errors}'
+        )
+        self.stdout.write(
+            self.style.WARNING(message) if errors
+            else self.style.SUCCESS(message)
+        )
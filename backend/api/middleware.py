@@ -0,0 +1,166 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .profiling import QueryCollector, profile_request
+from .shedding import (
+    READ,
+    EndpointClass,
+    QueueMonitor,
+    endpoint_class,
+    queue_delay
+)
+from .throttling import EXPORT, UPLOAD, WRITE
+
+PROFILE_PARAM = '__profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+EXPLAIN = 'explain'
+LOG = 'log'
+RAISE = 'raise'
+NPLUSONE_MESSAGE = (
+    '{method} {path}: запрос выполнен {count} раз, вероятно N+1 '
+    '({origin}): {fingerprint}'
+)
+SERVICE_OVERLOADED = 'Сервер перегружен, повторите запрос позже'
+SHED_MESSAGE = (
+    '{method} {path}: запрос класса {name} отклонён, выполняется {in_flight}, '
+    'ожидание в очереди {delay}'
+)
+
+logger = logging.getLogger(__name__)
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def profiling_mode(request):
+    return request.GET.get(PROFILE_PARAM) or request.META.get(PROFILE_HEADER)
+
+
+def is_superuser(request):
+    """
+    Проверка суперпользователя до DRF: по сессии админки
+    или по токену из заголовка Authorization.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_superuser:
+        return True
+    try:
+        credentials = TokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return credentials is not None and credentials[0].is_superuser
+
+
+class ProfilerMiddleware:
+    """
+    Профилирование запроса по ?__profile=1 или заголовку X-Profile
+    для суперпользователей: вместо ответа возвращается отчёт
+    cProfile и SQL, значение explain добавляет EXPLAIN ANALYZE.
+    Без параметра стоимость сводится к проверке двух ключей.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = profiling_mode(request)
+        if not mode or not is_superuser(request):
+            return self.get_response(request)
+        _, report = profile_request(
+            self.get_response, request, with_explain=mode == EXPLAIN
+        )
+        return JsonResponse(report, json_dumps_params={'ensure_ascii': False})
+
+
+class NPlusOneMiddleware:
+    """
+    Поиск N+1: запросы с одинаковым отпечатком, повторённые в одном
+    HTTP-запросе больше NPLUSONE_THRESHOLD раз, пишутся в лог
+    (NPLUSONE_MODE = 'log') или прерывают запрос (NPLUSONE_MODE = 'raise',
+    для тестов). При пустом NPLUSONE_MODE middleware отключается.
+    """
+
+    def __init__(self, get_response):
+        if settings.NPLUSONE_MODE not in (LOG, RAISE):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        collector = QueryCollector(with_origin=True)
+        with collector.capture():
+            return self.check_queries(
+                request, self.get_response(request), collector
+            )
+
+    @staticmethod
+    def check_queries(request, response, collector):
+        for group in collector.repeated(settings.NPLUSONE_THRESHOLD):
+            message = NPLUSONE_MESSAGE.format(
+                method=request.method, path=request.get_full_path(), **group
+            )
+            if settings.NPLUSONE_MODE == RAISE:
+                raise NPlusOneError(message)
+            logger.warning(message)
+        return response
+
+
+class LoadSheddingMiddleware:
+    """
+    Защита от перегрузки. Число одновременных запросов каждого класса
+    в процессе ограничено LOAD_SHEDDING_LIMITS, а пока очередь перед
+    воркерами стоит дольше LOAD_SHEDDING_INTERVAL_MS с задержкой выше
+    LOAD_SHEDDING_TARGET_MS (CoDel), запросы классов
+    LOAD_SHEDDING_LOW_PRIORITY сразу получают 503 с Retry-After.
+    Чтение не ограничивается и остаётся отзывчивым.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.classes = {
+            name: EndpointClass(settings.LOAD_SHEDDING_LIMITS.get(name))
+            for name in (READ, WRITE, UPLOAD, EXPORT)
+        }
+        self.monitor = QueueMonitor(
+            settings.LOAD_SHEDDING_TARGET_MS / 1000,
+            settings.LOAD_SHEDDING_INTERVAL_MS / 1000,
+        )
+
+    def __call__(self, request):
+        started = time.time()
+        name = endpoint_class(request)
+        state = self.classes[name]
+        delay = queue_delay(request, started)
+        overloaded = delay is not None and self.monitor.observe(
+            delay, started
+        )
+        if (
+            overloaded and name in settings.LOAD_SHEDDING_LOW_PRIORITY
+        ) or not state.acquire():
+            return self.shed(request, name, state, delay)
+        try:
+            return self.get_response(request)
+        finally:
+            state.release(time.time() - started)
+
+    def shed(self, request, name, state, delay):
+        logger.warning(SHED_MESSAGE.format(
+            method=request.method,
+            path=request.path,
+            name=name,
+            in_flight=state.in_flight,
+            delay='неизвестно' if delay is None else f'{delay:.3f} с',
+        ))
+        response = JsonResponse(
+            {'detail': SERVICE_OVERLOADED},
+            status=503,
+            json_dumps_params={'ensure_ascii': False},
+        )
+        response['Retry-After'] = str(state.retry_after())
+        return response
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.db import transaction
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .cache import list_key, model_version, single_flight
+
+
+class AtomicWriteMixin:
+    """
+    Изменяющие запросы выполняются в одной транзакции вместе
+    с событиями outbox. Ответ с ошибкой откатывает транзакцию.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with transaction.atomic():
+            response = super().dispatch(request, *args, **kwargs)
+            if getattr(response, 'exception', False):
+                transaction.set_rollback(True)
+        return response
+
+
+class SingleFlightListMixin:
+    """
+    Список справочника из кэша с защитой от лавины пересчётов.
+    Версия списка меняется после фиксации любой правки модели,
+    до пересчёта запросы получают прежний список.
+    """
+
+    def list(self, request, *args, **kwargs):
+        model = self.get_queryset().model
+        compute = super().list
+        data, _ = single_flight(
+            list_key(model, request),
+            lambda: compute(request, *args, **kwargs).data,
+            version=model_version(model),
+            timeout=settings.REFERENCE_CACHE_TIMEOUT,
+        )
+        return Response(data)
@@ -0,0 +1,211 @@
+import cProfile
+import os
+import pstats
+import re
+import traceback
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+NUMBER = re.compile(r'\b\d+(\.\d+)?\b')
+STRING = re.compile(r"'(?:[^']|'')*'")
+PLACEHOLDER_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+SERIALIZER_FILES = ('serializers.py', 'fieldsets.py', 'uploads.py')
+INFRASTRUCTURE_FILES = ('profiling.py', 'middleware.py', 'testing.py')
+
+
+def fingerprint(sql):
+    """
+    Отпечаток запроса: литералы и списки параметров IN (...) заменены,
+    чтобы запросы, отличающиеся только значениями, совпадали.
+    """
+    sql = STRING.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    sql = PLACEHOLDER_LIST.sub('(...)', sql)
+    return ' '.join(sql.replace('%s', '?').split())
+
+
+def query_origin():
+    """
+    Ближайший к запросу кадр стека из кода проекта, например метод
+    get_<поле> сериализатора, породивший запрос.
+    """
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        if (
+            frame.filename.startswith(base_dir)
+            and os.path.basename(frame.filename) not in INFRASTRUCTURE_FILES
+        ):
+            return '{}:{} in {}'.format(
+                os.path.relpath(frame.filename, base_dir),
+                frame.lineno,
+                frame.name,
+            )
+    return None
+
+
+class QueryCollector:
+    """
+    Обёртка execute_wrapper, собирающая выполненные SQL-запросы
+    с длительностью. Подключается ко всем соединениям через capture().
+    С with_origin=True для каждого запроса запоминается место вызова.
+    """
+
+    def __init__(self, with_origin=False):
+        self.queries = []
+        self.with_origin = with_origin
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'params': params,
+                'duration': perf_counter() - started,
+                'origin': query_origin() if self.with_origin else None,
+            })
+
+    def capture(self):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    def repeated(self, threshold=1):
+        """
+        Отпечатки запросов, выполненных больше threshold раз,
+        с самым частым местом вызова.
+        """
+        groups = defaultdict(list)
+        for query in self.queries:
+            groups[fingerprint(query['sql'])].append(query)
+        return sorted((
+            {
+                'fingerprint': sql,
+                'count': len(queries),
+                'duration_ms': sum(
+                    query['duration'] for query in queries
+                ) * 1000,
+                'origin': Counter(
+                    query['origin'] for query in queries
+                ).most_common(1)[0][0],
+            }
+            for sql, queries in groups.items() if len(queries) > threshold
+        ), key=lambda group: -group['count'])
+
+
+def function_name(key):
+    filename, line, name = key
+    if filename.startswith(str(settings.BASE_DIR)):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    return f'{filename}:{line}({name})'
+
+
+def function_stats(profile, limit, predicate=None):
+    """
+    Функции с наибольшим суммарным временем (cumulative) из cProfile.
+    """
+    stats = pstats.Stats(profile).stats
+    rows = [
+        {
+            'function': function_name(key),
+            'calls': calls,
+            'tottime_ms': tottime * 1000,
+            'cumtime_ms': cumtime * 1000,
+        }
+        for key, (_, calls, tottime, cumtime, _) in stats.items()
+        if predicate is None or predicate(key)
+    ]
+    rows.sort(key=lambda row: -row['cumtime_ms'])
+    return rows[:limit]
+
+
+def is_serializer_code(key):
+    """
+    Код сериализаторов проекта: методы get_<поле> соответствуют
+    SerializerMethodField, to_representation вложенным сериализаторам.
+    """
+    filename = key[0]
+    return (
+        filename.startswith(str(settings.BASE_DIR))
+        and os.path.basename(filename) in SERIALIZER_FILES
+    )
+
+
+def explain(queries, limit):
+    """
+    EXPLAIN ANALYZE для самых долгих SELECT-запросов (только PostgreSQL).
+    Запросы выполняются повторно, поэтому отчёт строится по требованию.
+    """
+    plans = []
+    seen = set()
+    for query in sorted(queries, key=lambda query: -query['duration']):
+        if len(plans) == limit:
+            break
+        connection = connections[query['alias']]
+        key = fingerprint(query['sql'])
+        if (
+            connection.vendor != 'postgresql'
+            or key in seen
+            or not query['sql'].lstrip().upper().startswith('SELECT')
+        ):
+            continue
+        seen.add(key)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'EXPLAIN (ANALYZE, BUFFERS) ' + query['sql'], query['params']
+            )
+            plans.append({
+                'sql': query['sql'],
+                'plan': [row[0] for row in cursor.fetchall()],
+            })
+    return plans
+
+
+def profile_request(get_response, request, with_explain=False):
+    """
+    Выполняет запрос под cProfile с перехватом SQL и возвращает
+    ответ и отчёт о нём.
+    """
+    collector = QueryCollector()
+    profile = cProfile.Profile()
+    started = perf_counter()
+    with collector.capture():
+        profile.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profile.disable()
+    duration = perf_counter() - started
+    queries = collector.queries
+    report = {
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'duration_ms': duration * 1000,
+        'queries': {
+            'count': len(queries),
+            'duration_ms': sum(query['duration'] for query in queries) * 1000,
+            'statements': [
+                {
+                    'sql': query['sql'],
+                    'duration_ms': query['duration'] * 1000,
+                }
+                for query in queries
+            ],
+            'repeated': collector.repeated(),
+        },
+        'functions': function_stats(profile, settings.PROFILER_TOP_FUNCTIONS),
+        'serializers': function_stats(
+            profile, settings.PROFILER_TOP_FUNCTIONS, is_serializer_code
+        ),
+    }
+    if with_explain:
+        report['explain'] = explain(queries, settings.PROFILER_EXPLAIN_LIMIT)
+    return response, report
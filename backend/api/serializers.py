@@ -1,9 +1,13 @@
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
+from .fieldsets import SparseFieldsetMixin
+from .uploads import ImageUploadField
+from jobs.outbox import record_event
 from recipes.models import (
     AMOUNT_OF_INGREDIENTS,
     COCKING_TIME_MESSAGE,
@@ -14,10 +18,13 @@ from recipes.models import (
     ShoppingCart,
     Tag
 )
+from recipes.signals import INGREDIENTS_CHANGED
+from recipes.snapshots import refresh_snapshot
 from users.models import Follow, User
 
 ERROR_TAGS_FOR_INGREDIENT = 'Необходимо заполнить хотя бы один тэг для рецепта'
 ERROR_UNIQUE_INGREDIENT = 'Ингредиент(ы) "{value}" уже добавлен(ы) в рецепт'
+RECIPE_USER_FLAGS = ('is_favorited', 'is_in_shopping_cart')
 
 
 class CreateUserSerializer(UserCreateSerializer):
@@ -33,7 +40,7 @@ class CreateUserSerializer(UserCreateSerializer):
         extra_kwargs = {'password': {'write_only': True}}
 
 
-class ListUserSerializer(UserSerializer):
+class ListUserSerializer(SparseFieldsetMixin, UserSerializer):
     """
     Сериализатор для управления пользователями.
     """
@@ -51,12 +58,28 @@ class ListUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
         return Follow.objects.filter(
             user=user, author=obj
         ).exists() if user.is_authenticated else False
 
 
+class UserProfileSerializer(ListUserSerializer):
+    """
+    Сериализатор профиля пользователя со счетчиками,
+    вычисленными аннотациями запроса.
+    """
+    recipes_count = serializers.IntegerField(read_only=True)
+    followers_count = serializers.IntegerField(read_only=True)
+
+    class Meta(ListUserSerializer.Meta):
+        fields = ListUserSerializer.Meta.fields + (
+            'recipes_count', 'followers_count',
+        )
+
+
 class TagSerializer(serializers.ModelSerializer):
     """
     Сериализатор для тэгов.
@@ -113,17 +136,65 @@ class ReadIngredientsRecipeSerializer(serializers.ModelSerializer):
             fields=['ingredient', 'recipe'])]
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class SnapshotField(serializers.Field):
+    """
+    Поле рецепта, читаемое из снимка recipe.snapshot без обращения
+    к связанным таблицам. Пока снимок не собран или не выбран из базы,
+    значение строит запасной сериализатор по связанным моделям.
+    """
+
+    def __init__(self, fallback, **kwargs):
+        self.fallback = fallback
+        super().__init__(source='*', read_only=True, **kwargs)
+
+    def bind(self, field_name, parent):
+        super().bind(field_name, parent)
+        self.fallback.bind(field_name, parent)
+
+    def get_snapshot(self, recipe):
+        if 'snapshot' in recipe.get_deferred_fields():
+            return {}
+        return recipe.snapshot
+
+    def from_snapshot(self, recipe, value):
+        return value
+
+    def to_representation(self, recipe):
+        snapshot = self.get_snapshot(recipe)
+        if self.field_name in snapshot:
+            return self.from_snapshot(recipe, snapshot[self.field_name])
+        return self.fallback.to_representation(
+            self.fallback.get_attribute(recipe)
+        )
+
+
+class AuthorSnapshotField(SnapshotField):
+    """
+    Автор из снимка с флагом подписки текущего пользователя.
+    """
+
+    def from_snapshot(self, recipe, value):
+        if value is None:
+            return None
+        if hasattr(recipe, 'is_subscribed'):
+            return dict(value, is_subscribed=recipe.is_subscribed)
+        user = self.context['request'].user
+        return dict(value, is_subscribed=Follow.objects.filter(
+            user=user, author_id=recipe.author_id
+        ).exists() if user.is_authenticated else False)
+
+
+class RecipeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Сериализатор для рецептов.
     """
-    author = ListUserSerializer(read_only=True)
-    ingredients = ReadIngredientsRecipeSerializer(
+    author = AuthorSnapshotField(ListUserSerializer(read_only=True))
+    ingredients = SnapshotField(ReadIngredientsRecipeSerializer(
         many=True,
         read_only=True,
         source='amount_ingredient',
-    )
-    tags = TagSerializer(many=True)
+    ))
+    tags = SnapshotField(TagSerializer(many=True))
     is_in_shopping_cart = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     image = Base64ImageField(use_url=True, )
@@ -136,12 +207,16 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         return ShoppingCart.objects.filter(
             user=user, recipe=obj
         ).exists() if user.is_authenticated else False
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         return Favorite.objects.filter(
             user=user, recipe=obj
@@ -150,6 +225,42 @@ class RecipeSerializer(serializers.ModelSerializer):
         ) else False
 
 
+class AuthorFragmentSerializer(ListUserSerializer):
+    """
+    Автор рецепта без флага подписки текущего пользователя.
+    """
+
+    class Meta(ListUserSerializer.Meta):
+        fields = tuple(
+            name for name in ListUserSerializer.Meta.fields
+            if name != 'is_subscribed'
+        )
+
+
+class RecipeFragmentSerializer(RecipeSerializer):
+    """
+    Общая для всех пользователей часть рецепта, хранимая в кэше.
+    Пользовательские флаги накладываются при выдаче ответа.
+    """
+    sparse_fieldsets = False
+    author = SnapshotField(AuthorFragmentSerializer(read_only=True))
+    is_favorited = None
+    is_in_shopping_cart = None
+
+    class Meta(RecipeSerializer.Meta):
+        fields = tuple(
+            name for name in RecipeSerializer.Meta.fields
+            if name not in RECIPE_USER_FLAGS
+        )
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None:
+            return
+        for name in set(self.fields) - set(fields) - {'id'}:
+            self.fields.pop(name)
+
+
 class RecipeCreateSerializer(serializers.ModelSerializer):
     """
     Сериализатор для создания рецептов.
@@ -158,7 +269,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     tags = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True
     )
-    image = Base64ImageField(use_url=True, )
+    image = ImageUploadField(use_url=True, )
     cooking_time = serializers.IntegerField()
 
     class Meta:
@@ -211,6 +322,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             ingredient_list.append(recipe_ingredient)
         AmountIngredient.objects.bulk_create(ingredient_list)
 
+    @transaction.atomic
     def create(self, validated_data):
         """
         Создание рецепта.
@@ -220,9 +332,12 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         image = validated_data.pop('image')
         recipe = Recipe.objects.create(image=image, **validated_data)
         self.create_ingredients(ingredients_data, recipe)
+        record_event(INGREDIENTS_CHANGED, ids=[recipe.pk])
         recipe.tags.set(tags_data)
+        refresh_snapshot(recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
         """
         Редактирование рецепта.
@@ -231,8 +346,28 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         tags = validated_data.pop('tags')
         AmountIngredient.objects.filter(recipe=recipe).delete()
         self.create_ingredients(ingredients, recipe)
+        record_event(INGREDIENTS_CHANGED, ids=[recipe.pk])
         recipe.tags.set(tags)
-        return super().update(recipe, validated_data)
+        recipe = super().update(recipe, validated_data)
+        refresh_snapshot(recipe)
+        return recipe
+
+    def to_representation(self, recipe):
+        return RecipeSerializer(
+            recipe,
+            context={'request': self.context.get('request')}
+        ).data
+
+
+class RecipeImageSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для замены изображения рецепта.
+    """
+    image = ImageUploadField(use_url=True, )
+
+    class Meta:
+        model = Recipe
+        fields = ('image',)
 
     def to_representation(self, recipe):
         return RecipeSerializer(
@@ -280,14 +415,18 @@ class FollowSerializer(serializers.ModelSerializer):
     def get_recipes(self, obj):
         request = self.context.get('request')
         recipes_limit = request.GET.get('recipes_limit')
-        recipes = Recipe.objects.filter(author=obj.author)
+        recipes = obj.author.recipes.all()
         if recipes_limit:
             recipes = recipes[:int(recipes_limit)]
         serializer = RecipeForFollowersSerializer(recipes, many=True)
         return serializer.data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return Recipe.objects.filter(author=obj.author).count()
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return Follow.objects.filter(user=obj.user, author=obj.author).exists()
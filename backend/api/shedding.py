@@ -0,0 +1,132 @@
+import math
+import threading
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+from rest_framework.permissions import SAFE_METHODS
+
+from .throttling import EXPORT, UPLOAD, WRITE
+
+READ = 'read'
+REQUEST_START_HEADER = 'HTTP_X_REQUEST_START'
+REQUEST_START_PREFIX = 't='
+# POST на recipes-batch — чтение нескольких рецептов одним запросом.
+READ_ROUTES = ('api:recipes-batch',)
+EXPORT_ROUTES = ('api:recipes-download-shopping-cart',)
+UPLOAD_ROUTES = ('api:recipes-image',)
+UPLOAD_METHODS = {
+    'api:recipes-list': ('POST',),
+    'api:recipes-detail': ('PUT', 'PATCH'),
+}
+
+
+def endpoint_class(request):
+    """
+    Класс запроса для ограничения нагрузки: выгрузка списка покупок,
+    загрузка изображений (создание и изменение рецептов), прочая запись
+    и чтение.
+    """
+    if request.method in SAFE_METHODS and request.method != 'GET':
+        return READ
+    try:
+        route = resolve(request.path_info).view_name
+    except Resolver404:
+        return READ
+    if route in READ_ROUTES:
+        return READ
+    if route in EXPORT_ROUTES:
+        return EXPORT
+    if route in UPLOAD_ROUTES or request.method in UPLOAD_METHODS.get(
+        route, ()
+    ):
+        return UPLOAD
+    return READ if request.method in SAFE_METHODS else WRITE
+
+
+def queue_delay(request, now):
+    """
+    Время ожидания запроса в очереди до воркера по заголовку
+    X-Request-Start, который nginx выставляет в секундах с точностью
+    до миллисекунд (t=${msec}). Без заголовка — None.
+    """
+    value = request.META.get(REQUEST_START_HEADER, '')
+    if value.startswith(REQUEST_START_PREFIX):
+        value = value[len(REQUEST_START_PREFIX):]
+    try:
+        started = float(value)
+    except ValueError:
+        return None
+    return max(now - started, 0)
+
+
+class QueueMonitor:
+    """
+    Признак перегрузки по принципу CoDel: очередь считается стоячей,
+    если задержка в ней не опускалась ниже target в течение interval
+    секунд. Короткие всплески, которые очередь успевает разобрать,
+    перегрузкой не считаются.
+    """
+
+    def __init__(self, target, interval):
+        self.target = target
+        self.interval = interval
+        self.above_since = None
+        self.lock = threading.Lock()
+
+    def observe(self, delay, now):
+        with self.lock:
+            if delay < self.target:
+                self.above_since = None
+            elif self.above_since is None:
+                self.above_since = now
+            return self.overloaded(now)
+
+    def overloaded(self, now):
+        return (
+            self.above_since is not None
+            and now - self.above_since >= self.interval
+        )
+
+
+class EndpointClass:
+    """
+    Состояние класса запросов в процессе: семафор на limit одновременных
+    запросов (None — без ограничения), число выполняемых запросов
+    и экспоненциальное среднее их длительности.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.semaphore = (
+            threading.BoundedSemaphore(limit) if limit is not None else None
+        )
+        self.in_flight = 0
+        self.latency = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.semaphore is not None and not self.semaphore.acquire(
+            blocking=False
+        ):
+            return False
+        with self.lock:
+            self.in_flight += 1
+        return True
+
+    def release(self, duration):
+        with self.lock:
+            self.in_flight -= 1
+            self.latency += settings.LOAD_SHEDDING_LATENCY_WEIGHT * (
+                duration - self.latency
+            )
+        if self.semaphore is not None:
+            self.semaphore.release()
+
+    def retry_after(self):
+        """
+        Через сколько секунд повторить запрос: не раньше, чем обычно
+        освобождается место, то есть среднее время выполнения запроса.
+        """
+        return max(
+            settings.LOAD_SHEDDING_RETRY_AFTER, math.ceil(self.latency)
+        )
@@ -0,0 +1,52 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.signals import recipe_list_changed, recipes_changed
+from users.models import Follow
+
+from .cache import (
+    bump_model_version,
+    bump_user_flags_version,
+    invalidate_fragments
+)
+from .sse import publish_recipe
+
+
+@receiver(recipes_changed)
+def drop_recipe_fragments(sender, ids, **kwargs):
+    """
+    Фрагменты изменённых рецептов устаревают вместе с updated_at
+    и остаются в кэше: их отдают, пока свежие пересчитываются.
+    Удаляются только фрагменты удалённых рецептов.
+    """
+    invalidate_fragments(set(ids) - set(
+        Recipe.objects.filter(pk__in=ids).values_list('pk', flat=True)
+    ))
+
+
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+def reference_changed(sender, **kwargs):
+    transaction.on_commit(lambda: bump_model_version(sender))
+
+
+@receiver(recipe_list_changed)
+def recipe_list_version_changed(sender, **kwargs):
+    bump_model_version(sender)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Follow)
+def user_flags_changed(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: bump_user_flags_version(instance.user_id)
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def announce_recipe(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: publish_recipe(instance))
@@ -0,0 +1,292 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from functools import lru_cache
+from urllib.parse import parse_qs
+
+import psycopg2
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+from rest_framework.authtoken.models import Token
+
+from users.models import Follow
+
+logger = logging.getLogger(__name__)
+
+SSE_PATH = '/api/recipes/events/'
+CHANNEL = 'recipe_events'
+TOKEN_PARAM = 'token'
+TOKEN_PREFIX = b'token '
+RECIPE_EVENT = 'recipe'
+# Keepalive TCP: обрыв слушающего соединения без закрытия сокета
+# иначе не был бы замечен, и события перестали бы приходить.
+LISTENER_KEEPALIVES = {
+    'keepalives': 1,
+    'keepalives_idle': 30,
+    'keepalives_interval': 10,
+    'keepalives_count': 3,
+}
+SSE_HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+]
+
+
+class Subscription:
+    """
+    Подписка одного соединения: очередь событий и набор авторов.
+    """
+
+    def __init__(self, authors):
+        self.loop = asyncio.get_event_loop()
+        self.queue = asyncio.Queue(maxsize=settings.SSE_QUEUE_SIZE)
+        self.authors = set(authors)
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning('SSE subscriber is too slow, event dropped')
+
+
+class InProcessBroker:
+    """
+    Брокер внутри процесса: события доходят до соединений того же
+    процесса, что и публикация. Тысячи соединений обходятся в очередь
+    и корутину каждое, без отдельного потока.
+    """
+
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+
+    def subscribe(self, authors):
+        subscription = Subscription(authors)
+        for author in subscription.authors:
+            self.subscribers[author].add(subscription)
+        return subscription
+
+    def resubscribe(self, subscription, authors):
+        self.unsubscribe(subscription)
+        subscription.authors = set(authors)
+        for author in subscription.authors:
+            self.subscribers[author].add(subscription)
+
+    def unsubscribe(self, subscription):
+        for author in subscription.authors:
+            self.subscribers[author].discard(subscription)
+            if not self.subscribers[author]:
+                del self.subscribers[author]
+
+    def dispatch(self, message):
+        for subscription in list(self.subscribers.get(message['author'], ())):
+            subscription.loop.call_soon_threadsafe(
+                subscription.put, message
+            )
+
+    def publish(self, message):
+        self.dispatch(message)
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Брокер на LISTEN/NOTIFY PostgreSQL: публикация из любого процесса
+    (в том числе WSGI) доходит до всех процессов с SSE-соединениями.
+    Каждый процесс держит одно слушающее соединение, чтение которого
+    встроено в цикл событий через add_reader. Оборванное соединение
+    переоткрывается с экспоненциально растущей паузой; события,
+    опубликованные за время обрыва, теряются.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.listener = None
+        self.loop = None
+        self.reconnecting = False
+        self.reconnect_delay = settings.SSE_RECONNECT_MIN
+
+    def subscribe(self, authors):
+        if self.listener is None and not self.reconnecting:
+            self.loop = asyncio.get_event_loop()
+            self.listen()
+        return super().subscribe(authors)
+
+    def listen(self):
+        self.reconnecting = False
+        try:
+            listener = psycopg2.connect(
+                **connection.get_connection_params(), **LISTENER_KEEPALIVES
+            )
+            listener.autocommit = True
+            with listener.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+        except psycopg2.Error:
+            logger.exception('SSE listener failed to connect')
+            self.schedule_reconnect()
+            return
+        self.listener = listener
+        self.reconnect_delay = settings.SSE_RECONNECT_MIN
+        self.loop.add_reader(listener.fileno(), self.receive)
+
+    def disconnect(self):
+        try:
+            self.loop.remove_reader(self.listener.fileno())
+            self.listener.close()
+        except psycopg2.Error:
+            pass
+        self.listener = None
+
+    def schedule_reconnect(self):
+        self.reconnecting = True
+        self.loop.call_later(self.reconnect_delay, self.listen)
+        self.reconnect_delay = min(
+            self.reconnect_delay * 2, settings.SSE_RECONNECT_MAX
+        )
+
+    def receive(self):
+        try:
+            self.listener.poll()
+        except psycopg2.Error:
+            logger.warning(
+                'SSE listener connection lost, reconnecting in %s s',
+                self.reconnect_delay,
+            )
+            self.disconnect()
+            self.schedule_reconnect()
+            return
+        while self.listener.notifies:
+            notify = self.listener.notifies.pop(0)
+            self.dispatch(json.loads(notify.payload))
+
+    def publish(self, message):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_notify(%s, %s)', [CHANNEL, json.dumps(message)]
+            )
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    """
+    Брокер процесса из SSE_BROKER, а если он не задан — по базе данных:
+    LISTEN/NOTIFY на PostgreSQL, иначе брокер внутри процесса.
+    """
+    if settings.SSE_BROKER:
+        return import_string(settings.SSE_BROKER)()
+    if connection.vendor == 'postgresql':
+        return PostgresBroker()
+    return InProcessBroker()
+
+
+def publish_recipe(recipe):
+    """
+    Публикация выполняется после фиксации транзакции: ошибка брокера
+    не должна превращать уже сохранённый рецепт в ответ 500.
+    """
+    try:
+        get_broker().publish({
+            'id': recipe.pk,
+            'author': recipe.author_id,
+            'name': recipe.name,
+        })
+    except Exception:
+        logger.exception('Failed to publish recipe %s', recipe.pk)
+
+
+def get_token(scope):
+    for name, value in scope['headers']:
+        if name == b'authorization' and value.lower().startswith(
+            TOKEN_PREFIX
+        ):
+            return value[len(TOKEN_PREFIX):].decode().strip()
+    query = parse_qs(scope.get('query_string', b'').decode())
+    return query.get(TOKEN_PARAM, [None])[0]
+
+
+@sync_to_async
+def get_user_id(token):
+    return Token.objects.filter(
+        key=token, user__is_active=True
+    ).values_list('user_id', flat=True).first()
+
+
+@sync_to_async
+def get_followed_authors(user_id):
+    return list(Follow.objects.filter(user_id=user_id).values_list(
+        'author_id', flat=True
+    ))
+
+
+def format_event(message):
+    return (
+        f'id: {message["id"]}\n'
+        f'event: {RECIPE_EVENT}\n'
+        f'data: {json.dumps(message, ensure_ascii=False)}\n\n'
+    ).encode()
+
+
+async def wait_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def recipe_events(scope, receive, send):
+    """
+    ASGI-приложение потока SSE: новые рецепты авторов, на которых
+    подписан пользователь. Токен передаётся заголовком Authorization
+    или параметром ?token= (EventSource не умеет задавать заголовки).
+    """
+    token = get_token(scope)
+    user_id = await get_user_id(token) if token else None
+    if user_id is None:
+        await send({'type': 'http.response.start', 'status': 401})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    broker = get_broker()
+    subscription = broker.subscribe(await get_followed_authors(user_id))
+    disconnected = asyncio.ensure_future(wait_disconnect(receive))
+    loop = asyncio.get_event_loop()
+    refreshed = loop.time()
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': SSE_HEADERS,
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': f'retry: {settings.SSE_RETRY_MS}\n\n'.encode(),
+            'more_body': True,
+        })
+        while not disconnected.done():
+            event = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait(
+                (event, disconnected),
+                timeout=settings.SSE_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if event in done:
+                body = format_event(event.result())
+            else:
+                event.cancel()
+                body = b': ping\n\n'
+            if disconnected.done():
+                break
+            await send({
+                'type': 'http.response.body',
+                'body': body,
+                'more_body': True,
+            })
+            if loop.time() - refreshed > settings.SSE_FOLLOWS_REFRESH:
+                broker.resubscribe(
+                    subscription, await get_followed_authors(user_id)
+                )
+                refreshed = loop.time()
+    finally:
+        broker.unsubscribe(subscription)
+        disconnected.cancel()
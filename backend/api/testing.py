@@ -0,0 +1,90 @@
+from contextlib import contextmanager
+
+from django.urls import reverse
+
+from .profiling import QueryCollector
+from .urls import router_v1
+
+QUERY_BUDGET_EXCEEDED = (
+    '{label}: {count} SQL-запросов при бюджете {budget}, '
+    'повторяющиеся запросы: {repeated}'
+)
+ROUTES_WITHOUT_BUDGET = 'Не задан бюджет SQL-запросов для маршрутов: {names}'
+
+# Бюджеты SQL-запросов GET-маршрутов api/urls.py для авторизованного
+# пользователя при холодном кэше. Не зависят от размера страницы:
+# рост числа запросов с числом строк — это N+1.
+QUERY_BUDGETS = {
+    'users-list': 3,
+    'users-me': 2,
+    'users-detail': 2,
+    'users-subscriptions': 4,
+    'users-suggestions': 3,
+    'tags-list': 2,
+    'tags-detail': 2,
+    'ingredients-list': 2,
+    'ingredients-detail': 2,
+    'recipes-list': 5,
+    'recipes-detail': 4,
+    'recipes-similar': 5,
+    'recipes-download-shopping-cart': 3,
+}
+
+
+def api_read_routes():
+    """
+    Имена маршрутов роутера api, отвечающих на GET.
+    """
+    return {
+        pattern.name for pattern in router_v1.urls
+        if 'get' in getattr(pattern.callback, 'actions', {})
+    }
+
+
+@contextmanager
+def query_budget(budget, label='query budget'):
+    """
+    Проверка числа SQL-запросов в блоке; при превышении AssertionError
+    с отпечатками повторяющихся запросов и местом их вызова.
+    """
+    collector = QueryCollector(with_origin=True)
+    with collector.capture():
+        yield collector
+    count = len(collector.queries)
+    if count > budget:
+        raise AssertionError(QUERY_BUDGET_EXCEEDED.format(
+            label=label,
+            count=count,
+            budget=budget,
+            repeated=collector.repeated(),
+        ))
+
+
+class QueryBudgetMixin:
+    """
+    Миксин TestCase: assert_query_budget для произвольного блока
+    и assert_route_budgets для всех GET-маршрутов api. Для поиска N+1
+    в тестах включается NPLUSONE_MODE = 'raise'.
+    """
+    query_budgets = QUERY_BUDGETS
+
+    def assert_query_budget(self, budget, label='query budget'):
+        return query_budget(budget, label)
+
+    def assert_route_budgets(self, client, route_kwargs=None):
+        """
+        Запрашивает каждый GET-маршрут api клиентом client.
+        route_kwargs задаёт аргументы маршрутов с параметрами,
+        например {'recipes-detail': {'pk': recipe.pk}}.
+        """
+        missing = api_read_routes() - set(self.query_budgets)
+        self.assertFalse(missing, ROUTES_WITHOUT_BUDGET.format(
+            names=', '.join(sorted(missing))
+        ))
+        route_kwargs = route_kwargs or {}
+        for name, budget in self.query_budgets.items():
+            url = reverse(f'api:{name}', kwargs=route_kwargs.get(name))
+            with self.subTest(route=name):
+                with self.assert_query_budget(budget, f'GET {url}'):
+                    response = client.get(url)
+                self.assertLess(response.status_code, 500)
@@ -0,0 +1,110 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    AmountIngredient,
+    Favorite,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    Tag
+)
+from recipes.similarity import index_recipes
+from recipes.snapshots import refresh_snapshots
+from users.models import AuthorSuggestion, Follow, User
+
+AUTHORS = 3
+RECIPES_PER_AUTHOR = 3
+INGREDIENTS_PER_RECIPE = 3
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        password='Foodgram-test-1',
+        first_name=username.title(),
+        last_name='Test',
+    )
+
+
+class CatalogTestCase(TestCase):
+    """
+    Каталог для тестов API: авторы с рецептами, тэгами и ингредиентами,
+    подписки, избранное, список покупок, рекомендации и LSH-индекс
+    похожих рецептов. Загруженные файлы пишутся во временный MEDIA_ROOT.
+    """
+    client_class = APIClient
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.token = Token.objects.create(user=cls.user)
+        cls.authors = [create_user(f'author{i}') for i in range(AUTHORS)]
+        cls.tags = [
+            Tag.objects.create(name=slug, color=color, slug=slug)
+            for slug, color in (
+                ('breakfast', '#E26C2D'), ('dinner', '#49B64E')
+            )
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'ingredient{i}', measurement_unit='г'
+            )
+            for i in range(AUTHORS * RECIPES_PER_AUTHOR)
+        ]
+        cls.recipes = []
+        for number in range(AUTHORS * RECIPES_PER_AUTHOR):
+            recipe = Recipe.objects.create(
+                author=cls.authors[number % AUTHORS],
+                name=f'recipe{number}',
+                image='recipe/test.png',
+                text='text',
+                cooking_time=10,
+            )
+            recipe.tags.set(cls.tags[:number % 2 + 1])
+            AmountIngredient.objects.bulk_create(
+                AmountIngredient(
+                    recipe=recipe,
+                    ingredients=cls.ingredients[
+                        (number + shift) % len(cls.ingredients)
+                    ],
+                    amount=shift + 1,
+                )
+                for shift in range(INGREDIENTS_PER_RECIPE)
+            )
+            cls.recipes.append(recipe)
+        ids = [recipe.pk for recipe in cls.recipes]
+        refresh_snapshots(ids)
+        index_recipes(ids)
+        for author in cls.authors[:2]:
+            Follow.objects.create(user=cls.user, author=author)
+        Follow.objects.create(user=cls.authors[1], author=cls.authors[0])
+        for recipe in cls.recipes[:2]:
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        AuthorSuggestion.objects.create(
+            user=cls.user, author=cls.authors[2], score=1.0
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
@@ -0,0 +1,73 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from recipes.models import Favorite, Recipe
+
+from .base import CatalogTestCase, create_user
+
+CHANGELISTS = (
+    'recipes_recipe',
+    'recipes_favorite',
+    'recipes_shoppingcart',
+    'users_user',
+    'users_follow',
+    'users_authorsuggestion',
+)
+
+
+class AdminChangelistTest(CatalogTestCase):
+    """
+    Списки админки: число запросов не зависит от числа строк,
+    поиск по ингредиентам не размножает рецепты.
+    """
+
+    def setUp(self):
+        super().setUp()
+        admin = create_user('admin')
+        admin.is_staff = admin.is_superuser = True
+        admin.save()
+        self.client.force_login(admin)
+
+    def changelist(self, name, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                reverse(f'admin:{name}_changelist'), params
+            )
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_queries_do_not_grow_with_rows(self):
+        counts = {name: self.changelist(name)[1] for name in CHANGELISTS}
+        for recipe in self.recipes:
+            Favorite.objects.create(user=self.authors[2], recipe=recipe)
+            Recipe.objects.create(
+                author=self.authors[0], name=f'more {recipe.name}',
+                image='recipe/test.png', text='text', cooking_time=1,
+            )
+        for name in CHANGELISTS:
+            with self.subTest(changelist=name):
+                self.assertEqual(self.changelist(name)[1], counts[name])
+
+    def test_favorite_count(self):
+        response, _ = self.changelist('recipes_recipe', o='6')
+        counts = {
+            recipe.pk: recipe.favorite_count
+            for recipe in response.context['cl'].result_list
+        }
+        self.assertEqual(counts[self.recipes[0].pk], 1)
+        self.assertEqual(counts[self.recipes[5].pk], 0)
+
+    def test_search_by_ingredient(self):
+        # ingredient0 входит в три рецепта, в каждом одной строкой.
+        response, _ = self.changelist('recipes_recipe', q='ingredient0')
+        names = [
+            recipe.name for recipe in response.context['cl'].result_list
+        ]
+        self.assertCountEqual(names, ['recipe0', 'recipe7', 'recipe8'])
+
+    def test_search_by_cooking_time(self):
+        response, _ = self.changelist('recipes_recipe', q='10')
+        self.assertEqual(
+            response.context['cl'].result_count, len(self.recipes)
+        )
@@ -0,0 +1,131 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.test import TestCase
+
+from recipes.models import Recipe, Tag
+
+from ..audit import SEQ_SCAN, index_usage, plan_findings
+from ..profiling import QueryCollector
+from .base import CatalogTestCase
+
+
+def collect(*querysets):
+    collector = QueryCollector()
+    with collector.capture():
+        for queryset in querysets:
+            list(queryset)
+    return collector.queries
+
+
+class PlanFindingsTest(CatalogTestCase):
+    """
+    Разбор планов запросов: последовательные чтения от порога строк,
+    чтения по индексу не учитываются, одинаковые запросы
+    разбираются один раз.
+    """
+
+    def test_seq_scan(self):
+        plans = plan_findings(
+            collect(Recipe.objects.filter(text='text').order_by()),
+            threshold=1,
+        )
+        self.assertEqual(len(plans), 1)
+        self.assertEqual(
+            [(node['node'], node['table']) for node in plans[0]['findings']],
+            [(SEQ_SCAN, Recipe._meta.db_table)],
+        )
+
+    def test_threshold(self):
+        plans = plan_findings(
+            collect(Recipe.objects.filter(text='text').order_by()),
+            threshold=len(self.recipes) + 1,
+        )
+        self.assertEqual(plans[0]['findings'], [])
+
+    def test_index_lookup(self):
+        plans = plan_findings(
+            collect(Recipe.objects.filter(pk=self.recipes[0].pk)),
+            threshold=0,
+        )
+        self.assertEqual(plans[0]['findings'], [])
+
+    def test_same_fingerprint_once(self):
+        plans = plan_findings(collect(
+            Tag.objects.filter(slug='breakfast'),
+            Tag.objects.filter(slug='dinner'),
+        ), threshold=0)
+        self.assertEqual(len(plans), 1)
+
+    def test_only_select(self):
+        collector = QueryCollector()
+        with collector.capture():
+            Tag.objects.filter(slug='dinner').update(name='supper')
+        self.assertEqual(plan_findings(collector.queries, threshold=0), [])
+
+    def test_index_usage_postgresql_only(self):
+        if connection.vendor == 'postgresql':
+            self.assertIn(
+                'unused_indexes', index_usage(DEFAULT_DB_ALIAS, 0)
+            )
+        else:
+            self.assertIsNone(index_usage(DEFAULT_DB_ALIAS, 0))
+
+
+class AuditQueriesCommandTest(CatalogTestCase):
+    """
+    Команда audit_queries: отчёт по каноническим запросам API
+    в тексте и JSON, запись в файл и ошибка в режиме --strict.
+    """
+
+    def audit(self, *args):
+        output = StringIO()
+        call_command(
+            'audit_queries', *args, stdout=output, stderr=StringIO()
+        )
+        return output.getvalue()
+
+    def test_json(self):
+        report = json.loads(self.audit(
+            '--format', 'json', '--rows-threshold', '0'
+        ))
+        self.assertEqual(report['vendor'], connection.vendor)
+        self.assertEqual(report['rows_threshold'], 0)
+        endpoints = {
+            endpoint['endpoint']: endpoint
+            for endpoint in report['endpoints']
+        }
+        self.assertEqual(endpoints['tags-list']['status'], 200)
+        self.assertGreater(endpoints['tags-list']['queries'], 0)
+        self.assertTrue(endpoints['recipes-detail']['authenticated'])
+        self.assertFalse(endpoints['recipes-similar']['authenticated'])
+
+    def test_text(self):
+        output = self.audit()
+        self.assertIn(f'База данных: {connection.vendor}', output)
+        self.assertIn('tags-list', output)
+
+    def test_output_file(self):
+        descriptor, path = tempfile.mkstemp(suffix='.json')
+        os.close(descriptor)
+        self.addCleanup(os.remove, path)
+        self.assertEqual(
+            self.audit('--format', 'json', '--output', path), ''
+        )
+        with open(path, encoding='utf-8') as file:
+            self.assertIn('endpoints', json.load(file))
+
+    def test_strict(self):
+        with self.assertRaisesMessage(CommandError, 'Найдено'):
+            self.audit('--strict', '--rows-threshold', '0')
+
+
+class AuditQueriesNoDataTest(TestCase):
+
+    def test_no_data(self):
+        with self.assertRaisesMessage(CommandError, 'Нет данных'):
+            call_command('audit_queries', stdout=StringIO())
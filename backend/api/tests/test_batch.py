@@ -0,0 +1,69 @@
+from django.test import override_settings
+from django.urls import reverse
+
+from .base import CatalogTestCase
+
+
+class RecipesBatchTest(CatalogTestCase):
+    """
+    Рецепты по списку id: порядок как в запросе, ненайденные id
+    в missing, число запросов не зависит от длины списка.
+    """
+
+    def get_ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_get_keeps_order_and_reports_missing(self):
+        ids = [self.recipes[2].pk, self.recipes[0].pk, 0]
+        response = self.client.get(
+            reverse('api:recipes-list'),
+            {'ids': ','.join(map(str, ids))},
+        )
+        self.assertEqual(self.get_ids(response), ids[:2])
+        self.assertEqual(response.json()['missing'], [0])
+
+    def test_post_removes_duplicates(self):
+        pk = self.recipes[1].pk
+        response = self.client.post(
+            reverse('api:recipes-batch'), {'ids': [pk, pk]}, format='json'
+        )
+        self.assertEqual(self.get_ids(response), [pk])
+
+    def test_queries_do_not_grow_with_ids(self):
+        url = reverse('api:recipes-batch')
+        for recipes in (self.recipes[:1], self.recipes):
+            # Токен, рецепты, SAVEPOINT и RELEASE транзакции POST-запроса.
+            with self.assertNumQueries(4):
+                self.client.post(
+                    url,
+                    {'ids': [recipe.pk for recipe in recipes]},
+                    format='json',
+                )
+
+    def test_sparse_fields(self):
+        response = self.client.post(
+            reverse('api:recipes-batch') + '?fields=id,name',
+            {'ids': [self.recipes[0].pk]},
+            format='json',
+        )
+        self.assertEqual(
+            response.json()['results'],
+            [{'id': self.recipes[0].pk, 'name': self.recipes[0].name}],
+        )
+
+    def test_invalid_ids(self):
+        url = reverse('api:recipes-batch')
+        for ids in (None, [], 'abc', ['abc']):
+            with self.subTest(ids=ids):
+                response = self.client.post(url, {'ids': ids}, format='json')
+                self.assertEqual(response.status_code, 400)
+
+    @override_settings(RECIPES_BATCH_LIMIT=2)
+    def test_limit(self):
+        response = self.client.post(
+            reverse('api:recipes-batch'),
+            {'ids': [recipe.pk for recipe in self.recipes[:3]]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
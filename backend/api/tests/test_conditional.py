@@ -0,0 +1,68 @@
+from django.urls import reverse
+
+from recipes.models import Favorite, Recipe
+
+from .base import CatalogTestCase
+
+
+class ConditionalGetTest(CatalogTestCase):
+    """
+    Условный GET списка и рецепта: 304 без обращения к базе
+    за данными, новый ETag после правки рецептов и флагов.
+    """
+
+    def get_etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_list_not_modified(self):
+        url = reverse('api:recipes-list')
+        etag = self.get_etag(url)
+        # Запрос только за токеном авторизации.
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_list_etag_depends_on_query(self):
+        url = reverse('api:recipes-list')
+        response = self.client.get(
+            url, {'limit': 1}, HTTP_IF_NONE_MATCH=self.get_etag(url)
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_etag_changes_with_recipe(self):
+        url = reverse('api:recipes-list')
+        etag = self.get_etag(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.filter(pk=self.recipes[0].pk).get().save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_etag_changes_with_user_flags(self):
+        url = reverse('api:recipes-list')
+        etag = self.get_etag(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.user, recipe=self.recipes[5])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_not_modified(self):
+        url = reverse('api:recipes-detail', args=(self.recipes[0].pk,))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=self.get_etag(url))
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_last_modified_for_anonymous(self):
+        self.client.credentials()
+        url = reverse('api:recipes-detail', args=(self.recipes[0].pk,))
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_no_last_modified_for_user(self):
+        url = reverse('api:recipes-detail', args=(self.recipes[0].pk,))
+        self.assertNotIn('Last-Modified', self.client.get(url))
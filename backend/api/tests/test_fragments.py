@@ -0,0 +1,76 @@
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Recipe
+
+from ..cache import fragment_key
+from .base import CatalogTestCase
+
+
+class RecipeFragmentsTest(CatalogTestCase):
+    """
+    Общие фрагменты рецептов в кэше и флаги пользователя поверх них.
+    """
+
+    def get_recipes(self, **extra):
+        response = self.client.get(
+            reverse('api:recipes-list'), {'limit': 100}, **extra
+        )
+        self.assertEqual(response.status_code, 200)
+        return {
+            recipe['id']: recipe for recipe in response.json()['results']
+        }
+
+    def test_fragments_are_shared_between_users(self):
+        recipes = self.get_recipes()
+        for recipe in self.recipes:
+            self.assertIsNotNone(cache.get(fragment_key(recipe.pk)))
+        favorites = {recipe.pk for recipe in self.recipes[:2]}
+        for pk, recipe in recipes.items():
+            self.assertEqual(recipe['is_favorited'], pk in favorites)
+            self.assertEqual(recipe['is_in_shopping_cart'], pk in favorites)
+        token = Token.objects.create(user=self.authors[2])
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        # Токен, тэги фильтра, число рецептов и страница с флагами:
+        # фрагменты берутся из кэша.
+        with self.assertNumQueries(4):
+            other = self.get_recipes()
+        self.assertFalse(any(
+            recipe['is_favorited'] for recipe in other.values()
+        ))
+        self.assertEqual(
+            {pk: recipe['name'] for pk, recipe in other.items()},
+            {pk: recipe['name'] for pk, recipe in recipes.items()},
+        )
+
+    def test_author_subscription_flag(self):
+        recipes = self.get_recipes()
+        for recipe in self.recipes:
+            self.assertEqual(
+                recipes[recipe.pk]['author']['is_subscribed'],
+                recipe.author in self.authors[:2],
+            )
+
+    def test_anonymous_flags(self):
+        self.client.credentials()
+        for recipe in self.get_recipes().values():
+            self.assertFalse(recipe['is_favorited'])
+            self.assertFalse(recipe['is_in_shopping_cart'])
+            self.assertFalse(recipe['author']['is_subscribed'])
+
+    def test_changed_recipe_is_recomputed(self):
+        self.get_recipes()
+        recipe = Recipe.objects.get(pk=self.recipes[0].pk)
+        recipe.name = 'renamed'
+        recipe.save()
+        self.assertEqual(self.get_recipes()[recipe.pk]['name'], 'renamed')
+
+    def test_image_url_uses_request_host(self):
+        self.get_recipes()
+        recipe = self.get_recipes(
+            HTTP_HOST='mirror.example.com'
+        )[self.recipes[0].pk]
+        self.assertEqual(
+            recipe['image'], 'http://mirror.example.com/media/recipe/test.png'
+        )
@@ -0,0 +1,93 @@
+import hashlib
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+
+from recipes.models import Favorite, Recipe
+
+from ..idempotency import LOCK_KEY, REPLAYED_HEADER
+from .base import CatalogTestCase
+
+
+class IdempotencyTest(CatalogTestCase):
+    """
+    Повтор запроса с тем же Idempotency-Key получает сохранённый ответ,
+    а не выполняет действие второй раз.
+    """
+
+    def post(self, url, data=None, key='key', **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                url, data, HTTP_IDEMPOTENCY_KEY=key, **kwargs
+            )
+
+    def create_recipe(self, name='created', key='key'):
+        return self.post(reverse('api:recipes-list'), {
+            'name': name,
+            'text': 'text',
+            'cooking_time': 5,
+            'tags': [self.tags[0].pk],
+            'ingredients': [{'id': self.ingredients[0].pk, 'amount': 1}],
+            'image': self.image_data(),
+        }, key=key, format='json')
+
+    def image_data(self):
+        return (
+            'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAf'
+            'FcSJAAAADUlEQVR42mP8/5+hHgAHggJ/PchI7wAAAABJRU5ErkJggg=='
+        )
+
+    def test_replay(self):
+        first = self.create_recipe()
+        self.assertEqual(first.status_code, 201)
+        second = self.create_recipe()
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second[REPLAYED_HEADER], 'true')
+        self.assertEqual(second['Content-Type'], first['Content-Type'])
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(Recipe.objects.filter(name='created').count(), 1)
+
+    def test_other_key_executes(self):
+        self.create_recipe()
+        response = self.create_recipe(key='other')
+        self.assertNotIn(REPLAYED_HEADER, response)
+        self.assertEqual(Recipe.objects.filter(name='created').count(), 2)
+
+    def test_key_reused_with_other_request(self):
+        self.create_recipe()
+        response = self.create_recipe(name='changed')
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(Recipe.objects.filter(name='changed').exists())
+
+    def test_multipart(self):
+        url = reverse('api:recipes-favorite', args=(self.recipes[5].pk,))
+        first = self.post(url, {'note': 'x'}, format='multipart')
+        self.assertEqual(first.status_code, 201)
+        second = self.post(url, {'note': 'x'}, format='multipart')
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second[REPLAYED_HEADER], 'true')
+        self.assertEqual(
+            Favorite.objects.filter(recipe=self.recipes[5]).count(), 1
+        )
+
+    def test_exceptions_are_not_stored(self):
+        # Ошибки проверки данных не сохраняются: повтор выполняется заново.
+        for _ in range(2):
+            response = self.post(
+                reverse('api:recipes-list'), {'cooking_time': 0},
+                format='json',
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertNotIn(REPLAYED_HEADER, response)
+
+    @override_settings(IDEMPOTENCY_WAIT=0)
+    def test_request_in_progress(self):
+        url = reverse('api:recipes-favorite', args=(self.recipes[5].pk,))
+        cache.add(LOCK_KEY.format(
+            user=self.user.pk, key=hashlib.sha256(b'key').hexdigest()
+        ), 'fingerprint')
+        self.assertEqual(self.post(url).status_code, 409)
+        self.assertFalse(Favorite.objects.filter(
+            recipe=self.recipes[5]
+        ).exists())
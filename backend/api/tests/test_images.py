@@ -0,0 +1,79 @@
+import os
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.utils import timezone
+
+from recipes.models import ImageBlob, Recipe
+from recipes.storage import recipe_image_storage
+
+from .base import CatalogTestCase
+
+HOUR = 60 * 60
+
+
+class ContentAddressedImagesTest(CatalogTestCase):
+    """
+    Изображения по хэшу содержимого: один файл на одинаковое
+    содержимое, счетчик ссылок и сборка файлов без ссылок.
+    """
+
+    def set_image(self, recipe, content):
+        recipe = Recipe.objects.get(pk=recipe.pk)
+        recipe.image.save('photo.png', ContentFile(content), save=True)
+        return recipe.image.name
+
+    def references(self, name):
+        return ImageBlob.objects.get(name=name).references
+
+    def age(self, name, hours):
+        moment = time.time() - hours * HOUR
+        os.utime(recipe_image_storage.path(name), (moment, moment))
+        ImageBlob.objects.filter(name=name).update(
+            changed=timezone.now() - timedelta(hours=hours)
+        )
+
+    def collect(self):
+        call_command('gc_images', grace_hours=1, stdout=StringIO())
+
+    def test_same_content_is_stored_once(self):
+        first = self.set_image(self.recipes[0], b'same')
+        second = self.set_image(self.recipes[1], b'same')
+        self.assertEqual(first, second)
+        self.assertEqual(self.references(first), 2)
+        self.assertEqual(
+            len(os.listdir(os.path.dirname(recipe_image_storage.path(first)))),
+            1,
+        )
+
+    def test_replaced_image_is_released(self):
+        old = self.set_image(self.recipes[0], b'old')
+        new = self.set_image(self.recipes[0], b'new')
+        self.assertEqual(self.references(old), 0)
+        self.assertEqual(self.references(new), 1)
+
+    def test_gc_deletes_only_old_orphans(self):
+        used = self.set_image(self.recipes[0], b'used')
+        orphan = self.set_image(self.recipes[1], b'orphan')
+        recent = self.set_image(self.recipes[2], b'recent')
+        self.set_image(self.recipes[1], b'other')
+        self.set_image(self.recipes[2], b'other')
+        for name in (used, orphan):
+            self.age(name, 2)
+        self.collect()
+        self.assertTrue(recipe_image_storage.exists(used))
+        self.assertTrue(recipe_image_storage.exists(recent))
+        self.assertFalse(recipe_image_storage.exists(orphan))
+        self.assertFalse(ImageBlob.objects.filter(name=orphan).exists())
+
+    def test_reupload_protects_orphan(self):
+        orphan = self.set_image(self.recipes[0], b'orphan')
+        self.set_image(self.recipes[0], b'other')
+        self.age(orphan, 2)
+        # Повторная загрузка до сохранения рецепта, который на нее сошлется.
+        recipe_image_storage.save('recipe/photo.png', ContentFile(b'orphan'))
+        self.collect()
+        self.assertTrue(recipe_image_storage.exists(orphan))
@@ -0,0 +1,98 @@
+import json
+import os
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+
+from recipes.models import Ingredient, Recipe, RecipeBucket
+
+from .base import CatalogTestCase
+
+
+def recipe_state(recipe):
+    return {
+        'name': recipe.name,
+        'author': recipe.author.username,
+        'tags': sorted(tag.slug for tag in recipe.tags.all()),
+        'ingredients': sorted(
+            (line.ingredients.name, line.amount)
+            for line in recipe.amount_ingredient.all()
+        ),
+        'image': recipe.image.name,
+        'pub_date': recipe.pub_date,
+    }
+
+
+class ImportExportTest(CatalogTestCase):
+    """
+    Выгрузка и загрузка рецептов в JSON Lines.
+    """
+
+    def export(self, **options):
+        output = os.path.join(self.media_root, 'recipes.jsonl')
+        call_command(
+            'export_recipes', output=output, stderr=StringIO(), **options
+        )
+        with open(output, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def import_lines(self, records, **options):
+        path = os.path.join(self.media_root, 'import.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.writelines(json.dumps(record) + '\n' for record in records)
+        stderr = StringIO()
+        call_command(
+            'import_recipes', input=path, stdout=StringIO(), stderr=stderr,
+            **options
+        )
+        return stderr.getvalue()
+
+    def test_round_trip(self):
+        before = [recipe_state(recipe) for recipe in self.recipes]
+        records = self.export(chunk_size=4)
+        self.assertEqual(len(records), len(self.recipes))
+        Recipe.objects.all().delete()
+        self.assertEqual(self.import_lines(records, chunk_size=4), '')
+        after = [
+            recipe_state(recipe)
+            for recipe in Recipe.objects.order_by('pub_date', 'id')
+        ]
+        self.assertCountEqual(after, before)
+        imported = Recipe.objects.all()
+        self.assertFalse(imported.filter(snapshot={}).exists())
+        self.assertEqual(
+            RecipeBucket.objects.filter(recipe__in=imported).values(
+                'recipe'
+            ).distinct().count(),
+            len(self.recipes),
+        )
+
+    def test_embedded_image(self):
+        recipe = self.recipes[0]
+        recipe.image.save('photo.png', ContentFile(b'image'), save=True)
+        Recipe.objects.exclude(pk=recipe.pk).delete()
+        records = self.export(images='embed')
+        Recipe.objects.all().delete()
+        self.import_lines(records)
+        imported = Recipe.objects.get()
+        with imported.image.open('rb') as file:
+            self.assertEqual(file.read(), b'image')
+
+    def test_failed_chunk_does_not_stop_import(self):
+        record = self.export()[0]
+        line = {'name': 'salt', 'measurement_unit': 'г', 'amount': 1}
+        broken = dict(
+            record, name='broken',
+            ingredients=[dict(line, amount=None)],
+        )
+        good = dict(record, name='good', ingredients=[line])
+        errors = self.import_lines([broken, good], chunk_size=1)
+        self.assertIn('строки 1', errors)
+        self.assertFalse(Recipe.objects.filter(name='broken').exists())
+        recipe = Recipe.objects.get(name='good')
+        self.assertEqual(
+            list(recipe.ingredients.values_list('name', flat=True)),
+            ['salt'],
+        )
+        self.assertEqual(Ingredient.objects.filter(name='salt').count(), 1)
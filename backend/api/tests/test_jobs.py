@@ -0,0 +1,196 @@
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from jobs.models import Job
+from jobs.queue import (
+    claim_jobs,
+    enqueue,
+    heartbeat,
+    job,
+    requeue_stale_jobs,
+    run_job
+)
+from recipes.images import process_image
+from recipes.models import Recipe
+from recipes.tasks import process_recipe_image
+
+from .base import CatalogTestCase
+from .test_uploads import make_image
+
+ORIENTATION = 0x0112
+ROTATED = 6
+
+calls = []
+
+
+@job
+def record_call(fail=False):
+    if fail:
+        raise ValueError('fail')
+    calls.append(True)
+
+
+# Тесты идут в транзакции, которую close_old_connections закрыл бы.
+@mock.patch('jobs.queue.close_old_connections', mock.Mock())
+class JobQueueTest(TestCase):
+    """
+    Захват, повтор и возврат в очередь задач с истекшей арендой.
+    """
+
+    def setUp(self):
+        calls.clear()
+
+    def claim(self, **payload):
+        created = enqueue(record_call.job_name, **payload)
+        self.assertEqual(claim_jobs(10), [created.pk])
+        return Job.objects.get(pk=created.pk)
+
+    def expire(self, job):
+        Job.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - timedelta(
+                seconds=settings.JOB_LEASE_TIMEOUT + 1
+            )
+        )
+
+    def test_unique(self):
+        first = record_call.enqueue(unique=True)
+        self.assertEqual(record_call.enqueue(unique=True), first)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_claim(self):
+        job = self.claim()
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.heartbeat_at)
+        self.assertEqual(claim_jobs(10), [])
+
+    def test_countdown(self):
+        record_call.enqueue(countdown=60)
+        self.assertEqual(claim_jobs(10), [])
+
+    def test_run(self):
+        job = self.claim()
+        self.assertTrue(run_job(job.pk))
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.DONE)
+        self.assertEqual(calls, [True])
+
+    def test_retry_then_fail(self):
+        job = self.claim(fail=True)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertFalse(run_job(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('ValueError', job.last_error)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, attempts=job.max_attempts
+        )
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            run_job(job.pk)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.FAILED)
+
+    def test_live_lease_is_kept(self):
+        job = self.claim()
+        self.expire(job)
+        self.assertEqual(heartbeat([job.pk]), 1)
+        self.assertEqual(requeue_stale_jobs(), 0)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.RUNNING)
+
+    def test_expired_lease_is_requeued(self):
+        job = self.claim()
+        self.expire(job)
+        self.assertEqual(requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_at, timezone.now())
+
+    def test_expired_lease_fails_at_limit(self):
+        job = self.claim()
+        Job.objects.filter(pk=job.pk).update(attempts=job.max_attempts)
+        self.expire(job)
+        self.assertEqual(requeue_stale_jobs(), 0)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.FAILED)
+
+
+def make_rotated_image():
+    image = Image.new('RGB', (4, 2), 'white')
+    exif = image.getexif()
+    exif[ORIENTATION] = ROTATED
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+class ImageProcessingTest(CatalogTestCase):
+    """
+    Загрузка изображения ставит обработку в очередь, задача
+    поворачивает изображение по EXIF и удаляет метаданные.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.recipes[0]
+        token = Token.objects.create(user=self.recipe.author)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def queued(self):
+        return list(Job.objects.filter(
+            name=process_recipe_image.job_name
+        ).values_list('payload', flat=True))
+
+    def test_upload_enqueues_processing(self):
+        response = self.client.put(
+            reverse('api:recipes-image', args=(self.recipe.pk,)),
+            make_image(),
+            content_type='image/png',
+        )
+        self.assertEqual(response.status_code, 200)
+        name = Recipe.objects.get(pk=self.recipe.pk).image.name
+        self.assertEqual(
+            self.queued(), [{'recipe_id': self.recipe.pk, 'image': name}]
+        )
+
+    def test_update_without_image_does_not_enqueue(self):
+        response = self.client.patch(
+            reverse('api:recipes-detail', args=(self.recipe.pk,)),
+            {
+                'cooking_time': 5,
+                'tags': [self.tags[0].pk],
+                'ingredients': [{'id': self.ingredients[0].pk, 'amount': 1}],
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.queued(), [])
+
+    def test_process_image(self):
+        self.recipe.image.save(
+            'photo.jpg', ContentFile(make_rotated_image()), save=True
+        )
+        original = self.recipe.image.name
+        self.assertTrue(process_image(self.recipe.pk, original))
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertNotEqual(recipe.image.name, original)
+        with recipe.image.open('rb') as file:
+            image = Image.open(file)
+            self.assertEqual(image.size, (2, 4))
+            self.assertFalse(image.getexif())
+        self.assertFalse(process_image(self.recipe.pk, original))
+
+    def test_image_without_metadata_is_kept(self):
+        self.recipe.image.save(
+            'photo.png', ContentFile(make_image()), save=True
+        )
+        name = self.recipe.image.name
+        self.assertFalse(process_image(self.recipe.pk, name))
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).image, name)
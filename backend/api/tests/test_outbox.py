@@ -0,0 +1,140 @@
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from jobs.models import Event
+from jobs.outbox import consume_events, record_event, subscriber
+from recipes.models import AmountIngredient, Recipe
+from recipes.signals import INGREDIENTS_CHANGED, RECIPES_CHANGED
+
+from .base import CatalogTestCase
+
+TOPIC = 'tests.outbox'
+
+handled = []
+
+
+@subscriber(TOPIC)
+def handle(payloads):
+    if any(payload.get('fail') for payload in payloads):
+        raise ValueError('fail')
+    handled.extend(payload['value'] for payload in payloads)
+
+
+class OutboxTest(TestCase):
+    """
+    Захват событий под аренду, повтор упавших пачек по одному
+    и ограничение числа попыток.
+    """
+
+    def setUp(self):
+        handled.clear()
+
+    def consume(self):
+        with self.assertLogs('jobs.outbox', 'ERROR'):
+            return consume_events()
+
+    def test_consume(self):
+        first = record_event(TOPIC, value=1)
+        record_event(TOPIC, value=2)
+        self.assertEqual(consume_events(), 2)
+        self.assertEqual(handled, [1, 2])
+        first.refresh_from_db()
+        self.assertIsNotNone(first.processed_at)
+        self.assertIsNone(first.locked_until)
+        self.assertEqual(first.attempts, 1)
+        self.assertEqual(consume_events(), 0)
+
+    def test_failed_event_does_not_block_batch(self):
+        record_event(TOPIC, value=1)
+        failed = record_event(TOPIC, value=2, fail=True)
+        self.assertEqual(self.consume(), 1)
+        self.assertEqual(handled, [1])
+        failed.refresh_from_db()
+        self.assertIsNone(failed.processed_at)
+        self.assertGreater(failed.locked_until, timezone.now())
+        self.assertIn('ValueError', failed.last_error)
+        # До истечения задержки событие не захватывается повторно.
+        self.assertEqual(consume_events(), 0)
+
+    def test_attempts_are_limited(self):
+        failed = record_event(TOPIC, value=1, fail=True)
+        Event.objects.filter(pk=failed.pk).update(
+            attempts=settings.OUTBOX_MAX_ATTEMPTS - 1
+        )
+        self.assertEqual(self.consume(), 0)
+        Event.objects.filter(pk=failed.pk).update(locked_until=None)
+        self.assertEqual(consume_events(), 0)
+        failed.refresh_from_db()
+        self.assertEqual(failed.attempts, settings.OUTBOX_MAX_ATTEMPTS)
+
+    def test_expired_claim_is_retried(self):
+        event = record_event(TOPIC, value=1)
+        Event.objects.filter(pk=event.pk).update(
+            locked_until=timezone.now(), attempts=1
+        )
+        self.assertEqual(consume_events(), 1)
+        event.refresh_from_db()
+        self.assertEqual(event.attempts, 2)
+
+
+class RecipeEventsTest(CatalogTestCase):
+    """
+    События об изменении рецептов пишутся один раз на рецепт,
+    а не на каждую строку состава.
+    """
+
+    def events(self, topic):
+        return list(Event.objects.filter(
+            topic=topic, processed_at__isnull=True
+        ).values_list('payload', flat=True))
+
+    def test_update_records_ingredients_once(self):
+        recipe = self.recipes[0]
+        token = Token.objects.create(user=recipe.author)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        Event.objects.all().delete()
+        response = self.client.patch(
+            reverse('api:recipes-detail', args=(recipe.pk,)),
+            {
+                'tags': [self.tags[0].pk],
+                'ingredients': [
+                    {'id': ingredient.pk, 'amount': 1}
+                    for ingredient in self.ingredients[:5]
+                ],
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.events(INGREDIENTS_CHANGED), [{'ids': [recipe.pk]}]
+        )
+
+    def test_ingredient_rows_are_fast_deleted(self):
+        with CaptureQueriesContext(connection) as context:
+            AmountIngredient.objects.filter(recipe=self.recipes[0]).delete()
+        self.assertEqual(len(context.captured_queries), 1)
+
+    def test_ingredient_delete_reindexes_recipes(self):
+        ingredient = self.ingredients[0]
+        ids = set(ingredient.recipes.values_list('id', flat=True))
+        Event.objects.all().delete()
+        ingredient.delete()
+        [payload] = self.events(INGREDIENTS_CHANGED)
+        self.assertEqual(set(payload['ids']), ids)
+
+    def test_author_password_does_not_touch_recipes(self):
+        author = self.authors[0]
+        Event.objects.all().delete()
+        author.set_password('Foodgram-test-2')
+        author.save()
+        self.assertEqual(self.events(RECIPES_CHANGED), [])
+        author.first_name = 'Renamed'
+        author.save()
+        self.assertEqual(self.events(RECIPES_CHANGED), [{'ids': list(
+            Recipe.objects.filter(author=author).values_list('id', flat=True)
+        )}])
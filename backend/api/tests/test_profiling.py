@@ -0,0 +1,87 @@
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from ..profiling import QueryCollector, fingerprint
+from .base import CatalogTestCase, create_user
+
+
+class FingerprintTest(SimpleTestCase):
+    """
+    Отпечатки запросов совпадают, если запросы отличаются
+    только значениями.
+    """
+
+    def test_literals(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE a = 1 AND b = 'x''y'"),
+            'SELECT * FROM t WHERE a = ? AND b = ?',
+        )
+
+    def test_placeholder_lists(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+            'SELECT * FROM t WHERE id IN (...)',
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s,%s)'),
+            'SELECT * FROM t WHERE id IN (...)',
+        )
+
+
+class ProfilerMiddlewareTest(CatalogTestCase):
+    """
+    Отчёт профилировщика по ?__profile=1 только для суперпользователей.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('api:recipes-list')
+
+    def login_superuser(self):
+        admin = create_user('admin')
+        admin.is_staff = admin.is_superuser = True
+        admin.save()
+        token = Token.objects.create(user=admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_ignored_for_regular_users(self):
+        response = self.client.get(self.url, {'__profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('results', response.json())
+
+    def test_report(self):
+        self.login_superuser()
+        response = self.client.get(self.url, {'__profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(report['status'], 200)
+        self.assertEqual(report['path'], f'{self.url}?__profile=1')
+        self.assertEqual(
+            report['queries']['count'],
+            len(report['queries']['statements']),
+        )
+        self.assertGreater(report['queries']['count'], 0)
+        self.assertTrue(report['functions'])
+        self.assertNotIn('explain', report)
+
+    def test_header(self):
+        self.login_superuser()
+        response = self.client.get(self.url, HTTP_X_PROFILE='explain')
+        self.assertIn('explain', response.json())
+
+
+class QueryCollectorTest(CatalogTestCase):
+    """
+    Повторяющиеся запросы группируются по отпечатку с местом вызова.
+    """
+
+    def test_repeated(self):
+        collector = QueryCollector(with_origin=True)
+        with collector.capture():
+            for recipe in self.recipes[:3]:
+                list(recipe.tags.all())
+        [group] = collector.repeated(2)
+        self.assertEqual(group['count'], 3)
+        self.assertIn('test_profiling.py', group['origin'])
+        self.assertEqual(collector.repeated(3), [])
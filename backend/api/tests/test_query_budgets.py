@@ -0,0 +1,60 @@
+from django.test import override_settings
+
+from recipes.models import AmountIngredient, Recipe
+from recipes.similarity import index_recipes
+from recipes.snapshots import refresh_snapshots
+
+from ..testing import QueryBudgetMixin
+from .base import CatalogTestCase
+
+EXTRA_RECIPES = 10
+
+
+@override_settings(NPLUSONE_MODE='raise')
+class QueryBudgetsTest(QueryBudgetMixin, CatalogTestCase):
+    """
+    Бюджеты SQL-запросов QUERY_BUDGETS для всех GET-маршрутов api
+    при холодном кэше; повторяющиеся запросы прерывают запрос.
+    """
+
+    def route_kwargs(self):
+        recipe = {'pk': self.recipes[0].pk}
+        return {
+            'users-detail': {'id': self.authors[0].pk},
+            'tags-detail': {'pk': self.tags[0].pk},
+            'ingredients-detail': {'pk': self.ingredients[0].pk},
+            'recipes-detail': recipe,
+            'recipes-similar': recipe,
+        }
+
+    def test_route_budgets(self):
+        self.assert_route_budgets(self.client, self.route_kwargs())
+
+    def test_route_budgets_do_not_grow_with_catalog(self):
+        recipes = []
+        for number in range(EXTRA_RECIPES):
+            recipe = Recipe.objects.create(
+                author=self.authors[0],
+                name=f'extra{number}',
+                image='recipe/test.png',
+                text='text',
+                cooking_time=5,
+            )
+            recipe.tags.set(self.tags)
+            AmountIngredient.objects.bulk_create(
+                AmountIngredient(
+                    recipe=recipe, ingredients=ingredient, amount=1
+                )
+                for ingredient in self.ingredients[:3]
+            )
+            recipes.append(recipe)
+        ids = [recipe.pk for recipe in recipes]
+        refresh_snapshots(ids)
+        index_recipes(ids)
+        self.assert_route_budgets(self.client, self.route_kwargs())
+
+    def test_exceeded_budget_fails(self):
+        with self.assertRaises(AssertionError):
+            with self.assert_query_budget(1):
+                list(Recipe.objects.all())
+                list(Recipe.objects.all())
@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.test import override_settings
+from django.utils import timezone
+
+from analytics.models import (
+    DailyActivity,
+    DailyAuthorActivity,
+    DailyTagActivity,
+    Rollup
+)
+from analytics.rollups import activity_dashboard, start_of_day, update_rollups
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow
+
+from .base import CatalogTestCase
+
+DAYS_AGO = 3
+
+
+class RollupsTest(CatalogTestCase):
+    """
+    Дневные сводки активности: подсчёт по показателям, тэгам и авторам,
+    повторный пересчёт и досчёт от сохранённой границы.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.past = start_of_day(
+            timezone.now() - timedelta(days=DAYS_AGO)
+        ) + timedelta(hours=12)
+        self.day = timezone.localdate(self.past)
+        Recipe.objects.update(pub_date=self.past)
+        for model in (Favorite, ShoppingCart, Follow):
+            model.objects.update(created=self.past)
+
+    def totals(self, day=None):
+        return dict(DailyActivity.objects.filter(
+            day=day or self.day
+        ).values_list('metric', 'count'))
+
+    def test_daily_totals(self):
+        # Подписка без даты появилась до миграции и не учитывается.
+        Follow.objects.filter(user=self.authors[1]).update(created=None)
+        update_rollups()
+        self.assertEqual(self.totals(), {
+            Rollup.RECIPES: len(self.recipes),
+            Rollup.FAVORITES: 2,
+            Rollup.SHOPPING_CARTS: 2,
+            Rollup.FOLLOWS: 2,
+        })
+
+    def test_dimensions(self):
+        update_rollups()
+        tags = dict(DailyTagActivity.objects.filter(
+            metric=Rollup.RECIPES
+        ).values_list('tag__slug', 'count'))
+        self.assertEqual(tags, {'breakfast': 9, 'dinner': 4})
+        authors = dict(DailyAuthorActivity.objects.filter(
+            metric=Rollup.FOLLOWS
+        ).values_list('author__username', 'count'))
+        self.assertEqual(authors, {'author0': 2, 'author1': 1})
+
+    @override_settings(ROLLUP_CHUNK_DAYS=1)
+    def test_rebuild_is_idempotent(self):
+        self.assertGreaterEqual(update_rollups(), DAYS_AGO)
+        before = list(DailyActivity.objects.values_list(
+            'day', 'metric', 'count'
+        ).order_by('day', 'metric'))
+        update_rollups(rebuild=True)
+        self.assertEqual(list(DailyActivity.objects.values_list(
+            'day', 'metric', 'count'
+        ).order_by('day', 'metric')), before)
+
+    @override_settings(ROLLUP_LAG_MINUTES=0)
+    def test_incremental(self):
+        update_rollups()
+        Favorite.objects.create(user=self.authors[2], recipe=self.recipes[5])
+        update_rollups()
+        self.assertEqual(
+            self.totals(timezone.localdate())[Rollup.FAVORITES], 1
+        )
+        self.assertEqual(self.totals()[Rollup.FAVORITES], 2)
+
+    def test_dashboard(self):
+        update_rollups()
+        dashboard = activity_dashboard(days=DAYS_AGO + 1, limit=1)
+        metrics = [metric for metric, _ in Rollup.METRICS]
+        self.assertEqual(
+            dashboard['activity_totals'][metrics.index(Rollup.RECIPES)],
+            len(self.recipes),
+        )
+        self.assertEqual(dashboard['activity_rows'][0][0], self.day)
+        for _, top in dashboard['activity_authors']:
+            self.assertLessEqual(len(top), 1)
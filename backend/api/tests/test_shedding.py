@@ -0,0 +1,207 @@
+import time
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from ..middleware import SERVICE_OVERLOADED, LoadSheddingMiddleware
+from ..shedding import (
+    READ,
+    EndpointClass,
+    QueueMonitor,
+    endpoint_class,
+    queue_delay
+)
+from ..throttling import EXPORT, UPLOAD, WRITE
+from .base import CatalogTestCase
+
+LOGGER = 'api.middleware'
+
+
+class EndpointClassTest(SimpleTestCase):
+    """
+    Классы запросов: выгрузка, загрузка изображений, запись и чтение.
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def classify(self, method, name, args=()):
+        path = reverse(f'api:{name}', args=args)
+        return endpoint_class(getattr(self.factory, method)(path))
+
+    def test_classes(self):
+        for method, name, args, expected in (
+            ('get', 'recipes-list', (), READ),
+            ('head', 'recipes-list', (), READ),
+            ('post', 'recipes-batch', (), READ),
+            ('get', 'recipes-download-shopping-cart', (), EXPORT),
+            ('post', 'recipes-list', (), UPLOAD),
+            ('patch', 'recipes-detail', (1,), UPLOAD),
+            ('put', 'recipes-image', (1,), UPLOAD),
+            ('delete', 'recipes-detail', (1,), WRITE),
+            ('post', 'recipes-favorite', (1,), WRITE),
+        ):
+            with self.subTest(method=method, name=name):
+                self.assertEqual(self.classify(method, name, args), expected)
+
+    def test_unknown_route(self):
+        self.assertEqual(
+            endpoint_class(self.factory.post('/not-found/')), READ
+        )
+
+
+class QueueDelayTest(SimpleTestCase):
+
+    def delay(self, **meta):
+        return queue_delay(RequestFactory().get('/', **meta), now=100.0)
+
+    def test_header(self):
+        self.assertAlmostEqual(
+            self.delay(HTTP_X_REQUEST_START='t=99.750'), 0.25
+        )
+        self.assertAlmostEqual(
+            self.delay(HTTP_X_REQUEST_START='99.5'), 0.5
+        )
+        # Часы прокси могут спешить.
+        self.assertEqual(self.delay(HTTP_X_REQUEST_START='t=101'), 0)
+
+    def test_missing(self):
+        self.assertIsNone(self.delay())
+        self.assertIsNone(self.delay(HTTP_X_REQUEST_START='t=now'))
+
+
+class QueueMonitorTest(SimpleTestCase):
+    """
+    CoDel: перегрузка только если задержка не опускалась ниже target
+    в течение interval.
+    """
+
+    def setUp(self):
+        self.monitor = QueueMonitor(target=0.1, interval=1.0)
+
+    def test_short_burst(self):
+        self.assertFalse(self.monitor.observe(0.5, now=0))
+        self.assertFalse(self.monitor.observe(0.5, now=0.9))
+        self.assertFalse(self.monitor.observe(0.05, now=1.0))
+        self.assertIsNone(self.monitor.above_since)
+
+    def test_standing_queue(self):
+        self.assertFalse(self.monitor.observe(0.5, now=0))
+        self.assertTrue(self.monitor.observe(0.2, now=1.0))
+        self.assertEqual(self.monitor.above_since, 0)
+
+    def test_recovery(self):
+        self.monitor.observe(0.5, now=0)
+        self.assertTrue(self.monitor.observe(0.5, now=2.0))
+        self.assertFalse(self.monitor.observe(0.01, now=2.1))
+        self.assertFalse(self.monitor.observe(0.5, now=2.2))
+
+
+class EndpointClassStateTest(SimpleTestCase):
+
+    def test_limit(self):
+        state = EndpointClass(limit=1)
+        self.assertTrue(state.acquire())
+        self.assertFalse(state.acquire())
+        self.assertEqual(state.in_flight, 1)
+        state.release(duration=0)
+        self.assertTrue(state.acquire())
+
+    def test_unlimited(self):
+        state = EndpointClass(limit=None)
+        self.assertTrue(all(state.acquire() for _ in range(10)))
+        self.assertEqual(state.in_flight, 10)
+
+    @override_settings(
+        LOAD_SHEDDING_RETRY_AFTER=5, LOAD_SHEDDING_LATENCY_WEIGHT=1
+    )
+    def test_retry_after(self):
+        state = EndpointClass(limit=1)
+        self.assertEqual(state.retry_after(), 5)
+        state.acquire()
+        state.release(duration=12.3)
+        self.assertEqual(state.retry_after(), 13)
+
+
+@override_settings(
+    LOAD_SHEDDING_LIMITS={EXPORT: 1},
+    LOAD_SHEDDING_LOW_PRIORITY=(EXPORT, UPLOAD),
+    LOAD_SHEDDING_TARGET_MS=100,
+    LOAD_SHEDDING_INTERVAL_MS=0,
+    LOAD_SHEDDING_RETRY_AFTER=5,
+)
+class LoadSheddingMiddlewareTest(SimpleTestCase):
+    """
+    Отказ 503 с Retry-After при исчерпании лимита класса и при стоячей
+    очереди для низкоприоритетных классов; чтение проходит.
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.get_response = mock.Mock(return_value=HttpResponse())
+        self.middleware = LoadSheddingMiddleware(self.get_response)
+
+    def request(self, name, method='get', delay=None):
+        meta = {}
+        if delay is not None:
+            meta['HTTP_X_REQUEST_START'] = f't={time.time() - delay:.3f}'
+        return getattr(self.factory, method)(
+            reverse(f'api:{name}'), **meta
+        )
+
+    def assert_shed(self, response):
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertIn(SERVICE_OVERLOADED, response.content.decode())
+
+    def test_passes(self):
+        response = self.middleware(
+            self.request('recipes-download-shopping-cart', delay=0.01)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.middleware.classes[EXPORT].in_flight, 0)
+
+    def test_limit_reached(self):
+        self.middleware.classes[EXPORT].acquire()
+        with self.assertLogs(LOGGER, 'WARNING'):
+            self.assert_shed(self.middleware(
+                self.request('recipes-download-shopping-cart')
+            ))
+        self.get_response.assert_not_called()
+
+    def test_standing_queue(self):
+        with self.assertLogs(LOGGER, 'WARNING'):
+            self.assert_shed(self.middleware(
+                self.request('recipes-download-shopping-cart', delay=1)
+            ))
+        self.assertEqual(
+            self.middleware(
+                self.request('recipes-list', delay=1)
+            ).status_code,
+            200,
+        )
+        self.assertEqual(
+            self.middleware(
+                self.request('recipes-batch', 'post', delay=1)
+            ).status_code,
+            200,
+        )
+
+
+class LoadSheddingResponseTest(CatalogTestCase):
+
+    @override_settings(LOAD_SHEDDING_INTERVAL_MS=0)
+    def test_overloaded_export(self):
+        start = {'HTTP_X_REQUEST_START': f't={time.time() - 1:.3f}'}
+        with self.assertLogs(LOGGER, 'WARNING'):
+            response = self.client.get(
+                reverse('api:recipes-download-shopping-cart'), **start
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(
+            self.client.get(reverse('api:tags-list'), **start).status_code,
+            200,
+        )
@@ -0,0 +1,77 @@
+from django.urls import reverse
+
+from recipes.models import AmountIngredient, Recipe, RecipeBucket
+from recipes.similarity import BANDS, index_recipes, similar_recipe_ids
+
+from .base import CatalogTestCase
+
+
+class SimilarRecipesTest(CatalogTestCase):
+    """
+    Похожие рецепты из LSH-индекса: рецепт с тем же набором
+    ингредиентов первый, рецепты без общих ингредиентов не попадают.
+    """
+
+    def create_twin(self, recipe):
+        twin = Recipe.objects.create(
+            author=self.authors[2],
+            name='twin',
+            image='recipe/test.png',
+            text='text',
+            cooking_time=5,
+        )
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(
+                recipe=twin, ingredients=line.ingredients, amount=line.amount
+            )
+            for line in recipe.amount_ingredient.all()
+        )
+        index_recipes([twin.pk])
+        return twin
+
+    def ingredient_ids(self, recipe):
+        return set(recipe.amount_ingredient.values_list(
+            'ingredients_id', flat=True
+        ))
+
+    def test_index_has_band_per_recipe(self):
+        self.assertEqual(
+            RecipeBucket.objects.filter(recipe=self.recipes[0]).count(),
+            BANDS,
+        )
+
+    def test_identical_recipe_first(self):
+        recipe = self.recipes[0]
+        twin = self.create_twin(recipe)
+        response = self.client.get(
+            reverse('api:recipes-similar', args=(recipe.pk,))
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data[0]['id'], twin.pk)
+        self.assertEqual(
+            set(data[0]), {'id', 'name', 'image', 'cooking_time'}
+        )
+
+    def test_only_overlapping_recipes(self):
+        recipe = self.recipes[0]
+        own = self.ingredient_ids(recipe)
+        for pk in similar_recipe_ids(recipe.pk):
+            self.assertNotEqual(pk, recipe.pk)
+            self.assertTrue(
+                own & self.ingredient_ids(Recipe.objects.get(pk=pk))
+            )
+
+    def test_reindex_after_ingredients_change(self):
+        recipe = self.recipes[0]
+        twin = self.create_twin(recipe)
+        twin.amount_ingredient.all().delete()
+        AmountIngredient.objects.create(
+            recipe=twin, ingredients=self.ingredients[5], amount=1
+        )
+        index_recipes([twin.pk])
+        self.assertNotIn(twin.pk, similar_recipe_ids(recipe.pk))
+
+    def test_missing_recipe(self):
+        response = self.client.get(reverse('api:recipes-similar', args=(0,)))
+        self.assertEqual(response.status_code, 404)
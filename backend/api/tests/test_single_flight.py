@@ -0,0 +1,111 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from recipes.models import Tag
+
+from ..cache import LOCK_KEY, acquire, make_entry, release, single_flight
+from .base import CatalogTestCase
+
+KEY = 'single-flight-test'
+
+
+class SingleFlightTest(SimpleTestCase):
+    """
+    Пересчёт значения одним процессом: свежая запись не пересчитывается,
+    при смене версии пересчитывает владелец блокировки, остальные
+    получают прежнее значение.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.compute = mock.Mock(side_effect=['first', 'second'])
+
+    def test_fresh_entry_is_reused(self):
+        self.assertEqual(
+            single_flight(KEY, self.compute, version=1), ('first', True)
+        )
+        self.assertEqual(
+            single_flight(KEY, self.compute, version=1), ('first', True)
+        )
+        self.assertEqual(self.compute.call_count, 1)
+        self.assertIsNone(cache.get(LOCK_KEY.format(key=KEY)))
+
+    def test_new_version_is_recomputed(self):
+        single_flight(KEY, self.compute, version=1)
+        self.assertEqual(
+            single_flight(KEY, self.compute, version=2), ('second', True)
+        )
+        self.assertEqual(cache.get(KEY)['version'], 2)
+
+    def test_expired_entry_is_recomputed(self):
+        cache.set(KEY, make_entry('old', 1, 0, timeout=-1))
+        self.assertEqual(
+            single_flight(KEY, self.compute, version=1), ('first', True)
+        )
+
+    def test_stale_value_while_locked(self):
+        single_flight(KEY, self.compute, version=1)
+        self.assertTrue(acquire(KEY))
+        self.assertEqual(
+            single_flight(KEY, self.compute, version=2), ('first', False)
+        )
+        self.assertEqual(self.compute.call_count, 1)
+        release([KEY])
+        self.assertEqual(
+            single_flight(KEY, self.compute, version=2), ('second', True)
+        )
+
+    @override_settings(SINGLE_FLIGHT_WAIT=0)
+    def test_compute_when_wait_times_out(self):
+        self.assertTrue(acquire(KEY))
+        self.assertEqual(
+            single_flight(KEY, self.compute, version=1), ('first', True)
+        )
+        # Чужую блокировку не снимает.
+        self.assertIsNotNone(cache.get(LOCK_KEY.format(key=KEY)))
+
+    def test_lock_released_on_error(self):
+        self.compute.side_effect = ValueError
+        with self.assertRaises(ValueError):
+            single_flight(KEY, self.compute, version=1)
+        self.assertTrue(acquire(KEY))
+
+
+class ReferenceListCacheTest(CatalogTestCase):
+    """
+    Списки тэгов и ингредиентов кэшируются по строке запроса
+    и пересчитываются после фиксации правки справочника.
+    """
+
+    def tag_names(self):
+        response = self.client.get(reverse('api:tags-list'))
+        self.assertEqual(response.status_code, 200)
+        return [tag['name'] for tag in response.json()]
+
+    def test_cached(self):
+        self.tag_names()
+        with self.assertNumQueries(1):
+            # Остаётся только запрос пользователя по токену.
+            self.tag_names()
+
+    def test_query_string_is_part_of_key(self):
+        url = reverse('api:ingredients-list')
+        self.assertEqual(
+            len(self.client.get(url, {'name': 'ingredient1'}).json()), 1
+        )
+        self.assertEqual(len(self.client.get(url).json()), 9)
+
+    def test_invalidated_after_commit(self):
+        self.assertNotIn('lunch', self.tag_names())
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='lunch', color='#000000', slug='lunch')
+        self.assertIn('lunch', self.tag_names())
+
+    def test_not_invalidated_before_commit(self):
+        self.tag_names()
+        with self.captureOnCommitCallbacks(execute=False):
+            Tag.objects.create(name='lunch', color='#000000', slug='lunch')
+        self.assertNotIn('lunch', self.tag_names())
@@ -0,0 +1,80 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+
+from jobs.models import Event
+from jobs.outbox import consume_events
+from jobs.queue import claim_jobs, run_job
+from recipes.models import Recipe
+from recipes.snapshots import (
+    build_snapshot,
+    refresh_snapshots,
+    snapshot_queryset
+)
+
+from .base import CatalogTestCase
+
+
+class RecipeSnapshotTest(CatalogTestCase):
+    """
+    Снимки связанных данных рецептов: проверка и пересборка командой
+    check_recipe_snapshots, чтение без снимка и обновление через outbox.
+    """
+
+    def check(self, *args):
+        output = StringIO()
+        call_command('check_recipe_snapshots', *args, stdout=output)
+        return output.getvalue()
+
+    def snapshots(self):
+        return dict(Recipe.objects.values_list('id', 'snapshot'))
+
+    def test_fresh(self):
+        self.assertIn('актуальны', self.check())
+        self.assertEqual(refresh_snapshots(self.snapshots()), 0)
+
+    @override_settings(RECIPE_SNAPSHOT_BATCH_SIZE=2)
+    def test_backfill(self):
+        expected = self.snapshots()
+        Recipe.objects.filter(
+            pk__in=[recipe.pk for recipe in self.recipes[:5]]
+        ).update(snapshot={})
+        self.assertIn('Устаревших снимков: 5', self.check())
+        self.assertIn('Пересобрано снимков: 5', self.check('--fix'))
+        self.assertEqual(self.snapshots(), expected)
+        self.assertIn('актуальны', self.check())
+
+    def test_snapshot_matches_tables(self):
+        for recipe in snapshot_queryset([self.recipes[0].pk]):
+            self.assertEqual(recipe.snapshot, build_snapshot(recipe))
+            self.assertEqual(
+                [line['amount'] for line in recipe.snapshot['ingredients']],
+                [1, 2, 3],
+            )
+
+    def test_read_without_snapshot(self):
+        url = reverse('api:recipes-detail', args=(self.recipes[0].pk,))
+        expected = self.client.get(url).json()
+        Recipe.objects.filter(pk=self.recipes[0].pk).update(snapshot={})
+        cache.clear()
+        self.assertEqual(self.client.get(url).json(), expected)
+
+    @mock.patch('jobs.queue.close_old_connections', mock.Mock())
+    def test_refreshed_by_outbox(self):
+        # События фикстуры не нужны: оценки популярности на SQLite
+        # не считаются.
+        Event.objects.all().delete()
+        tag = self.tags[0]
+        tag.name = 'renamed'
+        tag.save()
+        consume_events()
+        for pk in claim_jobs(10):
+            run_job(pk)
+        recipe = Recipe.objects.get(pk=self.recipes[0].pk)
+        self.assertIn(
+            'renamed', [item['name'] for item in recipe.snapshot['tags']]
+        )
@@ -0,0 +1,93 @@
+import asyncio
+
+from django.test import override_settings
+
+from ..sse import (
+    SSE_PATH,
+    format_event,
+    get_broker,
+    get_token,
+    recipe_events
+)
+from .base import CatalogTestCase
+
+TIMEOUT = 5
+
+
+@override_settings(SSE_BROKER='api.sse.InProcessBroker', SSE_HEARTBEAT=1)
+class RecipeEventsTest(CatalogTestCase):
+    """
+    Поток SSE новых рецептов авторов, на которых подписан пользователь.
+    """
+
+    def setUp(self):
+        super().setUp()
+        get_broker.cache_clear()
+        self.addCleanup(get_broker.cache_clear)
+
+    def scope(self, token=None):
+        return {
+            'type': 'http',
+            'path': SSE_PATH,
+            'headers': [],
+            'query_string': f'token={token}'.encode() if token else b'',
+        }
+
+    def message(self, author):
+        return {'id': 1, 'author': author.pk, 'name': 'recipe'}
+
+    async def run_stream(self, token, publish, sent):
+        received = asyncio.Event()
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            received.set()
+
+        async def wait_for_messages(count):
+            while len(sent) < count:
+                received.clear()
+                await asyncio.wait_for(received.wait(), TIMEOUT)
+
+        stream = asyncio.ensure_future(
+            recipe_events(self.scope(token), receive, send)
+        )
+        await wait_for_messages(2)
+        for message in publish:
+            get_broker().publish(message)
+        await wait_for_messages(3)
+        disconnected.set()
+        await asyncio.wait_for(stream, TIMEOUT)
+
+    def test_token(self):
+        self.assertEqual(get_token({
+            'headers': [(b'authorization', b'Token abc')],
+        }), 'abc')
+        self.assertEqual(get_token(self.scope('abc')), 'abc')
+        self.assertIsNone(get_token(self.scope()))
+
+    async def test_unauthorized(self):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await recipe_events(self.scope('wrong'), None, send)
+        self.assertEqual(sent[0]['status'], 401)
+
+    async def test_followed_authors_only(self):
+        followed = self.message(self.authors[0])
+        sent = []
+        await self.run_stream(self.token.key, [
+            self.message(self.authors[2]), followed,
+        ], sent)
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(sent[2]['body'], format_event(followed))
+        self.assertFalse(get_broker().subscribers)
+
+    def test_broker_per_process(self):
+        self.assertIs(get_broker(), get_broker())
@@ -0,0 +1,73 @@
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from jobs.models import Job
+from recipes.models import Favorite
+from users.models import AuthorSuggestion, Follow
+from users.suggestions import compute_author_suggestions
+from users.tasks import refresh_author_suggestions
+
+from .base import CatalogTestCase, create_user
+
+
+class AuthorSuggestionsTest(CatalogTestCase):
+    """
+    Рекомендации авторов: друзья друзей и совместное избранное,
+    без уже известных авторов, пачками пользователей.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.newcomer = create_user('newcomer')
+        Follow.objects.create(user=self.newcomer, author=self.authors[1])
+        Favorite.objects.create(user=self.newcomer, recipe=self.recipes[0])
+
+    def suggestions(self, user):
+        return list(AuthorSuggestion.objects.filter(user=user).order_by(
+            '-score'
+        ).values_list('author', 'score'))
+
+    @override_settings(AUTHOR_SUGGESTIONS_CHUNK_SIZE=2)
+    def test_scores(self):
+        compute_author_suggestions()
+        # authors[1] подписан на authors[0], а recipes[0] в избранном
+        # у reader, который подписан на authors[0] и authors[1].
+        self.assertEqual(self.suggestions(self.newcomer), [(
+            self.authors[0].pk,
+            settings.AUTHOR_SUGGESTIONS_FOF_WEIGHT
+            + settings.AUTHOR_SUGGESTIONS_COFAVORITE_WEIGHT,
+        )])
+        self.assertEqual(self.suggestions(self.user), [])
+
+    @override_settings(AUTHOR_SUGGESTIONS_LIMIT=1)
+    def test_limit(self):
+        Follow.objects.create(user=self.authors[1], author=self.authors[2])
+        compute_author_suggestions()
+        self.assertEqual(
+            [author for author, _ in self.suggestions(self.newcomer)],
+            [self.authors[0].pk],
+        )
+
+    def test_endpoint(self):
+        compute_author_suggestions()
+        token = Token.objects.create(user=self.newcomer)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        response = self.client.get(reverse('api:users-suggestions'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [author['id'] for author in response.json()['results']],
+            [self.authors[0].pk],
+        )
+
+    def test_command_enqueues_job(self):
+        call_command(
+            'compute_author_suggestions', enqueue=True, stdout=StringIO()
+        )
+        self.assertTrue(Job.objects.filter(
+            name=refresh_author_suggestions.job_name
+        ).exists())
@@ -0,0 +1,111 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from ..throttling import (
+    ANON_READ,
+    UPLOAD,
+    UPLOAD_COST_BYTES,
+    USER_READ,
+    CostThrottle,
+    parse_rate
+)
+from .base import CatalogTestCase
+
+VIEW = SimpleNamespace(action='list')
+UPLOAD_VIEW = SimpleNamespace(action='image', throttle_scopes={
+    'image': UPLOAD,
+})
+
+
+class TokenBucketTest(SimpleTestCase):
+    """
+    Корзина токенов: списание по стоимости запроса, пополнение
+    со временем не выше ёмкости и время ожидания для Retry-After.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+        self.factory = APIRequestFactory()
+
+    def throttle(self, **rates):
+        throttle = CostThrottle()
+        throttle.get_rates = lambda: rates
+        throttle.timer = lambda: self.now
+        return throttle
+
+    def request(self, method='get', **meta):
+        request = Request(getattr(self.factory, method)('/api/', **meta))
+        request.user = AnonymousUser()
+        return request
+
+    def allowed(self, throttle, count, view=VIEW, **meta):
+        return [
+            throttle.allow_request(self.request(**meta), view)
+            for _ in range(count)
+        ]
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('120/min'), (120, 60))
+        self.assertEqual(parse_rate('200/hour'), (200, 60 * 60))
+
+    def test_bucket(self):
+        throttle = self.throttle(**{ANON_READ: '3/min'})
+        self.assertEqual(
+            self.allowed(throttle, 4), [True, True, True, False]
+        )
+        self.assertEqual(throttle.wait(), 20)
+        self.now += 20
+        self.assertEqual(self.allowed(throttle, 2), [True, False])
+
+    def test_refill_is_capped(self):
+        throttle = self.throttle(**{ANON_READ: '3/min'})
+        self.allowed(throttle, 3)
+        self.now += 60 * 60
+        self.assertEqual(
+            self.allowed(throttle, 4), [True, True, True, False]
+        )
+
+    def test_upload_cost(self):
+        throttle = self.throttle(**{UPLOAD: '5/min'})
+        meta = {'CONTENT_LENGTH': str(2 * UPLOAD_COST_BYTES)}
+        self.assertEqual(
+            self.allowed(throttle, 2, UPLOAD_VIEW, **meta), [True, False]
+        )
+        self.assertEqual(throttle.cost, 3)
+        self.assertEqual(throttle.wait(), 12)
+
+    def test_cost_above_capacity(self):
+        throttle = self.throttle(**{UPLOAD: '2/min'})
+        meta = {'CONTENT_LENGTH': str(10 * UPLOAD_COST_BYTES)}
+        self.assertEqual(
+            self.allowed(throttle, 2, UPLOAD_VIEW, **meta), [True, False]
+        )
+
+    def test_scopes_are_separate(self):
+        throttle = self.throttle(**{ANON_READ: '1/min', USER_READ: '1/min'})
+        self.assertEqual(self.allowed(throttle, 2), [True, False])
+        self.assertEqual(self.allowed(throttle, 1, method='post'), [True])
+
+
+class ThrottledResponseTest(CatalogTestCase):
+    """
+    Отклонённый запрос получает 429 с Retry-After.
+    """
+
+    def test_retry_after(self):
+        url = reverse('api:tags-list')
+        with mock.patch.object(
+            CostThrottle, 'get_rates', lambda self: {USER_READ: '1/hour'}
+        ):
+            self.assertEqual(self.client.get(url).status_code, 200)
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(int(response['Retry-After']), 60 * 60)
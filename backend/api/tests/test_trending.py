@@ -0,0 +1,66 @@
+import math
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.conf import settings
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.trending import update_trending_scores
+
+from .base import CatalogTestCase
+
+# Затухание считается выражениями PostgreSQL (EXTRACT EPOCH, EXP).
+POSTGRESQL_ONLY = 'Оценки популярности считаются только в PostgreSQL'
+
+
+class TrendingTest(CatalogTestCase):
+    """
+    Порядок ordering=trending и пакетный пересчёт оценок популярности.
+    """
+
+    def test_trending_ordering(self):
+        scores = {self.recipes[3].pk: 3.0, self.recipes[7].pk: 2.0}
+        for pk, score in scores.items():
+            Recipe.objects.filter(pk=pk).update(trending_score=score)
+        response = self.client.get(
+            reverse('api:recipes-list'), {'ordering': 'trending'}
+        )
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()['results'][:2]],
+            list(scores),
+        )
+
+    @skipUnless(connection.vendor == 'postgresql', POSTGRESQL_ONLY)
+    def test_scores_decay(self):
+        half_life = settings.TRENDING_HALF_LIFE_HOURS
+        fresh, old = self.recipes[4], self.recipes[5]
+        Favorite.objects.create(user=self.authors[0], recipe=fresh)
+        Favorite.objects.create(user=self.authors[0], recipe=old)
+        Favorite.objects.filter(recipe=old).update(
+            created=timezone.now() - timedelta(hours=half_life)
+        )
+        update_trending_scores()
+        scores = dict(Recipe.objects.filter(
+            pk__in=(fresh.pk, old.pk)
+        ).values_list('pk', 'trending_score'))
+        self.assertAlmostEqual(scores[old.pk] / scores[fresh.pk], 0.5, 2)
+
+    @skipUnless(connection.vendor == 'postgresql', POSTGRESQL_ONLY)
+    def test_weights_and_unknown_dates(self):
+        recipe = self.recipes[6]
+        Favorite.objects.create(user=self.authors[0], recipe=recipe)
+        ShoppingCart.objects.create(user=self.authors[0], recipe=recipe)
+        # Строки, добавленные до появления created, в оценку не входят.
+        ShoppingCart.objects.create(user=self.authors[1], recipe=recipe)
+        ShoppingCart.objects.filter(user=self.authors[1]).update(created=None)
+        update_trending_scores(recipe_ids=[recipe.pk])
+        recipe.refresh_from_db()
+        self.assertTrue(math.isclose(
+            recipe.trending_score,
+            settings.TRENDING_FAVORITE_WEIGHT
+            + settings.TRENDING_SHOPPING_CART_WEIGHT,
+            rel_tol=1e-3,
+        ))
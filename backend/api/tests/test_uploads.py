@@ -0,0 +1,99 @@
+import base64
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Recipe
+
+from .base import CatalogTestCase
+
+
+def make_image(size=(2, 2), image_format='PNG'):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'white').save(buffer, image_format)
+    return buffer.getvalue()
+
+
+class ImageUploadTest(CatalogTestCase):
+    """
+    Изображение рецепта телом запроса, формой multipart и строкой
+    Base64 с проверкой размера, формата и сторон изображения.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.recipes[0]
+        token = Token.objects.create(user=self.recipe.author)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.url = reverse('api:recipes-image', args=(self.recipe.pk,))
+
+    def put_raw(self, content, content_type='image/png'):
+        return self.client.put(self.url, content, content_type=content_type)
+
+    def stored_image(self):
+        return Recipe.objects.get(pk=self.recipe.pk).image
+
+    def test_raw_body(self):
+        content = make_image()
+        response = self.put_raw(content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], self.recipe.pk)
+        with self.stored_image().open('rb') as file:
+            self.assertEqual(file.read(), content)
+
+    def test_multipart(self):
+        content = make_image(image_format='JPEG')
+        response = self.client.put(self.url, {
+            'image': SimpleUploadedFile('photo.jpg', content, 'image/jpeg'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.stored_image().name.endswith('.jpg'))
+
+    def test_only_author(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        self.assertEqual(self.put_raw(make_image()).status_code, 403)
+
+    @override_settings(RECIPE_IMAGE_MAX_SIZE=100)
+    def test_too_large(self):
+        response = self.put_raw(make_image((200, 200)))
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.stored_image().name, self.recipe.image.name)
+
+    def test_not_an_image(self):
+        self.assertEqual(self.put_raw(b'text').status_code, 400)
+
+    @override_settings(RECIPE_IMAGE_FORMATS=('JPEG',))
+    def test_format(self):
+        self.assertEqual(self.put_raw(make_image()).status_code, 400)
+
+    @override_settings(RECIPE_IMAGE_MAX_DIMENSION=10)
+    def test_dimensions(self):
+        self.assertEqual(self.put_raw(make_image((20, 5))).status_code, 400)
+
+    def test_base64_on_create(self):
+        image = base64.b64encode(make_image()).decode()
+        response = self.client.post(reverse('api:recipes-list'), {
+            'name': 'base64',
+            'text': 'text',
+            'cooking_time': 5,
+            'tags': [self.tags[0].pk],
+            'ingredients': [{'id': self.ingredients[0].pk, 'amount': 1}],
+            'image': f'data:image/png;base64,{image}',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    @override_settings(RECIPE_IMAGE_MAX_SIZE=100)
+    def test_base64_too_large(self):
+        image = base64.b64encode(make_image((200, 200))).decode()
+        response = self.client.patch(
+            reverse('api:recipes-detail', args=(self.recipe.pk,)),
+            {'image': f'data:image/png;base64,{image}'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 413)
@@ -0,0 +1,80 @@
+from django.urls import reverse
+
+from ..testing import QUERY_BUDGETS
+from .base import RECIPES_PER_AUTHOR, CatalogTestCase
+
+
+class UsersQueriesTest(CatalogTestCase):
+    """
+    Флаг подписки и счетчики профиля вычисляются в запросе страницы:
+    число SQL-запросов не зависит от числа пользователей на странице.
+    """
+
+    def test_list_is_subscribed(self):
+        response = self.client.get(reverse('api:users-list'), {'limit': 10})
+        self.assertEqual(response.status_code, 200)
+        flags = {
+            user['id']: user['is_subscribed']
+            for user in response.json()['results']
+        }
+        self.assertEqual(flags, {
+            self.user.pk: False,
+            self.authors[0].pk: True,
+            self.authors[1].pk: True,
+            self.authors[2].pk: False,
+        })
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        url = reverse('api:users-list')
+        for limit in (1, 10):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(QUERY_BUDGETS['users-list']):
+                    self.client.get(url, {'limit': limit})
+
+    def test_profile_counters(self):
+        author = self.authors[0]
+        url = reverse('api:users-detail', args=(author.pk,))
+        with self.assertNumQueries(QUERY_BUDGETS['users-detail']):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['is_subscribed'])
+        self.assertEqual(data['recipes_count'], RECIPES_PER_AUTHOR)
+        self.assertEqual(data['followers_count'], 2)
+
+    def test_me(self):
+        with self.assertNumQueries(QUERY_BUDGETS['users-me']):
+            response = self.client.get(reverse('api:users-me'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['id'], self.user.pk)
+        self.assertEqual(data['recipes_count'], 0)
+        self.assertEqual(data['followers_count'], 0)
+
+    def test_search(self):
+        response = self.client.get(
+            reverse('api:users-list'), {'search': 'AUTHOR1'}
+        )
+        self.assertEqual(
+            [user['id'] for user in response.json()['results']],
+            [self.authors[1].pk],
+        )
+
+    def test_subscriptions(self):
+        for limit in (1, 10):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(
+                    QUERY_BUDGETS['users-subscriptions']
+                ):
+                    response = self.client.get(
+                        reverse('api:users-subscriptions'), {'limit': limit}
+                    )
+        results = response.json()['results']
+        self.assertEqual(
+            {author['id'] for author in results},
+            {self.authors[0].pk, self.authors[1].pk},
+        )
+        for author in results:
+            self.assertTrue(author['is_subscribed'])
+            self.assertEqual(author['recipes_count'], RECIPES_PER_AUTHOR)
+            self.assertEqual(len(author['recipes']), RECIPES_PER_AUTHOR)
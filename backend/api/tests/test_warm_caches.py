@@ -0,0 +1,69 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..management.commands.warm_caches import tag_combinations
+from .base import CatalogTestCase
+
+COMMAND = 'api.management.commands.warm_caches'
+
+
+class SerialExecutor:
+    """
+    Пул без потоков: запросы прогрева видят данные тестовой транзакции.
+    """
+
+    def __init__(self, workers):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def map(self, func, items):
+        return map(func, items)
+
+
+@mock.patch(f'{COMMAND}.ThreadPoolExecutor', SerialExecutor)
+@mock.patch(f'{COMMAND}.connection', mock.Mock())
+class WarmCachesTest(CatalogTestCase):
+    """
+    Прогрев кэшей: справочники, страницы списка и популярные рецепты
+    запрашиваются до первого пользователя.
+    """
+
+    def warm(self, **options):
+        output = StringIO()
+        call_command('warm_caches', stdout=output, **options)
+        return output.getvalue()
+
+    def list_queries(self):
+        self.client.credentials()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                reverse('api:recipes-list'), {'page': 1, 'limit': 6}
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_tag_combinations(self):
+        self.assertEqual(
+            tag_combinations(['a', 'b'], 10),
+            [(), ('a',), ('b',), ('a', 'b')],
+        )
+        self.assertEqual(tag_combinations(['a', 'b'], 2), [(), ('a',)])
+
+    def test_warm(self):
+        cold = self.list_queries()
+        cache.clear()
+        output = self.warm(pages=1, recipes=3, tag_combinations=1)
+        self.assertIn('ошибок: 0', output)
+        self.assertIn('Популярные рецепты: 3 запросов', output)
+        self.assertLess(self.list_queries(), cold)
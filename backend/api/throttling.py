@@ -0,0 +1,110 @@
+import time
+from functools import lru_cache
+
+from django.core.cache import cache as default_cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+ANON_READ = 'anon_read'
+USER_READ = 'user_read'
+WRITE = 'write'
+UPLOAD = 'upload'
+EXPORT = 'export'
+THROTTLE_KEY = 'throttle:{scope}:{ident}'
+DURATIONS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+UPLOAD_COST_BYTES = 1024 * 1024
+# Ключ WSGI-окружения запросов прогрева кэша из warm_caches: выставить
+# его может только код внутри процесса, из HTTP-заголовка он не попадёт.
+WARMUP_ENVIRON = 'foodgram.cache_warmup'
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """
+    Разбор частоты в формате DRF, например '120/min': число запросов
+    и длительность периода в секундах.
+    """
+    number, period = rate.split('/')
+    return int(number), DURATIONS[period[0]]
+
+
+def throttle_scope(request, view):
+    """
+    Корзина запроса: явно заданная для действия во throttle_scopes
+    вьюсета, иначе чтение анонима, чтение пользователя или запись.
+    """
+    scope = getattr(view, 'throttle_scopes', {}).get(
+        getattr(view, 'action', None)
+    )
+    if scope is not None:
+        return scope
+    if request.method in SAFE_METHODS:
+        return USER_READ if request.user.is_authenticated else ANON_READ
+    return WRITE
+
+
+def throttle_cost(request, scope):
+    """
+    Стоимость запроса в токенах: загрузка изображения стоит по токену
+    за каждый начатый мегабайт тела запроса, остальные запросы по одному.
+    """
+    if scope != UPLOAD:
+        return 1
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    return 1 + length // UPLOAD_COST_BYTES
+
+
+class CostThrottle(BaseThrottle):
+    """
+    Корзина токенов с учётом стоимости запроса. В общем кэше по ключу
+    клиента и корзины хранятся остаток токенов и время пополнения:
+    за период частоты корзина пополняется на limit токенов, но не больше
+    своей ёмкости limit. Запрос списывает cost токенов или отклоняется,
+    отказ состояние не меняет. Состояние читается и пишется целиком
+    (get и set), поэтому одновременные запросы одного клиента могут
+    списать одни и те же токены: перерасход ограничен числом его
+    параллельных запросов.
+    """
+    cache = default_cache
+    timer = time.time
+
+    def get_rates(self):
+        return api_settings.DEFAULT_THROTTLE_RATES
+
+    def get_cache_key(self, ident):
+        return THROTTLE_KEY.format(scope=self.scope, ident=ident)
+
+    def allow_request(self, request, view):
+        if request.META.get(WARMUP_ENVIRON):
+            return True
+        self.scope = throttle_scope(request, view)
+        rate = self.get_rates().get(self.scope)
+        if rate is None:
+            return True
+        self.limit, self.duration = parse_rate(rate)
+        # Запрос дороже ёмкости корзины списывает её целиком.
+        self.cost = min(throttle_cost(request, self.scope), self.limit)
+        key = self.get_cache_key(
+            request.user.pk if request.user.is_authenticated
+            else self.get_ident(request)
+        )
+        now = self.timer()
+        tokens, refilled = self.cache.get(key, (self.limit, now))
+        self.tokens = min(
+            self.limit,
+            tokens + (now - refilled) * self.limit / self.duration,
+        )
+        if self.tokens < self.cost:
+            return False
+        self.cache.set(key, (self.tokens - self.cost, now), self.duration)
+        return True
+
+    def wait(self):
+        """
+        Время до пополнения корзины на недостающие cost токенов.
+        """
+        return (self.cost - self.tokens) * self.duration / self.limit
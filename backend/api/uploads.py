@@ -0,0 +1,123 @@
+import mimetypes
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.datastructures import MultiValueDict
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import FileUploadParser
+from rest_framework.request import Empty
+
+IMAGE_TOO_LARGE = 'Размер изображения не может превышать {limit} байт'
+IMAGE_INVALID = 'Загрузите корректное изображение'
+IMAGE_FORMAT = 'Допустимые форматы изображения: {formats}'
+IMAGE_DIMENSIONS = 'Стороны изображения не могут превышать {limit} px'
+DEFAULT_FILE_NAME = 'image'
+
+
+class ImageTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_code = 'image_too_large'
+
+    def __init__(self):
+        super().__init__(IMAGE_TOO_LARGE.format(
+            limit=settings.RECIPE_IMAGE_MAX_SIZE
+        ))
+
+
+def validate_image(file):
+    """
+    Проверка формата и размеров изображения по заголовку файла:
+    Pillow читает только метаданные, пиксели не декодируются.
+    """
+    if file.size > settings.RECIPE_IMAGE_MAX_SIZE:
+        raise ImageTooLarge()
+    try:
+        image = Image.open(file)
+    except (UnidentifiedImageError, OSError):
+        raise serializers.ValidationError(IMAGE_INVALID)
+    finally:
+        file.seek(0)
+    if image.format not in settings.RECIPE_IMAGE_FORMATS:
+        raise serializers.ValidationError(IMAGE_FORMAT.format(
+            formats=', '.join(settings.RECIPE_IMAGE_FORMATS)
+        ))
+    if max(image.size) > settings.RECIPE_IMAGE_MAX_DIMENSION:
+        raise serializers.ValidationError(IMAGE_DIMENSIONS.format(
+            limit=settings.RECIPE_IMAGE_MAX_DIMENSION
+        ))
+    return file
+
+
+class ImageUploadField(Base64ImageField):
+    """
+    Изображение строкой Base64 или загруженным файлом
+    (multipart или тело запроса целиком).
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            return validate_image(data)
+        if isinstance(data, str) and (
+            len(data) * 3 // 4 > settings.RECIPE_IMAGE_MAX_SIZE
+        ):
+            raise ImageTooLarge()
+        image = super().to_internal_value(data)
+        return validate_image(image) if image else image
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """
+    Потоковая запись загружаемого файла во временный файл
+    с прерыванием загрузки при превышении допустимого размера.
+    """
+
+    def handle_raw_input(self, input_data, meta, content_length, boundary,
+                         encoding=None):
+        if content_length and content_length > (
+            settings.RECIPE_IMAGE_MAX_SIZE
+            + settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        ):
+            raise ImageTooLarge()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.RECIPE_IMAGE_MAX_SIZE:
+            raise ImageTooLarge()
+        return super().receive_data_chunk(raw_data, start)
+
+
+class RawImageParser(FileUploadParser):
+    """
+    Изображение, переданное телом запроса с типом image/*.
+    """
+    media_type = 'image/*'
+
+    def get_filename(self, stream, media_type, parser_context):
+        filename = super().get_filename(stream, media_type, parser_context)
+        if filename:
+            return filename
+        content_type = parser_context['request'].content_type
+        return DEFAULT_FILE_NAME + (
+            mimetypes.guess_extension(content_type.split(';')[0]) or ''
+        )
+
+
+def close_uploads(request):
+    """
+    Закрытие загруженных файлов запроса. Файлы, разобранные парсерами
+    DRF, Django не закрывает сам, и временный файл, уже перенесённый
+    в хранилище, иначе удаляется сборщиком мусора с ошибкой.
+    Неразобранное тело запроса не читается.
+    """
+    files = getattr(request, '_files', Empty)
+    if files is Empty:
+        return
+    uploads = (
+        [upload for _, group in files.lists() for upload in group]
+        if isinstance(files, MultiValueDict) else files.values()
+    )
+    for upload in uploads:
+        upload.close()
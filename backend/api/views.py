@@ -1,17 +1,39 @@
 from http import HTTPStatus
 
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db.models import (
+    BooleanField,
+    Count,
+    Exists,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Sum,
+    Value
+)
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
+from .cache import model_version, render_recipes
+from .conditional import (
+    last_modified_timestamp,
+    make_etag,
+    not_modified_response,
+    set_validators
+)
+from .fieldsets import requested_fields
 from .filters import IngredientFilter, RecipeFilter
+from .idempotency import idempotent
+from .mixins import AtomicWriteMixin, SingleFlightListMixin
 from .pagination import LimitPageNumberPagination
 from .permissions import AdminOrAuthor, AdminOrReadOnly
 from .serializers import (
@@ -20,8 +42,16 @@ from .serializers import (
     ListUserSerializer,
     RecipeCreateSerializer,
     RecipeForFollowersSerializer,
+    RecipeImageSerializer,
     RecipeSerializer,
-    TagSerializer
+    TagSerializer,
+    UserProfileSerializer
+)
+from .throttling import EXPORT, UPLOAD
+from .uploads import (
+    LimitedUploadHandler,
+    RawImageParser,
+    close_uploads
 )
 from recipes.models import (
     AmountIngredient,
@@ -31,14 +61,43 @@ from recipes.models import (
     ShoppingCart,
     Tag
 )
+from recipes.similarity import similar_recipe_ids
+from recipes.snapshots import prefetch_fallback
+from recipes.tasks import process_recipe_image
 from users.models import Follow, User
 
 SUBSCRIBE_TO_YOURSELF = 'Нельзя подписаться на самого себя'
 NO_SUBSCRIPTION = 'Нельзя отписаться от автора, на которго вы не подписаны'
 DELETE_RECIPE = 'Рецепт удален'
+BATCH_IDS_REQUIRED = 'Необходимо передать список id рецептов'
+BATCH_IDS_INVALID = 'Некорректный id рецепта: "{value}"'
+BATCH_IDS_LIMIT = 'Нельзя запросить больше {limit} рецептов за раз'
+READ_ACTIONS = ('list', 'retrieve', 'batch')
+PROFILE_ACTIONS = ('retrieve', 'me')
+USER_COLUMNS = ('email', 'username', 'first_name', 'last_name')
+RECIPE_COLUMNS = ('name', 'image', 'text', 'cooking_time')
+SNAPSHOT_FIELDS = frozenset(('author', 'tags', 'ingredients'))
+
+
+def recipe_columns(fields):
+    """
+    Колонки рецепта, нужные для полей ответа fields.
+    """
+    columns = ['id'] + [name for name in RECIPE_COLUMNS if name in fields]
+    if fields & SNAPSHOT_FIELDS:
+        columns += ['author', 'snapshot']
+    return columns
+
 
+def count_related(model, field, outer='pk'):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef(outer)}).order_by().values(
+            field
+        ).annotate(count=Count('id')).values('count')
+    ), 0)
 
-class UsersViewSet(UserViewSet):
+
+class UsersViewSet(AtomicWriteMixin, UserViewSet):
     """
     Вьюсет модели пользователей.
     """
@@ -48,6 +107,49 @@ class UsersViewSet(UserViewSet):
     search_fields = ('username', 'email')
     permission_classes = (AllowAny,)
 
+    def get_queryset(self):
+        """
+        Пользователи для чтения: флаг подписки и счетчики профиля
+        вычисляются подзапросами вместо запроса на каждую строку.
+        """
+        queryset = super().get_queryset()
+        if self.request.method != 'GET' or self.action not in (
+            READ_ACTIONS + PROFILE_ACTIONS
+        ):
+            return queryset
+        fields = requested_fields(
+            self.request, self.get_serializer_class().Meta.fields
+        )
+        queryset = queryset.only(
+            'id', *(name for name in USER_COLUMNS if name in fields)
+        ).order_by('id')
+        user = self.request.user
+        if user.is_authenticated and 'is_subscribed' in fields:
+            queryset = queryset.annotate(is_subscribed=Exists(
+                Follow.objects.filter(user=user, author=OuterRef('pk'))
+            ))
+        if 'recipes_count' in fields:
+            queryset = queryset.annotate(
+                recipes_count=count_related(Recipe, 'author')
+            )
+        if 'followers_count' in fields:
+            return queryset.annotate(
+                followers_count=count_related(Follow, 'author')
+            )
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action in PROFILE_ACTIONS and self.request.method == 'GET':
+            return UserProfileSerializer
+        return super().get_serializer_class()
+
+    def get_instance(self):
+        if self.request.method != 'GET':
+            return super().get_instance()
+        return get_object_or_404(
+            self.get_queryset(), pk=self.request.user.pk
+        )
+
     @action(
         methods=['GET'],
         detail=False,
@@ -55,17 +157,51 @@ class UsersViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = Follow.objects.filter(user=user)
+        queryset = Follow.objects.filter(user=user).select_related(
+            'author'
+        ).prefetch_related(Prefetch(
+            'author__recipes',
+            queryset=Recipe.objects.only(
+                'id', 'author_id', 'name', 'image', 'cooking_time'
+            ),
+        )).annotate(
+            recipes_count=count_related(Recipe, 'author', 'author'),
+            is_subscribed=Value(True, output_field=BooleanField()),
+        )
         page = self.paginate_queryset(queryset)
         serializer = FollowSerializer(
             page, many=True, context={'request': request}
         )
         return self.get_paginated_response(serializer.data)
 
+    @action(
+        methods=['GET'],
+        detail=False,
+        permission_classes=(IsAuthenticated,)
+    )
+    def suggestions(self, request):
+        """
+        Рекомендуемые авторы из ночного расчёта: чтение по индексу
+        (пользователь, оценка), из которого убраны авторы, на которых
+        пользователь подписался уже после расчёта.
+        """
+        user = request.user
+        queryset = User.objects.filter(suggested_to__user=user).exclude(
+            Exists(Follow.objects.filter(user=user, author=OuterRef('pk')))
+        ).annotate(
+            is_subscribed=Value(False, output_field=BooleanField()),
+        ).order_by('-suggested_to__score', 'id')
+        page = self.paginate_queryset(queryset)
+        serializer = ListUserSerializer(
+            page, many=True, context={'request': request}
+        )
+        return self.get_paginated_response(serializer.data)
+
     @action(
         methods=['POST', 'DELETE'],
         detail=True,
     )
+    @idempotent
     def subscribe(self, request, id):
         author = get_object_or_404(User, id=id)
         if request.method == 'POST':
@@ -78,28 +214,31 @@ class UsersViewSet(UserViewSet):
             return Response(
                 serializer.data, status=status.HTTP_201_CREATED
             )
-        elif request.method == 'DELETE':
-            if Follow.objects.filter(
-                    user=request.user, author=author
-            ).exists():
-                Follow.objects.filter(
-                    user=request.user, author=author
-                ).delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            return Response(
-                {'errors': NO_SUBSCRIPTION},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        if Follow.objects.filter(
+                user=request.user, author=author
+        ).exists():
+            Follow.objects.filter(
+                user=request.user, author=author
+            ).delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response(
+            {'errors': NO_SUBSCRIPTION},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(
+    AtomicWriteMixin, SingleFlightListMixin, viewsets.ModelViewSet
+):
     queryset = Tag.objects.all()
     pagination_class = None
     serializer_class = TagSerializer
     permission_classes = (AdminOrReadOnly,)
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(
+    AtomicWriteMixin, SingleFlightListMixin, viewsets.ModelViewSet
+):
     queryset = Ingredient.objects.all()
     pagination_class = None
     serializer_class = IngredientSerializer
@@ -108,20 +247,230 @@ class IngredientViewSet(viewsets.ModelViewSet):
     filterset_class = IngredientFilter
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AtomicWriteMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = (AdminOrAuthor,)
     pagination_class = LimitPageNumberPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    throttle_scopes = {
+        'create': UPLOAD,
+        'update': UPLOAD,
+        'partial_update': UPLOAD,
+        'image': UPLOAD,
+        'download_shopping_cart': EXPORT,
+    }
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [LimitedUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        close_uploads(request)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def get_queryset(self):
+        """
+        Рецепты для чтения: выбираются только колонки запрошенных полей.
+        Автор, теги и ингредиенты берутся из снимка в той же строке,
+        флаги пользователя вычисляются лишь для полей, попавших в ответ.
+        """
+        queryset = Recipe.objects.all()
+        if self.action not in READ_ACTIONS:
+            return queryset
+        fields = requested_fields(self.request, RecipeSerializer.Meta.fields)
+        columns = recipe_columns(fields)
+        if 'author' in fields:
+            fields.add('is_subscribed')
+        return self.annotate_user_flags(queryset, fields).only(*columns)
+
+    def annotate_user_flags(self, queryset, fields):
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset
+        flags = {
+            'is_favorited': Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            'is_in_shopping_cart': Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            'is_subscribed': Exists(
+                Follow.objects.filter(user=user, author=OuterRef('author'))
+            ),
+        }
+        return queryset.annotate(**{
+            name: flag for name, flag in flags.items() if name in fields
+        })
+
+    def get_page_queryset(self):
+        """
+        Легкий запрос страницы списка: id, версия рецепта и флаги
+        текущего пользователя, вычисленные одним запросом для всей страницы.
+        """
+        fields = requested_fields(self.request, RecipeSerializer.Meta.fields)
+        if 'author' in fields:
+            fields.add('is_subscribed')
+        return self.annotate_user_flags(
+            Recipe.objects.only('id', 'updated_at', 'author'), fields
+        )
+
+    @staticmethod
+    def load_fragment_recipes(ids, fields):
+        """
+        Рецепты для пересчёта фрагментов: только колонки полей fields.
+        """
+        return prefetch_fallback(
+            Recipe.objects.filter(pk__in=ids).only(*recipe_columns(fields))
+        )
 
     def get_serializer_class(self):
         return RecipeSerializer if self.action in (
-            'list', 'retrieve'
+            READ_ACTIONS
         ) else RecipeCreateSerializer
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @staticmethod
+    def schedule_image_processing(serializer):
+        # Разбор EXIF и пересохранение изображения выполняет воркер,
+        # запрос возвращается сразу после записи файла.
+        if 'image' in serializer.validated_data:
+            recipe = serializer.instance
+            process_recipe_image.enqueue(
+                recipe_id=recipe.pk, image=recipe.image.name, unique=True
+            )
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+        self.schedule_image_processing(serializer)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        self.schedule_image_processing(serializer)
+
+    @staticmethod
+    def parse_ids(values):
+        if not values or not isinstance(values, (list, tuple)):
+            raise ValidationError({'ids': BATCH_IDS_REQUIRED})
+        ids = []
+        for value in values:
+            try:
+                ids.append(int(value))
+            except (TypeError, ValueError):
+                raise ValidationError(
+                    {'ids': BATCH_IDS_INVALID.format(value=value)}
+                )
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > settings.RECIPES_BATCH_LIMIT:
+            raise ValidationError({'ids': BATCH_IDS_LIMIT.format(
+                limit=settings.RECIPES_BATCH_LIMIT
+            )})
+        return ids
+
+    def get_batch_response(self, values):
+        """
+        Рецепты по списку id: один запрос к базе, порядок как в запросе,
+        не найденные id перечисляются в поле missing.
+        """
+        ids = self.parse_ids(values)
+        recipes = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(prefetch_fallback(
+            recipes[pk] for pk in ids if pk in recipes
+        ), many=True)
+        return Response({
+            'results': serializer.data,
+            'missing': [pk for pk in ids if pk not in recipes],
+        })
+
+    def list(self, request, *args, **kwargs):
+        """
+        Список рецептов с условным GET: ETag строится по версии списка
+        из кэша, которую сбрасывают сигналы при изменении, добавлении
+        и удалении рецептов и пересчете популярности, и параметрам
+        запроса. При совпадении возвращается 304 без обращения к базе.
+        Last-Modified для списка не отдается: удаление рецепта его бы
+        не изменило.
+        """
+        if 'ids' in request.query_params:
+            return self.get_batch_response(
+                request.query_params['ids'].split(',')
+            )
+        etag = make_etag(request, model_version(Recipe))
+        response = not_modified_response(request, etag)
+        if response is not None:
+            return set_validators(response, etag)
+        response, fresh = self.list_from_fragments(request)
+        return set_validators(response, etag) if fresh else response
+
+    def list_from_fragments(self, request):
+        """
+        Страница списка из кэша фрагментов: общая часть рецептов берется
+        из кэша, пользовательские флаги накладываются поверх.
+        Возвращает ответ и признак актуальности всех фрагментов.
+        """
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_page_queryset())
+        )
+        data, fresh = render_recipes(
+            page, request, self.load_fragment_recipes
+        )
+        return self.get_paginated_response(data), fresh
+
+    def retrieve_from_fragment(self, request):
+        """
+        Рецепт из кэша фрагментов с флагами текущего пользователя.
+        Вместе с версией выбираются колонки запрошенных полей, поэтому
+        при промахе кэша фрагмент строится из той же строки без
+        повторного запроса.
+        """
+        fields = requested_fields(request, RecipeSerializer.Meta.fields)
+        recipe = get_object_or_404(
+            self.filter_queryset(self.get_page_queryset().only(
+                'updated_at', *recipe_columns(fields)
+            )),
+            pk=self.kwargs[self.lookup_field],
+        )
+        self.check_object_permissions(request, recipe)
+        data, fresh = render_recipes(
+            [recipe], request, lambda ids, fields: prefetch_fallback([recipe])
+        )
+        if not data:
+            raise Http404
+        return Response(data[0]), fresh
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Рецепт с условным GET. Ответ, собранный из устаревшего
+        фрагмента, пока свежий пересчитывает другой запрос,
+        отдается без валидаторов.
+        """
+        try:
+            updated_at = Recipe.objects.filter(
+                pk=self.kwargs[self.lookup_field]
+            ).values_list('updated_at', flat=True).first()
+        except (TypeError, ValueError):
+            updated_at = None
+        if updated_at is None:
+            raise Http404
+        etag = make_etag(request, self.kwargs[self.lookup_field], updated_at)
+        last_modified = last_modified_timestamp(request, updated_at)
+        response = not_modified_response(request, etag, last_modified)
+        if response is not None:
+            return set_validators(response, etag, last_modified)
+        response, fresh = self.retrieve_from_fragment(request)
+        if not fresh:
+            return response
+        return set_validators(response, etag, last_modified)
+
+    @action(
+        detail=False,
+        methods=['POST'],
+    )
+    def batch(self, request):
+        return self.get_batch_response(request.data.get('ids'))
 
     def add_recipe(self, model, request, pk):
         recipe = get_object_or_404(Recipe, id=pk)
@@ -152,6 +501,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=['POST', 'DELETE'],
         permission_classes=(IsAuthenticated,)
     )
+    @idempotent
     def favorite(self, request, pk=None):
         return self.add_recipe(
             Favorite, request, pk
@@ -164,6 +514,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=['POST', 'DELETE'],
         permission_classes=(IsAuthenticated,)
     )
+    @idempotent
     def shopping_cart(self, request, pk):
         return self.add_recipe(
             ShoppingCart, request, pk
@@ -171,6 +522,43 @@ class RecipeViewSet(viewsets.ModelViewSet):
             ShoppingCart, request, pk
         )
 
+    @action(
+        detail=True,
+        methods=['PUT'],
+        parser_classes=(RawImageParser, MultiPartParser),
+    )
+    def image(self, request, pk=None):
+        """
+        Замена изображения рецепта файлом: телом запроса с типом image/*
+        или полем image формы multipart. Файл пишется во временный файл
+        потоком, без Base64 и без чтения запроса в память целиком.
+        """
+        recipe = self.get_object()
+        image = request.data.get('file') or request.data.get('image')
+        serializer = RecipeImageSerializer(
+            recipe, data={'image': image}, context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.schedule_image_processing(serializer)
+        return Response(serializer.data)
+
+    @action(
+        detail=True,
+        methods=['GET'],
+    )
+    def similar(self, request, pk=None):
+        """
+        Рецепты, похожие по набору ингредиентов, из LSH-индекса.
+        """
+        recipe = get_object_or_404(Recipe, id=pk)
+        ids = similar_recipe_ids(recipe.pk)
+        recipes = Recipe.objects.in_bulk(ids)
+        serializer = RecipeForFollowersSerializer(
+            [recipes[pk] for pk in ids if pk in recipes], many=True
+        )
+        return Response(serializer.data)
+
     @action(
         detail=False,
         methods=['GET'],
@@ -4,4 +4,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from api.sse import SSE_PATH, recipe_events  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """
+    Поток SSE обслуживается отдельным асинхронным приложением,
+    остальные запросы передаются Django.
+    """
+    if scope['type'] == 'http' and scope['path'] == SSE_PATH:
+        return await recipe_events(scope, receive, send)
+    return await django_application(scope, receive, send)
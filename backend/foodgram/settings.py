@@ -30,16 +30,21 @@ INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
+    'jobs.apps.JobsConfig',
+    'analytics.apps.AnalyticsConfig',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.LoadSheddingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ProfilerMiddleware',
+    'api.middleware.NPlusOneMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -75,6 +80,16 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.LimitPageNumberPagination',
     'PAGE_SIZE': 6,
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.CostThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon_read': '300/min',
+        'user_read': '1200/min',
+        'write': '120/min',
+        'upload': '200/hour',
+        'export': '30/hour',
+    },
 }
 
 # Database
@@ -91,6 +106,21 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# LocMemCache у каждого процесса свой и годится только для разработки:
+# в docker-compose задаётся общий memcached.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -150,7 +180,93 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+DATA_UPLOAD_MAX_MEMORY_SIZE = 2621440
+RECIPE_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+RECIPE_IMAGE_MAX_DIMENSION = 4096
+RECIPE_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
 TEXT_SCOPE = 15
+ADMIN_TEXT_SCOPE = 50
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
+
+RECIPES_BATCH_LIMIT = 100
+
+RECIPE_FRAGMENT_TIMEOUT = 60 * 60 * 24
+REFERENCE_CACHE_TIMEOUT = 60 * 5
+SINGLE_FLIGHT_TIMEOUT = 60 * 5
+SINGLE_FLIGHT_STALE_TIMEOUT = 60 * 60
+SINGLE_FLIGHT_LOCK_TIMEOUT = 10
+SINGLE_FLIGHT_WAIT = 2
+SINGLE_FLIGHT_BETA = 1.0
+RECIPE_SNAPSHOT_BATCH_SIZE = 500
+
+TRENDING_HALF_LIFE_HOURS = 48
+TRENDING_FAVORITE_WEIGHT = 1.0
+TRENDING_SHOPPING_CART_WEIGHT = 0.5
+
+JOB_WORKERS = 4
+JOB_POLL_INTERVAL = 1.0
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 10
+JOB_RETRY_MAX_DELAY = 60 * 60
+JOB_HEARTBEAT_INTERVAL = 30
+JOB_LEASE_TIMEOUT = 60 * 2
+JOB_RETENTION_DAYS = 7
+JOB_METRICS_WINDOW_MINUTES = 60
+
+OUTBOX_BATCH_SIZE = 500
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_LEASE_TIMEOUT = 60 * 5
+OUTBOX_RETENTION_DAYS = 3
+
+PROFILER_TOP_FUNCTIONS = 30
+PROFILER_EXPLAIN_LIMIT = 5
+AUDIT_ROWS_THRESHOLD = 1000
+
+# Ограничения одновременных запросов класса в одном процессе
+# (None — без ограничения) и классы, которые отклоняются первыми,
+# пока очередь перед воркерами стоит дольше LOAD_SHEDDING_INTERVAL_MS.
+LOAD_SHEDDING_LIMITS = {
+    'export': 2,
+    'upload': 4,
+}
+LOAD_SHEDDING_LOW_PRIORITY = ('export', 'upload')
+LOAD_SHEDDING_TARGET_MS = 100
+LOAD_SHEDDING_INTERVAL_MS = 1000
+LOAD_SHEDDING_RETRY_AFTER = 5
+LOAD_SHEDDING_LATENCY_WEIGHT = 0.2
+
+NPLUSONE_MODE = os.getenv('NPLUSONE_MODE', default='')
+NPLUSONE_THRESHOLD = 3
+
+# Пустое значение: брокер выбирается по базе данных.
+SSE_BROKER = os.getenv('SSE_BROKER', default='')
+SSE_HEARTBEAT = 15
+SSE_RETRY_MS = 5000
+SSE_QUEUE_SIZE = 100
+SSE_FOLLOWS_REFRESH = 60 * 5
+SSE_RECONNECT_MIN = 1
+SSE_RECONNECT_MAX = 60
+
+IDEMPOTENCY_TTL = 60 * 60 * 24
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+IDEMPOTENCY_WAIT = 5
+
+AUTHOR_SUGGESTIONS_LIMIT = 20
+AUTHOR_SUGGESTIONS_FOF_WEIGHT = 1.0
+AUTHOR_SUGGESTIONS_COFAVORITE_WEIGHT = 0.5
+AUTHOR_SUGGESTIONS_CHUNK_SIZE = 5000
+
+ROLLUP_LAG_MINUTES = 5
+ROLLUP_CHUNK_DAYS = 7
+ROLLUP_DASHBOARD_DAYS = 30
+ROLLUP_DASHBOARD_TOP = 10
+
+CACHE_WARM_HOST = os.getenv('CACHE_WARM_HOST', default='localhost')
+CACHE_WARM_CONCURRENCY = 4
+CACHE_WARM_PAGES = 3
+CACHE_WARM_RECIPES = 50
+CACHE_WARM_TAG_COMBINATIONS = 32
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
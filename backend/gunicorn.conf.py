@@ -0,0 +1,29 @@
+import os
+
+# С WARM_CACHES_ON_START=1 приложение загружается в мастер-процессе
+# до запуска воркеров, и кэши прогреваются до того, как начнут
+# приниматься запросы: воркеры наследуют и локальный кэш процесса.
+warm_caches_on_start = os.getenv('WARM_CACHES_ON_START', default='') == '1'
+preload_app = warm_caches_on_start
+# Потоки воркера (GUNICORN_THREADS, по умолчанию один): ограничения
+# LoadSheddingMiddleware на число одновременных выгрузок и загрузок
+# действуют внутри процесса, и с несколькими потоками тяжёлые запросы
+# не занимают весь воркер, пока чтение обслуживается соседними.
+# Каждый поток открывает своё соединение с базой, поэтому воркеров,
+# умноженных на потоки, должно быть меньше max_connections PostgreSQL
+# с запасом на job-воркеры и команды.
+threads = int(os.getenv('GUNICORN_THREADS', default='1'))
+
+
+def when_ready(server):
+    if not warm_caches_on_start:
+        return
+    from django.core.management import call_command
+    from django.db import connections
+
+    try:
+        call_command('warm_caches')
+    except Exception:
+        server.log.exception('Cache warming failed')
+    finally:
+        connections.close_all()
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Event, Job
+from .queue import job_metrics
+from users.admin import EMPTY_VALUE
+from users.paginators import EstimatedCountPaginator
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'name', 'status', 'attempts', 'run_at', 'started_at',
+        'finished_at',
+    )
+    list_filter = ('status', 'name',)
+    search_fields = ('name',)
+    readonly_fields = (
+        'created', 'started_at', 'heartbeat_at', 'finished_at', 'last_error',
+    )
+    actions = ('retry_jobs',)
+    empty_value_display = EMPTY_VALUE
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        extra_context['job_metrics'] = list(job_metrics())
+        extra_context['job_metrics_window'] = (
+            settings.JOB_METRICS_WINDOW_MINUTES
+        )
+        return super().changelist_view(request, extra_context)
+
+    @admin.action(description='Перезапустить выбранные задачи')
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now()
+        )
+        self.message_user(request, f'Задач поставлено в очередь: {updated}')
+
+
+@admin.register(Event)
+class EventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'topic', 'created', 'processed_at', 'attempts',)
+    list_filter = ('topic',)
+    readonly_fields = (
+        'topic', 'payload', 'created', 'processed_at', 'attempts',
+        'locked_until', 'last_error',
+    )
+    empty_value_display = EMPTY_VALUE
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
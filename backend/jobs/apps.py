@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    name = 'jobs'
+    verbose_name = 'Фоновые задачи'
+    default_auto_field = 'django.db.models.BigAutoField'
+
+    def ready(self):
+        autodiscover_modules('tasks')
@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from jobs.outbox import consume_events
+
+
+class Command(BaseCommand):
+    help = 'Applies outbox events to caches and derived data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when the outbox is empty',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                consumed = consume_events(options['batch_size'])
+                total += consumed
+                if consumed:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано событий: {total}'
+        ))
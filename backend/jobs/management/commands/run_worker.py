@@ -0,0 +1,110 @@
+import multiprocessing
+import signal
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait
+)
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import connections
+
+from jobs.outbox import consume_events, purge_processed_events
+from jobs.queue import (
+    claim_jobs,
+    heartbeat,
+    purge_finished_jobs,
+    requeue_stale_jobs,
+    run_job
+)
+
+THREAD = 'thread'
+PROCESS = 'process'
+MAINTENANCE_INTERVAL = 60
+
+
+def make_pool(kind, workers):
+    if kind == THREAD:
+        return ThreadPoolExecutor(workers)
+    # Процессы порождаются fork'ом до первого обращения к базе,
+    # чтобы дочерние процессы не унаследовали открытое соединение.
+    connections.close_all()
+    pool = ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context('fork')
+    )
+    pool.submit(int).result()
+    return pool
+
+
+class Command(BaseCommand):
+    help = 'Runs background jobs from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.JOB_WORKERS
+        )
+        parser.add_argument(
+            '--pool', choices=(THREAD, PROCESS), default=THREAD
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when the queue is empty',
+        )
+
+    def stop(self, signum, frame):
+        self.running = False
+
+    def keep_alive(self, pending):
+        # Аренда продлевается из основного процесса: если воркер упадёт,
+        # продления прекратятся и задачи вернутся в очередь.
+        if time.monotonic() - self.beaten > settings.JOB_HEARTBEAT_INTERVAL:
+            heartbeat(list(pending.values()))
+            self.beaten = time.monotonic()
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        workers = options['workers']
+        poll_interval = options['poll_interval']
+        processed = 0
+        maintained = 0
+        self.beaten = time.monotonic()
+        pending = {}
+        with make_pool(options['pool'], workers) as pool:
+            while self.running or pending:
+                if time.monotonic() - maintained > MAINTENANCE_INTERVAL:
+                    requeue_stale_jobs()
+                    purge_finished_jobs()
+                    purge_processed_events()
+                    maintained = time.monotonic()
+                consumed = consume_events() if self.running else 0
+                free = workers - len(pending) if self.running else 0
+                if free:
+                    pending.update(
+                        (pool.submit(run_job, pk), pk)
+                        for pk in claim_jobs(free)
+                    )
+                if not pending:
+                    if options['once'] and not consumed:
+                        break
+                    if not consumed:
+                        time.sleep(poll_interval)
+                    continue
+                self.keep_alive(pending)
+                done, _ = wait(
+                    pending, timeout=poll_interval,
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    del pending[future]
+                processed += len(done)
+        self.stdout.write(self.style.SUCCESS(
+            f'Воркер остановлен, выполнено задач: {processed}'
+        ))
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.15 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Event',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(db_index=True, max_length=100, verbose_name='Тип события')),
+                ('payload', models.JSONField(default=dict, verbose_name='Данные')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата события')),
+                ('processed_at', models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Дата обработки')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Неудачные попытки')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+            ],
+            options={
+                'verbose_name': 'Событие',
+                'verbose_name_plural': 'События',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='event_pending_idx'),
+        ),
+    ]
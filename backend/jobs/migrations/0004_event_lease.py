@@ -0,0 +1,23 @@
+# Generated by Django 3.2.15 on 2026-10-19 11:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0003_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Захвачено до'),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, verbose_name='Попытки'),
+        ),
+    ]
@@ -0,0 +1,130 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        'Задача',
+        max_length=200,
+        db_index=True,
+    )
+    payload = models.JSONField(
+        'Аргументы',
+        default=dict,
+    )
+    status = models.CharField(
+        'Статус',
+        max_length=16,
+        choices=STATUSES,
+        default=QUEUED,
+    )
+    attempts = models.PositiveIntegerField(
+        'Попытки',
+        default=0,
+    )
+    max_attempts = models.PositiveIntegerField(
+        'Максимум попыток',
+    )
+    run_at = models.DateTimeField(
+        'Запланирована на',
+        default=timezone.now,
+    )
+    created = models.DateTimeField(
+        'Дата постановки в очередь',
+        auto_now_add=True,
+    )
+    started_at = models.DateTimeField(
+        'Дата запуска',
+        null=True,
+        blank=True,
+    )
+    heartbeat_at = models.DateTimeField(
+        'Последний сигнал воркера',
+        null=True,
+        blank=True,
+    )
+    finished_at = models.DateTimeField(
+        'Дата завершения',
+        null=True,
+        blank=True,
+        db_index=True,
+    )
+    last_error = models.TextField(
+        'Последняя ошибка',
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ['-id', ]
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = (
+            models.Index(
+                fields=('status', 'run_at'),
+                name='job_claim_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+
+class Event(models.Model):
+    topic = models.CharField(
+        'Тип события',
+        max_length=100,
+        db_index=True,
+    )
+    payload = models.JSONField(
+        'Данные',
+        default=dict,
+    )
+    created = models.DateTimeField(
+        'Дата события',
+        auto_now_add=True,
+    )
+    processed_at = models.DateTimeField(
+        'Дата обработки',
+        null=True,
+        blank=True,
+        db_index=True,
+    )
+    attempts = models.PositiveIntegerField(
+        'Попытки',
+        default=0,
+    )
+    locked_until = models.DateTimeField(
+        'Захвачено до',
+        null=True,
+        blank=True,
+    )
+    last_error = models.TextField(
+        'Последняя ошибка',
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ['-id', ]
+        verbose_name = 'Событие'
+        verbose_name_plural = 'События'
+        indexes = (
+            models.Index(
+                fields=('id',),
+                name='event_pending_idx',
+                condition=models.Q(processed_at__isnull=True),
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.topic} #{self.pk}'
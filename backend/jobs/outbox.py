@@ -0,0 +1,118 @@
+import logging
+import traceback
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Event
+from .queue import retry_delay
+
+logger = logging.getLogger(__name__)
+
+subscribers = defaultdict(list)
+
+
+def record_event(topic, **payload):
+    """
+    Записывает событие в outbox в текущей транзакции: событие
+    сохраняется тогда и только тогда, когда фиксируется само изменение.
+    """
+    return Event.objects.create(topic=topic, payload=payload)
+
+
+def subscriber(topic):
+    """
+    Регистрирует обработчик событий topic. Обработчик получает список
+    payload пачки событий и должен быть идемпотентным: при сбое события
+    обрабатываются повторно, в том числе по одному.
+    """
+    def register(func):
+        subscribers[topic].append(func)
+        return func
+    return register
+
+
+def claim_events(limit=None):
+    """
+    Забирает пачку необработанных событий под аренду на
+    OUTBOX_LEASE_TIMEOUT секунд и сразу фиксирует захват: обработчики
+    не выполняются в транзакции, держащей блокировки строк. Попытка
+    засчитывается при захвате, поэтому события упавшего потребителя
+    повторяются не больше OUTBOX_MAX_ATTEMPTS раз.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(Event.objects.select_for_update(
+            skip_locked=True
+        ).filter(
+            Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+            processed_at__isnull=True,
+            attempts__lt=settings.OUTBOX_MAX_ATTEMPTS,
+        ).order_by('id').only('id', 'topic', 'payload', 'attempts')[
+            :limit or settings.OUTBOX_BATCH_SIZE
+        ])
+        Event.objects.filter(pk__in=[event.pk for event in events]).update(
+            locked_until=now + timedelta(
+                seconds=settings.OUTBOX_LEASE_TIMEOUT
+            ),
+            attempts=F('attempts') + 1,
+        )
+    for event in events:
+        event.attempts += 1
+    return events
+
+
+def process_events(topic, events):
+    """
+    Передаёт события обработчикам и отмечает их обработанными в одной
+    транзакции. При ошибке события ждут повтора с нарастающей задержкой.
+    Возвращает число обработанных событий.
+    """
+    ids = [event.pk for event in events]
+    try:
+        with transaction.atomic():
+            for handler in subscribers[topic]:
+                handler([event.payload for event in events])
+            Event.objects.filter(pk__in=ids).update(
+                processed_at=timezone.now(), locked_until=None
+            )
+    except Exception:
+        logger.exception('Outbox handler for %s failed', topic)
+        Event.objects.filter(pk__in=ids).update(
+            locked_until=timezone.now() + retry_delay(
+                max(event.attempts for event in events)
+            ),
+            last_error=traceback.format_exc(),
+        )
+        return 0
+    return len(ids)
+
+
+def consume_events(limit=None):
+    """
+    Обрабатывает пачку событий, сгруппированных по типу. Если пачка
+    типа падает, её события повторяются по одному: сбойное событие
+    не задерживает остальные.
+    """
+    batches = defaultdict(list)
+    for event in claim_events(limit):
+        batches[event.topic].append(event)
+    processed = 0
+    for topic, batch in batches.items():
+        done = process_events(topic, batch)
+        if not done and len(batch) > 1:
+            done = sum(process_events(topic, [event]) for event in batch)
+        processed += done
+    return processed
+
+
+def purge_processed_events():
+    return Event.objects.filter(
+        processed_at__lt=timezone.now() - timedelta(
+            days=settings.OUTBOX_RETENTION_DAYS
+        ),
+    ).delete()[0]
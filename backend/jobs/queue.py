@@ -0,0 +1,204 @@
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import (
+    Avg,
+    Count,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    Q
+)
+from django.utils import timezone
+
+from .models import Job
+
+JOB_NOT_REGISTERED = 'Задача {name} не зарегистрирована'
+JOB_LEASE_EXPIRED = 'Воркер перестал продлевать аренду задачи'
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def job(func):
+    """
+    Регистрирует функцию как фоновую задачу. Аргументы задачи
+    передаются именованными и должны сериализоваться в JSON:
+    reindex_recipes.enqueue(recipe_ids=[1, 2]).
+    """
+    name = f'{func.__module__}.{func.__name__}'
+    registry[name] = func
+    func.job_name = name
+
+    def enqueue_job(**kwargs):
+        return enqueue(name, **kwargs)
+
+    func.enqueue = enqueue_job
+    return func
+
+
+def enqueue(name, *, unique=False, countdown=0, **payload):
+    """
+    Ставит задачу в очередь в текущей транзакции: при откате запроса
+    задача не появится. С unique=True задача не дублируется, если такая
+    же ещё ждёт выполнения.
+    """
+    if name not in registry:
+        raise LookupError(JOB_NOT_REGISTERED.format(name=name))
+    run_at = timezone.now() + timedelta(seconds=countdown)
+    if unique:
+        queued = Job.objects.filter(
+            name=name, payload=payload, status=Job.QUEUED
+        ).first()
+        if queued is not None:
+            return queued
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        run_at=run_at,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def heartbeat(ids):
+    """
+    Продлевает аренду выполняемых задач: воркер вызывает её каждые
+    JOB_HEARTBEAT_INTERVAL секунд, пока задачи работают.
+    """
+    return Job.objects.filter(pk__in=ids, status=Job.RUNNING).update(
+        heartbeat_at=timezone.now()
+    )
+
+
+def requeue_stale_jobs():
+    """
+    Разбирает задачи, аренда которых истекла: воркер не продлевал её
+    дольше JOB_LEASE_TIMEOUT секунд, то есть упал вместе с задачей.
+    Попытка засчитана при захвате, поэтому задача, исчерпавшая
+    попытки, помечается упавшей, остальные ждут повтора с задержкой.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        heartbeat_at__lt=now - timedelta(
+            seconds=settings.JOB_LEASE_TIMEOUT
+        ),
+    )
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=now, last_error=JOB_LEASE_EXPIRED
+    )
+    requeued = 0
+    for pk, attempts in stale.values_list('pk', 'attempts'):
+        requeued += stale.filter(pk=pk).update(
+            status=Job.QUEUED,
+            run_at=now + retry_delay(attempts),
+            finished_at=now,
+            last_error=JOB_LEASE_EXPIRED,
+        )
+    return requeued
+
+
+def claim_jobs(limit):
+    """
+    Забирает до limit готовых к запуску задач. Строки блокируются через
+    SELECT ... FOR UPDATE SKIP LOCKED, поэтому несколько воркеров
+    не получают одну и ту же задачу и не ждут друг друга.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(Job.objects.select_for_update(skip_locked=True).filter(
+            status=Job.QUEUED, run_at__lte=now
+        ).order_by('run_at').values_list('id', flat=True)[:limit])
+        Job.objects.filter(pk__in=ids).update(
+            status=Job.RUNNING,
+            started_at=now,
+            heartbeat_at=now,
+            finished_at=None,
+            attempts=F('attempts') + 1,
+        )
+    return ids
+
+
+def retry_delay(attempts):
+    """
+    Экспоненциальная задержка перед повтором со случайной добавкой,
+    чтобы упавшие вместе задачи не повторялись одновременно.
+    """
+    delay = min(
+        settings.JOB_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.JOB_RETRY_MAX_DELAY,
+    )
+    return timedelta(seconds=delay + random.uniform(0, delay / 2))
+
+
+def run_job(pk):
+    """
+    Выполняет захваченную задачу и записывает результат.
+    Неудачная задача повторяется, пока не исчерпаны попытки.
+    """
+    try:
+        job = Job.objects.get(pk=pk)
+        try:
+            func = registry.get(job.name)
+            if func is None:
+                raise LookupError(JOB_NOT_REGISTERED.format(name=job.name))
+            func(**job.payload)
+        except Exception:
+            logger.exception('Job %s failed', job)
+            now = timezone.now()
+            retry = job.attempts < job.max_attempts
+            Job.objects.filter(pk=pk).update(
+                status=Job.QUEUED if retry else Job.FAILED,
+                run_at=now + retry_delay(job.attempts) if retry else now,
+                finished_at=now,
+                last_error=traceback.format_exc(),
+            )
+            return False
+        Job.objects.filter(pk=pk).update(
+            status=Job.DONE, finished_at=timezone.now()
+        )
+        return True
+    finally:
+        close_old_connections()
+
+
+def purge_finished_jobs():
+    return Job.objects.filter(
+        status=Job.DONE,
+        finished_at__lt=timezone.now() - timedelta(
+            days=settings.JOB_RETENTION_DAYS
+        ),
+    ).delete()[0]
+
+
+def job_metrics(minutes=None):
+    """
+    Метрики очереди по задачам за последние minutes минут:
+    выполнено и упало, средние ожидание в очереди и длительность,
+    пропускная способность в задачах в минуту.
+    """
+    minutes = minutes or settings.JOB_METRICS_WINDOW_MINUTES
+    since = timezone.now() - timedelta(minutes=minutes)
+    finished = Q(finished_at__gte=since)
+    rows = Job.objects.filter(
+        Q(status__in=(Job.QUEUED, Job.RUNNING)) | finished
+    ).order_by().values('name').annotate(
+        queued=Count('id', filter=Q(status=Job.QUEUED)),
+        running=Count('id', filter=Q(status=Job.RUNNING)),
+        done=Count('id', filter=finished & Q(status=Job.DONE)),
+        failed=Count('id', filter=finished & ~Q(status=Job.DONE)),
+        wait=Avg(ExpressionWrapper(
+            F('started_at') - F('created'), output_field=DurationField()
+        ), filter=finished & Q(status=Job.DONE)),
+        duration=Avg(ExpressionWrapper(
+            F('finished_at') - F('started_at'), output_field=DurationField()
+        ), filter=finished),
+    ).order_by('name')
+    for row in rows:
+        row['throughput'] = row['done'] / minutes
+        yield row
@@ -1,4 +1,12 @@
+from django.conf import settings
 from django.contrib import admin
+from django.db.models import Count, Exists, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.text import Truncator, smart_split, unescape_string_literal
+
+from jobs.outbox import record_event
+from users.admin import EMPTY_VALUE
+from users.paginators import EstimatedCountPaginator
 
 from .models import (
     AmountIngredient,
@@ -8,7 +16,7 @@ from .models import (
     ShoppingCart,
     Tag
 )
-from users.admin import EMPTY_VALUE
+from .signals import INGREDIENTS_CHANGED
 
 
 class RecipeIngredientsAdmin(admin.StackedInline):
@@ -19,25 +27,69 @@ class RecipeIngredientsAdmin(admin.StackedInline):
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = (
-        'id', 'name', 'text', 'cooking_time', 'pub_date', 'get_favorite_count'
+        'id', 'name', 'get_text', 'cooking_time', 'pub_date',
+        'get_favorite_count'
     )
     search_fields = (
         'name', 'cooking_time',
         'author__username', 'ingredients__name'
     )
     list_filter = ('pub_date', 'tags',)
+    raw_id_fields = ('author',)
     inlines = (RecipeIngredientsAdmin,)
     empty_value_display = EMPTY_VALUE
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            favorite_count=Coalesce(Subquery(
+                Favorite.objects.filter(recipe=OuterRef('pk')).order_by().
+                values('recipe').annotate(count=Count('id')).values('count'),
+                output_field=IntegerField(),
+            ), 0)
+        )
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if any(formset.has_changed() for formset in formsets):
+            record_event(INGREDIENTS_CHANGED, ids=[form.instance.pk])
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Поиск по названию, автору и ингредиентам без JOIN по связи
+        многие-ко-многим: ингредиенты проверяются через EXISTS, поэтому
+        DISTINCT не нужен. По времени приготовления ищется только число.
+        """
+        for bit in smart_split(search_term):
+            if bit[:1] in ('"', "'") and bit[-1:] == bit[:1]:
+                bit = unescape_string_literal(bit)
+            condition = Exists(AmountIngredient.objects.filter(
+                recipe=OuterRef('pk'), ingredients__name__icontains=bit
+            )) | Q(name__icontains=bit) | Q(author__username__icontains=bit)
+            if bit.isdigit():
+                condition |= Q(cooking_time=int(bit))
+            queryset = queryset.filter(condition)
+        return queryset, False
+
+    @admin.display(description='Описание рецепта')
+    def get_text(self, obj):
+        return Truncator(obj.text).chars(settings.ADMIN_TEXT_SCOPE)
 
-    @admin.display(description='В избранном')
+    @admin.display(description='В избранном', ordering='favorite_count')
     def get_favorite_count(self, obj):
-        return obj.favorite.count()
+        return obj.favorite_count
 
 
 @admin.register(Favorite)
 class FavoritesAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user',)
+    list_display = ('id', 'user', 'recipe',)
+    list_select_related = ('user', 'recipe',)
+    raw_id_fields = ('user', 'recipe',)
+    search_fields = ('user__username', 'recipe__name',)
     empty_value_display = EMPTY_VALUE
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Ingredient)
@@ -56,5 +108,10 @@ class TagAdmin(admin.ModelAdmin):
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user')
+    list_display = ('id', 'user', 'recipe',)
+    list_select_related = ('user', 'recipe',)
+    raw_id_fields = ('user', 'recipe',)
+    search_fields = ('user__username', 'recipe__name',)
     empty_value_display = EMPTY_VALUE
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,48 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .models import Recipe
+
+
+def strip_metadata(content):
+    """
+    Поворачивает изображение по тегу ориентации EXIF и пересохраняет
+    без метаданных: в фотографиях с телефона бывают координаты съёмки.
+    Возвращает None, если метаданных нет и пересохранять нечего.
+    """
+    image = Image.open(BytesIO(content))
+    if not image.getexif():
+        return None
+    image_format = image.format
+    image = ImageOps.exif_transpose(image)
+    image.info.pop('exif', None)
+    buffer = BytesIO()
+    image.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def process_image(recipe_id, name):
+    """
+    Обработка загруженного изображения рецепта вне запроса. Рецепт
+    блокируется, и если изображение успели заменить, обработка
+    пропускается. Возвращает True, если изображение пересохранено.
+    """
+    with transaction.atomic():
+        recipe = Recipe.objects.select_for_update().filter(
+            pk=recipe_id, image=name
+        ).first()
+        if recipe is None:
+            return False
+        with recipe.image.open('rb') as file:
+            content = strip_metadata(file.read())
+        if content is None:
+            return False
+        recipe.image.save(
+            os.path.basename(name), ContentFile(content), save=False
+        )
+        recipe.save(update_fields=('image', 'updated_at'))
+    return True
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes.models import Recipe
+from recipes.snapshots import refresh_snapshots, stale_snapshots
+
+SHOWN_IDS = 20
+
+
+class Command(BaseCommand):
+    help = 'Checks denormalized recipe snapshots against related tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rebuild snapshots that are missing or out of date',
+        )
+
+    def handle(self, *args, **options):
+        ids = list(Recipe.objects.order_by('id').values_list('id', flat=True))
+        size = settings.RECIPE_SNAPSHOT_BATCH_SIZE
+        stale = []
+        for start in range(0, len(ids), size):
+            stale += [
+                recipe.pk for recipe, _ in stale_snapshots(
+                    ids[start:start + size]
+                )
+            ]
+        if not stale:
+            self.stdout.write(self.style.SUCCESS(
+                f'Снимки всех {len(ids)} рецептов актуальны'
+            ))
+            return
+        self.stdout.write(
+            f'Устаревших снимков: {len(stale)} из {len(ids)}, '
+            f'id: {", ".join(map(str, stale[:SHOWN_IDS]))}'
+        )
+        if options['fix']:
+            refreshed = refresh_snapshots(stale)
+            self.stdout.write(self.style.SUCCESS(
+                f'Пересобрано снимков: {refreshed}'
+            ))
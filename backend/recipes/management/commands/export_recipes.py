@@ -0,0 +1,94 @@
+import base64
+import json
+import sys
+from time import perf_counter
+
+from django.core.management import BaseCommand
+
+from recipes.models import Recipe
+
+EMBED = 'embed'
+REFERENCE = 'reference'
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export_image(image, mode):
+    if not image:
+        return None
+    data = {'name': image.name}
+    if mode == EMBED:
+        with image.open('rb') as file:
+            data['content'] = base64.b64encode(file.read()).decode()
+    return data
+
+
+def export_recipe(recipe, images):
+    return {
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'pub_date': recipe.pub_date.isoformat(),
+        'author': recipe.author.username if recipe.author else None,
+        'tags': [tag.slug for tag in recipe.tags.all()],
+        'ingredients': [
+            {
+                'name': line.ingredients.name,
+                'measurement_unit': line.ingredients.measurement_unit,
+                'amount': line.amount,
+            }
+            for line in recipe.amount_ingredient.all()
+        ],
+        'image': export_image(recipe.image, images),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Streams recipes as JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument(
+            '--images', choices=(EMBED, REFERENCE), default=REFERENCE
+        )
+
+    def handle(self, *args, **options):
+        output = sys.stdout if options['output'] == '-' else open(
+            options['output'], 'w', encoding='utf-8'
+        )
+        started = perf_counter()
+        total = 0
+        ids = Recipe.objects.order_by('id').values_list(
+            'id', flat=True
+        ).iterator(chunk_size=options['chunk_size'])
+        try:
+            for chunk in chunked(ids, options['chunk_size']):
+                recipes = Recipe.objects.filter(id__in=chunk).order_by(
+                    'id'
+                ).select_related('author').prefetch_related(
+                    'tags', 'amount_ingredient__ingredients'
+                )
+                for recipe in recipes:
+                    output.write(json.dumps(
+                        export_recipe(recipe, options['images']),
+                        ensure_ascii=False,
+                    ) + '\n')
+                total += len(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        elapsed = perf_counter() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено {total} рецептов за {elapsed:.2f} с '
+            f'({total / elapsed if elapsed else 0:.0f} рецептов/с)'
+        ))
@@ -0,0 +1,99 @@
+import os
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from recipes.models import ImageBlob, Recipe
+from recipes.storage import recipe_image_storage
+
+IMAGE_DIRECTORY = 'recipe'
+
+
+def stored_files(storage, path):
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield os.path.join(path, name)
+    for directory in directories:
+        yield from stored_files(storage, os.path.join(path, directory))
+
+
+def written_since(storage, name, moment):
+    """
+    Файл записан или загружен повторно после moment. Хранилище
+    не пишет существующий файл заново, а обновляет время изменения:
+    ссылка на него появится, когда сохранится рецепт.
+    """
+    try:
+        return storage.get_modified_time(name) >= moment
+    except FileNotFoundError:
+        return False
+
+
+class Command(BaseCommand):
+    help = 'Deletes recipe image files that are no longer referenced'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=24)
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Recount references from recipes and register stray files',
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def recount(self):
+        """
+        Пересчет ссылок по таблице рецептов. Файлы на диске, о которых
+        нет записей, регистрируются без ссылок и удаляются после
+        льготного периода.
+        """
+        counts = dict(Recipe.objects.exclude(image='').order_by().values_list(
+            'image'
+        ).annotate(total=Count('id')))
+        known = set(ImageBlob.objects.values_list('name', flat=True))
+        if recipe_image_storage.exists(IMAGE_DIRECTORY):
+            names = set(stored_files(recipe_image_storage, IMAGE_DIRECTORY))
+        else:
+            names = set()
+        ImageBlob.objects.bulk_create(
+            ImageBlob(name=name) for name in (names | set(counts)) - known
+        )
+        ImageBlob.objects.update(references=0)
+        for name, total in counts.items():
+            ImageBlob.objects.filter(name=name).update(references=total)
+
+    def delete_orphan(self, blob, since, dry_run):
+        """
+        Удаление файла без ссылок. Запись блокируется и проверяется
+        заново: счетчик мог вырасти после выборки сирот.
+        """
+        with transaction.atomic():
+            blob = ImageBlob.objects.select_for_update().filter(
+                pk=blob.pk, references=0
+            ).first()
+            if (
+                blob is None
+                or Recipe.objects.filter(image=blob.name).exists()
+                or written_since(recipe_image_storage, blob.name, since)
+            ):
+                return False
+            if not dry_run:
+                recipe_image_storage.delete(blob.name)
+                blob.delete()
+        return True
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            self.recount()
+        since = timezone.now() - timedelta(hours=options['grace_hours'])
+        orphans = ImageBlob.objects.filter(references=0, changed__lt=since)
+        deleted = sum(
+            self.delete_orphan(blob, since, options['dry_run'])
+            for blob in orphans.iterator()
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено неиспользуемых изображений: {deleted}'
+        ))
@@ -0,0 +1,174 @@
+import base64
+import json
+import os
+import sys
+from time import perf_counter
+
+from django.core.files.base import ContentFile
+from django.core.management import BaseCommand
+from django.db import DatabaseError, connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from recipes.models import AmountIngredient, Ingredient, Recipe, Tag
+from recipes.signals import change_image_references, list_changed
+from recipes.similarity import index_recipes
+from recipes.snapshots import refresh_snapshots
+from users.models import User
+
+from .export_recipes import chunked
+
+CHUNK_FAILED = 'Пачка со строки {line} не загружена: {error}'
+CHUNK_ERRORS = (DatabaseError, KeyError, TypeError, ValueError)
+
+
+def import_image(image):
+    if not image:
+        return ''
+    if 'content' not in image:
+        return image['name']
+    field = Recipe._meta.get_field('image')
+    return field.storage.save(
+        field.generate_filename(None, os.path.basename(image['name'])),
+        ContentFile(base64.b64decode(image['content'])),
+    )
+
+
+def bulk_create_returning(model, objects):
+    """
+    bulk_create с заполнением первичных ключей. Если база не умеет
+    возвращать id из пакетной вставки, объекты сохраняются по одному.
+    """
+    objects = list(objects)
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objects)
+    for obj in objects:
+        obj.save()
+    return objects
+
+
+class Command(BaseCommand):
+    help = 'Imports recipes from JSON Lines produced by export_recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--input', default='-')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        source = sys.stdin if options['input'] == '-' else open(
+            options['input'], encoding='utf-8'
+        )
+        self.tags = dict(Tag.objects.values_list('slug', 'id'))
+        self.ingredients = {
+            (name, unit): pk for pk, name, unit in Ingredient.objects.
+            values_list('id', 'name', 'measurement_unit')
+        }
+        started = perf_counter()
+        imported = skipped = failed = 0
+        try:
+            lines = (
+                (number, line) for number, line in enumerate(source, 1)
+                if line.strip()
+            )
+            for chunk in chunked(lines, options['chunk_size']):
+                try:
+                    created, missed = self.import_chunk(chunk)
+                except CHUNK_ERRORS as error:
+                    self.stderr.write(self.style.ERROR(
+                        CHUNK_FAILED.format(line=chunk[0][0], error=error)
+                    ))
+                    failed += len(chunk)
+                    continue
+                imported += created
+                skipped += missed
+                self.stdout.write(f'Загружено рецептов: {imported}')
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        elapsed = perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {imported} рецептов, пропущено {skipped}, '
+            f'не загружено из-за ошибок {failed}, за {elapsed:.2f} с '
+            f'({imported / elapsed if elapsed else 0:.0f} рецептов/с)'
+        ))
+
+    def resolve_ingredients(self, records):
+        missing = {
+            (line['name'], line['measurement_unit'])
+            for record in records for line in record['ingredients']
+        } - set(self.ingredients)
+        for ingredient in bulk_create_returning(Ingredient, (
+            Ingredient(name=name, measurement_unit=unit)
+            for name, unit in missing
+        )):
+            self.ingredients[
+                ingredient.name, ingredient.measurement_unit
+            ] = ingredient.pk
+
+    def import_chunk(self, lines):
+        """
+        Загрузка пачки строк (номер, JSON) в одной транзакции. Если она
+        откатилась, ингредиенты, созданные в ней, убираются из кэша:
+        следующие пачки загружаются дальше и иначе ссылались бы
+        на несуществующие строки.
+        """
+        known = set(self.ingredients)
+        try:
+            with transaction.atomic():
+                return self.load_chunk(
+                    [json.loads(line) for _, line in lines]
+                )
+        except Exception:
+            for key in set(self.ingredients) - known:
+                del self.ingredients[key]
+            raise
+
+    def load_chunk(self, records):
+        """
+        Авторы, тэги и ингредиенты сопоставляются по естественным ключам,
+        строки вставляются через bulk_create.
+        """
+        authors = dict(User.objects.filter(
+            username__in={record['author'] for record in records}
+        ).values_list('username', 'id'))
+        total = len(records)
+        records = [
+            record for record in records if record['author'] in authors
+        ]
+        self.resolve_ingredients(records)
+        recipes = bulk_create_returning(Recipe, (
+            Recipe(
+                author_id=authors[record['author']],
+                name=record['name'],
+                text=record['text'],
+                cooking_time=record['cooking_time'],
+                image=import_image(record['image']),
+            )
+            for record in records
+        ))
+        for recipe, record in zip(recipes, records):
+            recipe.pub_date = parse_datetime(record['pub_date'])
+        Recipe.objects.bulk_update(recipes, ('pub_date',))
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.pk, tag_id=self.tags[slug])
+            for recipe, record in zip(recipes, records)
+            for slug in record['tags'] if slug in self.tags
+        )
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(
+                recipe_id=recipe.pk,
+                ingredients_id=self.ingredients[
+                    line['name'], line['measurement_unit']
+                ],
+                amount=line['amount'],
+            )
+            for recipe, record in zip(recipes, records)
+            for line in record['ingredients']
+        )
+        # bulk_create не вызывает сигналы: снимки, индекс похожих
+        # рецептов и версия списка обновляются здесь же.
+        refresh_snapshots([recipe.pk for recipe in recipes])
+        index_recipes([recipe.pk for recipe in recipes])
+        for recipe in recipes:
+            change_image_references(recipe.image.name, 1)
+        list_changed()
+        return len(recipes), total - len(records)
@@ -0,0 +1,37 @@
+from time import perf_counter
+
+from django.core.management import BaseCommand
+
+from recipes.models import Recipe
+from recipes.similarity import index_recipes
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds MinHash/LSH index of similar recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        started = perf_counter()
+        total = 0
+        last_id = 0
+        while True:
+            ids = list(Recipe.objects.filter(id__gt=last_id).order_by(
+                'id'
+            ).values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            chunk_started = perf_counter()
+            indexed = index_recipes(ids)
+            total += len(ids)
+            last_id = ids[-1]
+            self.stdout.write(
+                f'Рецепты до id={last_id}: {indexed} из {len(ids)} '
+                f'проиндексированы за {perf_counter() - chunk_started:.2f} с'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс похожих рецептов перестроен: {total} рецептов '
+            f'за {perf_counter() - started:.2f} с'
+        ))
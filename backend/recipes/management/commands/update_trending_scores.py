@@ -0,0 +1,20 @@
+from time import perf_counter
+
+from django.core.management import BaseCommand
+
+from recipes.trending import update_trending_scores
+
+
+class Command(BaseCommand):
+    help = 'Recomputes time-decayed popularity of recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--half-life-hours', type=float)
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        updated = update_trending_scores(options['half_life_hours'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Популярность пересчитана для {updated} рецептов '
+            f'за {perf_counter() - started:.2f} с'
+        ))
@@ -0,0 +1,63 @@
+# Generated by Django 3.2.15 on 2026-10-19 13:00
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+AUTHOR_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+
+
+def build_snapshot(recipe):
+    author = recipe.author
+    return {
+        'author': None if author is None else {
+            name: getattr(author, name) for name in AUTHOR_FIELDS
+        },
+        'tags': [
+            {name: getattr(tag, name) for name in TAG_FIELDS}
+            for tag in recipe.tags.all()
+        ],
+        'ingredients': [
+            {
+                'id': line.ingredients.id,
+                'name': line.ingredients.name,
+                'measurement_unit': line.ingredients.measurement_unit,
+                'amount': line.amount,
+            }
+            for line in recipe.amount_ingredient.all()
+        ],
+    }
+
+
+def backfill_snapshots(apps, schema_editor):
+    """
+    Снимки существующих рецептов: без них чтение уходит в запасные
+    сериализаторы по связанным таблицам.
+    """
+    Recipe = apps.get_model('recipes', 'Recipe')
+    ids = list(Recipe.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), BATCH_SIZE):
+        recipes = list(Recipe.objects.filter(
+            pk__in=ids[start:start + BATCH_SIZE]
+        ).select_related('author').prefetch_related(
+            'tags', 'amount_ingredient__ingredients'
+        ))
+        for recipe in recipes:
+            recipe.snapshot = build_snapshot(recipe)
+        Recipe.objects.bulk_update(recipes, ('snapshot',))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_image_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='snapshot',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Снимок для чтения'),
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
@@ -4,6 +4,8 @@ from django.db import models
 from foodgram.settings import TEXT_SCOPE
 from users.models import User
 
+from .storage import recipe_image_storage
+
 INGREDIENT_NAME_LENGTH = 200
 INGREDIENT_MEASUREMENT_UNIT_LENGTH = 200
 TAG_NAME_LENGTH = 200
@@ -77,6 +79,7 @@ class Recipe(models.Model):
     image = models.ImageField(
         'Изображение рецепта',
         upload_to='recipe/',
+        storage=recipe_image_storage,
     )
     text = models.TextField(
         'Описание рецепта',
@@ -104,12 +107,34 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         'Дата публикации рецепта',
         auto_now_add=True,
+        db_index=True,
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения рецепта',
+        auto_now=True,
+        db_index=True,
+    )
+    trending_score = models.FloatField(
+        'Популярность',
+        default=0,
+    )
+    snapshot = models.JSONField(
+        'Снимок для чтения',
+        default=dict,
+        blank=True,
+        editable=False,
     )
 
     class Meta:
         ordering = ['-pub_date', ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = (
+            models.Index(
+                fields=('-trending_score', '-pub_date'),
+                name='recipe_trending_idx',
+            ),
+        )
 
     def __str__(self):
         return self.name[:TEXT_SCOPE]
@@ -161,6 +186,12 @@ class Favorite(models.Model):
         on_delete=models.CASCADE,
         related_name='favorite',
     )
+    created = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+        null=True,
+        db_index=True,
+    )
 
     class Meta:
         verbose_name = 'Избранный рецепт'
@@ -189,6 +220,12 @@ class ShoppingCart(models.Model):
         on_delete=models.CASCADE,
         related_name='shopping_cart',
     )
+    created = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+        null=True,
+        db_index=True,
+    )
 
     class Meta:
         verbose_name = 'Покупка'
@@ -199,3 +236,44 @@ class ShoppingCart(models.Model):
                 name='unique_shoppinglist_recipe_user',
             ),
         ]
+
+
+class RecipeBucket(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        related_name='lsh_buckets',
+    )
+    bucket = models.BigIntegerField(
+        'LSH-корзина',
+        db_index=True,
+    )
+
+    class Meta:
+        verbose_name = 'LSH-корзина рецепта'
+        verbose_name_plural = 'LSH-корзины рецептов'
+
+
+class ImageBlob(models.Model):
+    name = models.CharField(
+        'Файл',
+        max_length=255,
+        unique=True,
+    )
+    references = models.PositiveIntegerField(
+        'Количество ссылок',
+        default=0,
+    )
+    changed = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True,
+    )
+
+    class Meta:
+        verbose_name = 'Файл изображения'
+        verbose_name_plural = 'Файлы изображений'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,172 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save
+)
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from jobs.outbox import record_event
+from users.models import Follow, User
+
+from .models import (
+    Favorite,
+    ImageBlob,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    Tag
+)
+
+PROFILE_FIELDS = frozenset(('username', 'email', 'first_name', 'last_name'))
+
+RECIPES_CHANGED = 'recipes.changed'
+INGREDIENTS_CHANGED = 'recipes.ingredients_changed'
+RECIPE_ACTIVITY = 'recipes.activity'
+FOLLOW_CHANGED = 'users.follow_changed'
+
+recipes_changed = Signal()
+recipe_list_changed = Signal()
+
+
+def list_changed():
+    """
+    После фиксации транзакции сообщает, что состав, содержимое
+    или порядок списка рецептов изменились.
+    """
+    transaction.on_commit(lambda: recipe_list_changed.send(sender=Recipe))
+
+
+def touch_recipes(queryset):
+    """
+    Отмечает рецепты изменёнными: их представление в API устарело.
+    Время изменения обновляется сразу, а производные данные сбрасывают
+    получатели recipes_changed при обработке события из outbox.
+    Возвращает id отмеченных рецептов.
+    """
+    ids = list(queryset.values_list('id', flat=True))
+    if not ids:
+        return ids
+    Recipe.objects.filter(pk__in=ids).update(updated_at=timezone.now())
+    record_event(RECIPES_CHANGED, ids=ids)
+    list_changed()
+    return ids
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    record_event(RECIPES_CHANGED, ids=[instance.pk])
+    list_changed()
+
+
+def change_image_references(name, delta):
+    """
+    Изменяет счетчик ссылок на файл изображения.
+    Файлы без ссылок удаляет команда gc_images.
+    """
+    if not name:
+        return
+    blob, _ = ImageBlob.objects.get_or_create(name=name)
+    ImageBlob.objects.filter(pk=blob.pk).update(
+        references=Greatest(F('references') + delta, 0),
+        changed=timezone.now(),
+    )
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_recipe_image(sender, instance, **kwargs):
+    instance.previous_image = Recipe.objects.filter(
+        pk=instance.pk
+    ).values_list('image', flat=True).first() if instance.pk else None
+
+
+@receiver(post_save, sender=Recipe)
+def count_recipe_image(sender, instance, **kwargs):
+    previous = getattr(instance, 'previous_image', None)
+    if previous == instance.image.name:
+        return
+    change_image_references(instance.image.name, 1)
+    change_image_references(previous, -1)
+
+
+@receiver(post_delete, sender=Recipe)
+def release_recipe_image(sender, instance, **kwargs):
+    change_image_references(instance.image.name, -1)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def recipe_activity(sender, instance, signal, **kwargs):
+    record_event(
+        RECIPE_ACTIVITY,
+        kind=sender._meta.model_name,
+        recipe=instance.recipe_id,
+        user=instance.user_id,
+        added=signal is post_save,
+    )
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def follow_changed(sender, instance, signal, **kwargs):
+    record_event(
+        FOLLOW_CHANGED,
+        user=instance.user_id,
+        author=instance.author_id,
+        added=signal is post_save,
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        touch_recipes(Recipe.objects.filter(pk=instance.pk))
+    elif pk_set:
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+# Строки AmountIngredient сигналов не отправляют, чтобы их удаление
+# оставалось быстрым: состав рецепта меняют сериализатор и админка,
+# и они записывают INGREDIENTS_CHANGED один раз на рецепт.
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_changed(sender, instance, signal, created=False, **kwargs):
+    if created:
+        return
+    ids = touch_recipes(Recipe.objects.filter(ingredients=instance))
+    if signal is pre_delete and ids:
+        record_event(INGREDIENTS_CHANGED, ids=ids)
+
+
+@receiver(pre_save, sender=User)
+def remember_profile(sender, instance, update_fields=None, **kwargs):
+    saved = PROFILE_FIELDS if update_fields is None else (
+        PROFILE_FIELDS & set(update_fields)
+    )
+    instance.previous_profile = User.objects.filter(
+        pk=instance.pk
+    ).values(*saved).first() if instance.pk and saved else None
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, **kwargs):
+    previous = getattr(instance, 'previous_profile', None)
+    if created or not previous or all(
+        getattr(instance, field) == value
+        for field, value in previous.items()
+    ):
+        return
+    touch_recipes(Recipe.objects.filter(author=instance))
@@ -0,0 +1,95 @@
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Subquery
+
+from .models import AmountIngredient, RecipeBucket
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS = NUM_PERMUTATIONS // BANDS
+MAX_CANDIDATES = 500
+SIMILAR_LIMIT = 6
+PRIME = np.uint64((1 << 31) - 1)
+
+_random = np.random.RandomState(2022)
+HASH_A = _random.randint(1, PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64)
+HASH_B = _random.randint(0, PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64)
+ROW_WEIGHTS = _random.randint(1, PRIME, size=ROWS, dtype=np.uint64)
+BAND_SALTS = _random.randint(
+    0, np.iinfo(np.int64).max, size=BANDS, dtype=np.uint64
+)
+
+
+def minhash_signatures(recipe_ids, ingredient_ids):
+    """
+    MinHash-сигнатуры для пар (рецепт, ингредиент), упорядоченных
+    по рецепту. Возвращает id рецептов и матрицу сигнатур
+    размером (рецепты, NUM_PERMUTATIONS).
+    """
+    recipes, starts = np.unique(
+        np.asarray(recipe_ids, dtype=np.int64), return_index=True
+    )
+    values = np.asarray(ingredient_ids, dtype=np.uint64) % PRIME
+    hashed = (np.outer(values, HASH_A) + HASH_B) % PRIME
+    return recipes, np.minimum.reduceat(hashed, starts, axis=0)
+
+
+def lsh_buckets(signatures):
+    """
+    Номера LSH-корзин: каждая полоса из ROWS значений сигнатуры
+    сворачивается в одно 64-битное число, соль полосы разводит
+    одинаковые значения разных полос по разным корзинам.
+    """
+    bands = signatures.reshape(len(signatures), BANDS, ROWS)
+    buckets = (bands * ROW_WEIGHTS).sum(axis=2, dtype=np.uint64) + BAND_SALTS
+    return buckets.view(np.int64)
+
+
+def index_recipes(recipe_ids):
+    """
+    Пересчитывает LSH-корзины рецептов по текущему составу ингредиентов.
+    """
+    pairs = list(AmountIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('recipe_id').values_list('recipe_id', 'ingredients_id'))
+    buckets = []
+    if pairs:
+        recipes, signatures = minhash_signatures(*zip(*pairs))
+        for recipe_id, row in zip(recipes, lsh_buckets(signatures)):
+            buckets += [
+                RecipeBucket(recipe_id=int(recipe_id), bucket=int(bucket))
+                for bucket in row
+            ]
+    with transaction.atomic():
+        RecipeBucket.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeBucket.objects.bulk_create(buckets)
+    return len(buckets) // BANDS
+
+
+def similar_recipe_ids(recipe_id, limit=SIMILAR_LIMIT):
+    """
+    Похожие рецепты: кандидаты из общих LSH-корзин,
+    упорядоченные по точному коэффициенту Жаккара наборов ингредиентов.
+    """
+    candidates = list(RecipeBucket.objects.filter(
+        bucket__in=Subquery(
+            RecipeBucket.objects.filter(recipe_id=recipe_id).values('bucket')
+        )
+    ).exclude(recipe_id=recipe_id).values_list(
+        'recipe_id', flat=True
+    ).distinct()[:MAX_CANDIDATES])
+    if not candidates:
+        return []
+    ingredients = defaultdict(set)
+    for pk, ingredient in AmountIngredient.objects.filter(
+        recipe_id__in=candidates + [recipe_id]
+    ).values_list('recipe_id', 'ingredients_id'):
+        ingredients[pk].add(ingredient)
+    own = ingredients[recipe_id]
+    scores = {
+        pk: len(own & ingredients[pk]) / len(own | ingredients[pk])
+        for pk in candidates if own | ingredients[pk]
+    }
+    return sorted(scores, key=lambda pk: (-scores[pk], pk))[:limit]
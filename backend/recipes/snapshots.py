@@ -0,0 +1,104 @@
+from django.conf import settings
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils import timezone
+
+from .models import AmountIngredient, Recipe
+
+AUTHOR_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+
+
+def snapshot_queryset(ids):
+    return Recipe.objects.filter(pk__in=ids).select_related(
+        'author'
+    ).prefetch_related('tags', 'amount_ingredient__ingredients').only(
+        'id', 'snapshot', 'author', *(
+            f'author__{name}' for name in AUTHOR_FIELDS
+        )
+    )
+
+
+def build_snapshot(recipe):
+    """
+    Снимок связанных данных рецепта для чтения из одной таблицы:
+    автор без флага подписки, теги и строки ингредиентов в том же виде,
+    что и в ответе API.
+    """
+    author = recipe.author
+    return {
+        'author': None if author is None else {
+            name: getattr(author, name) for name in AUTHOR_FIELDS
+        },
+        'tags': [
+            {name: getattr(tag, name) for name in TAG_FIELDS}
+            for tag in recipe.tags.all()
+        ],
+        'ingredients': [
+            {
+                'id': line.ingredients.id,
+                'name': line.ingredients.name,
+                'measurement_unit': line.ingredients.measurement_unit,
+                'amount': line.amount,
+            }
+            for line in recipe.amount_ingredient.all()
+        ],
+    }
+
+
+def prefetch_fallback(recipes):
+    """
+    Связанные данные рецептов, снимок которых ещё не собран: запасные
+    сериализаторы получают их тремя запросами на всю пачку, а не по
+    запросу на каждую строку. Рецепты со снимком не затрагиваются.
+    """
+    recipes = list(recipes)
+    missing = [
+        recipe for recipe in recipes
+        if 'snapshot' not in recipe.get_deferred_fields()
+        and not recipe.snapshot
+    ]
+    prefetch_related_objects(missing, 'author', 'tags', Prefetch(
+        'amount_ingredient',
+        queryset=AmountIngredient.objects.select_related('ingredients'),
+    ))
+    return recipes
+
+
+def stale_snapshots(ids):
+    """
+    Рецепты из ids, снимок которых расходится с таблицами, вместе
+    с актуальным снимком.
+    """
+    for recipe in snapshot_queryset(ids):
+        snapshot = build_snapshot(recipe)
+        if recipe.snapshot != snapshot:
+            yield recipe, snapshot
+
+
+def refresh_snapshots(ids):
+    """
+    Пересобирает снимки рецептов пачками по RECIPE_SNAPSHOT_BATCH_SIZE.
+    Записываются только изменившиеся снимки, вместе с ними обновляется
+    время изменения рецепта: от него зависят ETag и кэш фрагментов.
+    """
+    ids = list(ids)
+    refreshed = 0
+    size = settings.RECIPE_SNAPSHOT_BATCH_SIZE
+    for start in range(0, len(ids), size):
+        changed = []
+        now = timezone.now()
+        for recipe, snapshot in stale_snapshots(ids[start:start + size]):
+            recipe.snapshot = snapshot
+            recipe.updated_at = now
+            changed.append(recipe)
+        Recipe.objects.bulk_update(changed, ('snapshot', 'updated_at'))
+        refreshed += len(changed)
+    return refreshed
+
+
+def refresh_snapshot(recipe):
+    """
+    Синхронное обновление снимка сохраняемого рецепта.
+    """
+    recipe.snapshot = build_snapshot(snapshot_queryset([recipe.pk]).get())
+    Recipe.objects.filter(pk=recipe.pk).update(snapshot=recipe.snapshot)
@@ -0,0 +1,69 @@
+from jobs.outbox import subscriber
+from jobs.queue import job
+
+from .images import process_image
+from .models import Recipe
+from .signals import (
+    INGREDIENTS_CHANGED,
+    RECIPE_ACTIVITY,
+    RECIPES_CHANGED,
+    recipes_changed
+)
+from .similarity import index_recipes
+from .snapshots import refresh_snapshots
+from .trending import update_trending_scores
+
+
+def merged_ids(payloads, key='ids'):
+    ids = set()
+    for payload in payloads:
+        value = payload[key]
+        ids.update(value if isinstance(value, list) else [value])
+    return sorted(ids)
+
+
+@job
+def reindex_recipes(recipe_ids):
+    """
+    Пересчёт LSH-корзин похожих рецептов после изменения состава.
+    """
+    index_recipes(recipe_ids)
+
+
+@job
+def refresh_recipe_snapshots(recipe_ids):
+    """
+    Пересборка снимков рецептов после правки тегов, ингредиентов
+    или профиля автора.
+    """
+    refresh_snapshots(recipe_ids)
+
+
+@job
+def process_recipe_image(recipe_id, image):
+    """
+    Поворот по EXIF и удаление метаданных загруженного изображения.
+    """
+    process_image(recipe_id, image)
+
+
+@subscriber(RECIPES_CHANGED)
+def send_recipes_changed(payloads):
+    recipes_changed.send(sender=Recipe, ids=merged_ids(payloads))
+
+
+@subscriber(RECIPES_CHANGED)
+def schedule_snapshot_refresh(payloads):
+    refresh_recipe_snapshots.enqueue(
+        recipe_ids=merged_ids(payloads), unique=True
+    )
+
+
+@subscriber(INGREDIENTS_CHANGED)
+def schedule_reindex(payloads):
+    reindex_recipes.enqueue(recipe_ids=merged_ids(payloads), unique=True)
+
+
+@subscriber(RECIPE_ACTIVITY)
+def refresh_trending_scores(payloads):
+    update_trending_scores(recipe_ids=merged_ids(payloads, 'recipe'))
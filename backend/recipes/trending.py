@@ -0,0 +1,75 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import (
+    Exists,
+    ExpressionWrapper,
+    FloatField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value
+)
+from django.db.models.functions import Coalesce, Exp, Extract
+from django.utils import timezone
+
+from .models import Favorite, Recipe, ShoppingCart
+from .signals import list_changed
+
+TRENDING = 'trending'
+TRENDING_ORDERING = ('-trending_score', '-pub_date')
+HORIZON_HALF_LIVES = 10
+
+
+def decayed_sum(model, now, horizon, rate):
+    """
+    Подзапрос: сумма экспоненциально затухающих весов добавлений
+    рецепта в избранное или список покупок начиная с horizon.
+    """
+    decay = Exp(ExpressionWrapper(
+        (Extract('created', 'epoch') - now.timestamp()) * rate,
+        output_field=FloatField(),
+    ))
+    return Coalesce(Subquery(
+        model.objects.filter(
+            recipe=OuterRef('pk'), created__gte=horizon
+        ).order_by().values('recipe').annotate(
+            score=Sum(decay)
+        ).values('score'),
+        output_field=FloatField(),
+    ), Value(0.0))
+
+
+def update_trending_scores(half_life_hours=None, recipe_ids=None):
+    """
+    Пересчитывает популярность одним UPDATE на стороне базы.
+    Затрагиваются только рецепты с ненулевой оценкой или с добавлениями
+    за окно в HORIZON_HALF_LIVES периодов полураспада, а если передан
+    recipe_ids, то лишь эти рецепты. Порядок списка по популярности
+    меняется, поэтому версия списка сбрасывается.
+    """
+    half_life = timedelta(
+        hours=half_life_hours or settings.TRENDING_HALF_LIFE_HOURS
+    )
+    rate = math.log(2) / half_life.total_seconds()
+    now = timezone.now()
+    horizon = now - half_life * HORIZON_HALF_LIVES
+    recent = {'recipe': OuterRef('pk'), 'created__gte': horizon}
+    recipes = Recipe.objects.all()
+    if recipe_ids is not None:
+        recipes = recipes.filter(pk__in=recipe_ids)
+    updated = recipes.filter(
+        Q(trending_score__gt=0)
+        | Exists(Favorite.objects.filter(**recent))
+        | Exists(ShoppingCart.objects.filter(**recent))
+    ).update(trending_score=(
+        settings.TRENDING_FAVORITE_WEIGHT
+        * decayed_sum(Favorite, now, horizon, rate)
+        + settings.TRENDING_SHOPPING_CART_WEIGHT
+        * decayed_sum(ShoppingCart, now, horizon, rate)
+    ))
+    if updated:
+        list_changed()
+    return updated
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Follow, User
+from .models import AuthorSuggestion, Follow, User
+from .paginators import EstimatedCountPaginator
 
 EMPTY_VALUE = '-пусто-'
 
@@ -9,12 +10,27 @@ EMPTY_VALUE = '-пусто-'
 class UserAdmin(admin.ModelAdmin):
     list_display = ('id', 'username', 'email', 'first_name', 'last_name',)
     search_fields = ('username', 'email',)
-    list_filter = ('email', 'first_name',)
+    list_filter = ('is_staff', 'is_active',)
     empty_value_display = EMPTY_VALUE
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Follow)
 class FollowAdmin(admin.ModelAdmin):
-    list_display = ('user', 'author',)
-    search_fields = ('author', 'user',)
-    list_filter = ('author',)
+    list_display = ('user', 'author', 'created',)
+    list_select_related = ('user', 'author',)
+    raw_id_fields = ('user', 'author',)
+    search_fields = ('author__username', 'user__username',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(AuthorSuggestion)
+class AuthorSuggestionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'author', 'score',)
+    list_select_related = ('user', 'author',)
+    raw_id_fields = ('user', 'author',)
+    search_fields = ('user__username',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,31 @@
+from time import perf_counter
+
+from django.core.management import BaseCommand
+
+from users.suggestions import compute_author_suggestions
+from users.tasks import refresh_author_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Recomputes "authors you may like" suggestions for all users'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--enqueue',
+            action='store_true',
+            help='Put the computation on the job queue instead of running it',
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            refresh_author_suggestions.enqueue(unique=True)
+            self.stdout.write(self.style.SUCCESS(
+                'Пересчёт рекомендаций поставлен в очередь'
+            ))
+            return
+        started = perf_counter()
+        users, stored = compute_author_suggestions()
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендации пересчитаны для {users} пользователей: '
+            f'{stored} записей за {perf_counter() - started:.2f} с'
+        ))
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.15 on 2026-10-19 10:25
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+import django.db.models.functions.text
+
+SEARCH_INDEXES = (
+    django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('username'), name='gin_trgm_ops'), name='users_username_trgm'),
+    django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='gin_trgm_ops'), name='users_email_trgm'),
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    """
+    Триграммные индексы есть только в PostgreSQL. На других базах,
+    например SQLite в тестах, поиск работает без индексов.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    User = apps.get_model('users', 'User')
+    for index in SEARCH_INDEXES:
+        schema_editor.add_index(User, index)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    User = apps.get_model('users', 'User')
+    for index in SEARCH_INDEXES:
+        schema_editor.remove_index(User, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(
+                    create_search_indexes, drop_search_indexes
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(model_name='user', index=index)
+                for index in SEARCH_INDEXES
+            ],
+        ),
+    ]
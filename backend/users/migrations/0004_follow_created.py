@@ -0,0 +1,26 @@
+# Generated by Django 3.2.15 on 2026-10-19 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_author_suggestions'),
+    ]
+
+    operations = [
+        # Подписки, оформленные до миграции, остаются без даты: время
+        # миграции исказило бы сводку подписок за этот день. Дата
+        # появляется только у новых подписок, после AlterField.
+        migrations.AddField(
+            model_name='follow',
+            name='created',
+            field=models.DateTimeField(db_index=True, null=True, verbose_name='Дата подписки'),
+        ),
+        migrations.AlterField(
+            model_name='follow',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, null=True, verbose_name='Дата подписки'),
+        ),
+    ]
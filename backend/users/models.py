@@ -1,7 +1,9 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 from django.db import models
+from django.db.models.functions import Upper
 
 
 VALID_USERNAME = 'Введено некорректное значение поля "username"'
@@ -43,6 +45,16 @@ class User(AbstractUser):
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        indexes = (
+            GinIndex(
+                OpClass(Upper('username'), name='gin_trgm_ops'),
+                name='users_username_trgm',
+            ),
+            GinIndex(
+                OpClass(Upper('email'), name='gin_trgm_ops'),
+                name='users_email_trgm',
+            ),
+        )
 
     def __str__(self):
         return self.username
@@ -61,6 +73,12 @@ class Follow(models.Model):
         related_name='following',
         on_delete=models.CASCADE,
     )
+    created = models.DateTimeField(
+        'Дата подписки',
+        auto_now_add=True,
+        null=True,
+        db_index=True,
+    )
 
     def clean(self):
         if self.user == self.author:
@@ -81,3 +99,42 @@ class Follow(models.Model):
         return (
             f'Пользователь {self.user} подписан на {self.author}'
         )
+
+
+class AuthorSuggestion(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='author_suggestions',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Рекомендуемый автор',
+        related_name='suggested_to',
+        on_delete=models.CASCADE,
+    )
+    score = models.FloatField(
+        'Оценка',
+    )
+
+    class Meta:
+        verbose_name = 'Рекомендация автора'
+        verbose_name_plural = 'Рекомендации авторов'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='suggestion_user_author_constraint'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-score'),
+                name='suggestion_user_score_idx',
+            ),
+        )
+
+    def __str__(self):
+        return (
+            f'Пользователю {self.user} рекомендован {self.author}'
+        )
@@ -0,0 +1,117 @@
+from itertools import chain
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from .models import AuthorSuggestion, Follow, User
+from recipes.models import Favorite, Recipe
+
+
+def id_array(queryset):
+    return np.fromiter(
+        queryset.order_by('id').values_list('id', flat=True).iterator(),
+        dtype=np.int64,
+    )
+
+
+def edge_matrix(queryset, rows, columns):
+    """
+    Разреженная CSR-матрица смежности по парам id из values_list:
+    строки и столбцы нумеруются позициями id в отсортированных
+    массивах rows и columns.
+    """
+    pairs = np.fromiter(
+        chain.from_iterable(queryset.order_by().iterator()), dtype=np.int64
+    ).reshape(-1, 2)
+    return sparse.csr_matrix(
+        (
+            np.ones(len(pairs), dtype=np.float32),
+            (
+                np.searchsorted(rows, pairs[:, 0]),
+                np.searchsorted(columns, pairs[:, 1]),
+            ),
+        ),
+        shape=(len(rows), len(columns)),
+    )
+
+
+def score_users(follows, favorites, recipe_follows, start, stop):
+    """
+    Оценки авторов для пользователей с позициями [start, stop):
+    друзья друзей — авторы, на которых подписаны авторы из подписок
+    пользователя; совместное избранное — авторы, на которых подписаны
+    пользователи, добавлявшие в избранное те же рецепты. Уже известные
+    авторы и сам пользователь исключаются.
+    """
+    friends = follows[start:stop] @ follows
+    cofavorites = favorites[start:stop] @ recipe_follows
+    scores = (
+        settings.AUTHOR_SUGGESTIONS_FOF_WEIGHT * friends
+        + settings.AUTHOR_SUGGESTIONS_COFAVORITE_WEIGHT * cofavorites
+    ).tocsr()
+    known = follows[start:stop] + sparse.eye(
+        stop - start, follows.shape[1], k=start, format='csr'
+    )
+    scores = scores - scores.multiply(known > 0)
+    scores.eliminate_zeros()
+    return scores.tocoo()
+
+
+def top_scores(scores, limit):
+    """
+    Лучшие limit оценок в каждой строке без цикла по строкам:
+    ненулевые значения сортируются по строке и убыванию оценки,
+    затем отбрасывается всё, что дальше limit от начала строки.
+    """
+    order = np.lexsort((scores.col, -scores.data, scores.row))
+    rows = scores.row[order]
+    rank = np.arange(len(order)) - np.searchsorted(rows, rows)
+    keep = order[rank < limit]
+    return scores.row[keep], scores.col[keep], scores.data[keep]
+
+
+def compute_author_suggestions():
+    """
+    Пересчитывает рекомендации авторов для всех пользователей.
+    Граф подписок и избранного загружается в CSR-матрицы, оценки
+    считаются матричными произведениями пачками по
+    AUTHOR_SUGGESTIONS_CHUNK_SIZE пользователей, для каждого
+    сохраняются AUTHOR_SUGGESTIONS_LIMIT лучших авторов.
+    """
+    users = id_array(User.objects.all())
+    recipes = id_array(Recipe.objects.all())
+    follows = edge_matrix(
+        Follow.objects.values_list('user_id', 'author_id'), users, users
+    )
+    favorites = edge_matrix(
+        Favorite.objects.values_list('user_id', 'recipe_id'), users, recipes
+    )
+    recipe_follows = (favorites.T @ follows).tocsr()
+    size = settings.AUTHOR_SUGGESTIONS_CHUNK_SIZE
+    stored = 0
+    for start in range(0, len(users), size):
+        stop = min(start + size, len(users))
+        rows, columns, values = top_scores(
+            score_users(follows, favorites, recipe_follows, start, stop),
+            settings.AUTHOR_SUGGESTIONS_LIMIT,
+        )
+        with transaction.atomic():
+            AuthorSuggestion.objects.filter(
+                user_id__gte=int(users[start]),
+                user_id__lte=int(users[stop - 1]),
+            ).delete()
+            AuthorSuggestion.objects.bulk_create(
+                (
+                    AuthorSuggestion(
+                        user_id=int(users[start + row]),
+                        author_id=int(users[column]),
+                        score=float(value),
+                    )
+                    for row, column, value in zip(rows, columns, values)
+                ),
+                batch_size=settings.AUTHOR_SUGGESTIONS_CHUNK_SIZE,
+            )
+        stored += len(rows)
+    return len(users), stored
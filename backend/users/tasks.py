@@ -0,0 +1,11 @@
+from jobs.queue import job
+
+from .suggestions import compute_author_suggestions
+
+
+@job
+def refresh_author_suggestions():
+    """
+    Ночной пересчёт рекомендаций авторов.
+    """
+    compute_author_suggestions()